@@ -0,0 +1,73 @@
+"""
+Cold start benchmark: time to import the app and to serve its first request.
+
+Every run is a fresh interpreter. With --fresh-db each run also starts from an
+empty SQLite file (like a serverless cold start with an empty /tmp); otherwise
+the database already exists, as on a warm container or a real DATABASE_URL.
+
+    python benchmarks/cold_start.py --runs 15
+    python benchmarks/cold_start.py --app-dir /tmp/other-checkout/backend   # compare
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+# Test harness only. Imported after main so fastapi/starlette/pydantic count as
+# app import time, and timed separately so it is not part of the first request.
+from fastapi.testclient import TestClient
+harness_ready = time.perf_counter()
+with TestClient(main.app) as client:
+    response = client.get("/api/fields/person")
+    assert response.status_code == 200, response.text
+served = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (served - harness_ready) * 1000}))
+"""
+
+
+def run_once(app_dir, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=app_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--fresh-db", action="store_true", help="Start every run from an empty database")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cold_start.db")
+        database_url = f"sqlite:///{db_path}"
+        # Warm-up run creates the schema and fills the OS file cache
+        run_once(args.app_dir, database_url)
+
+        results = []
+        for _ in range(args.runs):
+            if args.fresh_db and os.path.exists(db_path):
+                os.remove(db_path)
+            results.append(run_once(args.app_dir, database_url))
+
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    request_ms = statistics.median(r["first_request_ms"] for r in results)
+    print(f"app dir:             {args.app_dir}")
+    print(f"runs:                {args.runs}{' (fresh db)' if args.fresh_db else ''}")
+    print(f"import (median):     {import_ms:8.1f} ms")
+    print(f"first request (med): {request_ms:8.1f} ms")
+    print(f"cold start (median): {import_ms + request_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
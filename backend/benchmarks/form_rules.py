@@ -0,0 +1,87 @@
+"""
+Conditional logic benchmark: compile once, then evaluate submissions.
+
+Builds a synthetic form whose fields each carry a `visible_if` (an `any` of two
+comparisons on earlier fields) and, for every third field, a `required_if`,
+spread over sections of which one is conditional. Reports the one-off compile
+cost, a full evaluation pass and incremental updates near the leaves and at
+the root of the dependency graph.
+
+    python benchmarks/form_rules.py --fields 1000 3000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.domain.entities.form_rules import FieldRule, FormRules, SectionRule
+from src.domain.services.conditional_logic import compile_form
+
+
+def build_rules(fields, sections=10, seed=1):
+    rng = random.Random(seed)
+    rules = []
+    conditions = 0
+    for i in range(fields):
+        field_rules = {}
+        if i:
+            earlier = rng.randrange(max(0, i - 50), i)
+            field_rules["visible_if"] = {"any": [
+                {"field": f"f{earlier}", "op": "eq", "value": "yes"},
+                {"field": f"f{earlier}", "op": "empty"},
+            ]}
+            conditions += 2
+        if i and i % 3 == 0:
+            field_rules["required_if"] = {"field": f"f{rng.randrange(i)}", "op": "gt", "value": 5}
+            conditions += 1
+        rules.append(FieldRule(f"f{i}", i % sections, i % 7 == 0, json.dumps(field_rules)))
+    section_rules = tuple(
+        SectionRule(s, json.dumps({"field": "f0", "op": "ne", "value": "hide"}) if s == 3 else None)
+        for s in range(sections)
+    )
+    return FormRules(tuple(rules), section_rules), conditions
+
+
+def timed(function, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fields", type=int, nargs="+", default=[1000, 3000])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    for fields in args.fields:
+        rules, conditions = build_rules(fields)
+        started = time.perf_counter()
+        logic = compile_form(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+        answers = {f"f{i}": "yes" for i in range(fields)}
+        evaluation = logic.evaluate(answers)
+        leaf, root = f"f{fields - 1}", "f0"
+        values = iter(["no", "yes"] * args.runs)
+
+        print(f"fields: {fields}, comparisons: {conditions}")
+        print(f"  compile (once per form version): {compile_ms:9.1f} ms")
+        print(f"  cached lookup:                   {timed(lambda: compile_form(rules), args.runs):9.3f} ms")
+        print(f"  full evaluation (median):        {timed(lambda: logic.evaluate(answers), args.runs):9.3f} ms")
+        print(f"  update leaf answer (median):     {timed(lambda: evaluation.update(leaf, next(values)), args.runs):9.3f} ms"
+              f"  ({len(logic.affected(leaf))} nodes)")
+        values = iter(["no", "yes"] * args.runs)
+        print(f"  update root answer (median):     {timed(lambda: evaluation.update(root, next(values)), args.runs):9.3f} ms"
+              f"  ({len(logic.affected(root))} nodes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+List mapping benchmark: cost of turning N rows into domain entities.
+
+Compares the old read path (full ORM instances, then Mapper.to_entity) with
+column tuples mapped by Mapper.from_rows, and a plain @dataclass entity with
+the slotted one. Reports wall time and tracemalloc peak per strategy.
+
+    python benchmarks/list_mapping.py --rows 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class UnslottedSection:
+    id: Optional[int]
+    name: str
+    description: Optional[str]
+    order: int
+    form_id: int
+    visible_if: Optional[str] = None
+
+
+def measure(label, build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms {peak / 2**20:9.1f} MiB peak  ({len(result)} entities)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'list_mapping.db')}"
+        from sqlalchemy import insert, select
+        import database
+        import models
+        from src.infrastructure.mappers.section_mapper import SectionMapper
+
+        engine = database.get_engine(database.DEFAULT_TENANT)
+        with engine.begin() as conn:
+            form_id = conn.execute(insert(models.FormDefinition).values(name="bench")).inserted_primary_key[0]
+            conn.execute(
+                insert(models.Section),
+                [
+                    {"form_id": form_id, "name": f"Section {i}", "description": "desc", "order_index": i}
+                    for i in range(args.rows)
+                ],
+            )
+
+        def orm_to_entity():
+            with database.get_session(database.DEFAULT_TENANT) as db:
+                return [SectionMapper.to_entity(s) for s in db.query(models.Section).all()]
+
+        def tuples_from_rows():
+            with database.get_session(database.DEFAULT_TENANT) as db:
+                return SectionMapper.from_rows(db.execute(select(*SectionMapper.COLUMNS)))
+
+        def tuples_unslotted():
+            with database.get_session(database.DEFAULT_TENANT) as db:
+                return [UnslottedSection(*row) for row in db.execute(select(*SectionMapper.COLUMNS))]
+
+        print(f"rows: {args.rows}")
+        measure("ORM instances + to_entity", orm_to_entity)
+        measure("tuples + from_rows (slots)", tuples_from_rows)
+        measure("tuples + plain @dataclass", tuples_unslotted)
+        database.dispose_shards()
+
+
+if __name__ == "__main__":
+    main()
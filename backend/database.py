@@ -1,12 +1,52 @@
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import declarative_base, sessionmaker
 import os
+import re
+import threading
+import time
 
 # Use /tmp for SQLite in serverless environments (read-only allowed only in /tmp)
 # But ideally, use a real DATABASE_URL (Postgres)
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////tmp/sql_app.db")
 
-connect_args = {}
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    connect_args = {"check_same_thread": False}
+# --- Schema setup ---
+# Latest migration in src/infrastructure/migrations/versions.py; kept here so the
+# up-to-date check does not import the migration code.
+SCHEMA_VERSION = 8
+# Set to 0 when schema setup is run explicitly as a deployment/migration step
+SCHEMA_AUTO_CREATE = os.getenv("SCHEMA_AUTO_CREATE", "1") != "0"
+
+# --- Tenant sharding ---
+# Requests pick their shard with the X-Tenant-ID header; without it they go to
+# the default tenant, which is the database at DATABASE_URL.
+TENANT_HEADER = "X-Tenant-ID"
+DEFAULT_TENANT = "default"
+# e.g. "sqlite:////tmp/sql_app_{tenant}.db" or "postgresql://host/forms_{tenant}".
+# When unset, SQLite tenants get a sibling file and other databases a schema per tenant.
+TENANT_DATABASE_URL_TEMPLATE = os.getenv("TENANT_DATABASE_URL_TEMPLATE")
+# Allow-list of tenants. When unset, only tenants registered in the default
+# database (`scripts/migrate.py register --tenant <id>`) get a shard, so an
+# arbitrary header never creates a database. Either way, this is also the set
+# of shards analytics fans out to.
+TENANTS = [t.strip() for t in os.getenv("TENANTS", "").split(",") if t.strip()]
+
+# --- Read replicas ---
+# Comma-separated read-only URLs for GET routes. URLs containing "{tenant}" are
+# formatted per tenant; the others serve the default tenant only.
+READ_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_READ_URLS", "").split(",") if u.strip()]
+# A replica that failed is skipped for this long before being tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+_TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+def _connect_args(url):
+    if "sqlite" in url:
+        return {"check_same_thread": False}
+    return {}
+
+connect_args = _connect_args(SQLALCHEMY_DATABASE_URL)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args=connect_args
@@ -14,3 +54,253 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+# One pooled engine (and session factory) per shard, created on first use
+_shards = {DEFAULT_TENANT: (engine, SessionLocal)}
+_shards_lock = threading.Lock()
+# Shards whose schema has been checked in this process
+_prepared = set()
+# Per-tenant locks for that check, so migrating one shard does not block the others
+_schema_locks = {}
+# Tenants found in the registry; registrations are not revoked at runtime
+_registered = set()
+
+
+def shard_schema(bind):
+    """The schema a shard's tables live in (schema-per-tenant mode), or None."""
+    return bind.get_execution_options().get("schema_translate_map", {}).get(None)
+
+
+def qualified_name(bind, table):
+    """
+    Table name for hand-written SQL. schema_translate_map only rewrites Table
+    objects, so text() statements must name the shard's schema themselves.
+    """
+    schema = shard_schema(bind)
+    return f'"{schema}".{table}' if schema else table
+
+
+def current_schema_version(bind):
+    """Schema version recorded in the database, or None if it was never set up."""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text(f"SELECT version FROM {qualified_name(bind, 'schema_version')}")).scalar()
+    except DBAPIError:
+        return None
+
+
+def ensure_schema(bind):
+    """
+    Bring the schema to SCHEMA_VERSION unless the database already records it.
+    Returns True if DDL was run. Up-to-date databases cost a single SELECT.
+
+    Only the fast DDL steps run here; data backfills are left for
+    `scripts/migrate.py` so they never run inside a request.
+    """
+    if current_schema_version(bind) == SCHEMA_VERSION:
+        return False
+    import models  # noqa: F401 - registers the tables on Base.metadata
+    from src.infrastructure.migrations.runner import MigrationRunner
+    from src.infrastructure.migrations.versions import MIGRATIONS
+
+    MigrationRunner(bind, MIGRATIONS, progress=lambda message: None).upgrade_schema()
+    return True
+
+
+def resolve_tenant(tenant_id):
+    """Normalize a tenant id from a request, raising ValueError if it is not allowed."""
+    if not tenant_id:
+        return DEFAULT_TENANT
+    tenant = tenant_id.strip().lower()
+    if not _TENANT_ID.match(tenant):
+        raise ValueError(f"Invalid tenant id '{tenant_id}'")
+    if tenant == DEFAULT_TENANT:
+        return tenant
+    allowed = tenant in TENANTS if TENANTS else is_registered_tenant(tenant)
+    if not allowed:
+        raise ValueError(f"Unknown tenant '{tenant_id}'")
+    return tenant
+
+
+def is_registered_tenant(tenant):
+    """Whether the tenant is in the registry kept in the default database."""
+    if tenant in _registered:
+        return True
+    import models
+    with get_session(DEFAULT_TENANT) as db:
+        found = db.get(models.Tenant, tenant) is not None
+    if found:
+        _registered.add(tenant)
+    return found
+
+
+def registered_tenants():
+    import models
+    with get_session(DEFAULT_TENANT) as db:
+        tenants = list(db.scalars(select(models.Tenant.id).order_by(models.Tenant.id)))
+    _registered.update(tenants)
+    return tenants
+
+
+def register_tenant(tenant_id):
+    """Add a tenant to the registry so requests can open its shard. Returns the tenant id."""
+    tenant = tenant_id.strip().lower()
+    if not _TENANT_ID.match(tenant) or tenant == DEFAULT_TENANT:
+        raise ValueError(f"Invalid tenant id '{tenant_id}'")
+    import models
+    with get_session(DEFAULT_TENANT) as db:
+        if db.get(models.Tenant, tenant) is None:
+            db.add(models.Tenant(id=tenant))
+            db.commit()
+    _registered.add(tenant)
+    return tenant
+
+
+def tenant_database_url(tenant):
+    """Return (url, schema) for a tenant's shard; schema is None for database-per-tenant."""
+    if tenant == DEFAULT_TENANT:
+        return SQLALCHEMY_DATABASE_URL, None
+    if TENANT_DATABASE_URL_TEMPLATE:
+        return TENANT_DATABASE_URL_TEMPLATE.format(tenant=tenant), None
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        base, ext = os.path.splitext(SQLALCHEMY_DATABASE_URL)
+        return f"{base}_{tenant}{ext or '.db'}", None
+    return SQLALCHEMY_DATABASE_URL, f"tenant_{tenant.replace('-', '_')}"
+
+
+def _create_shard(tenant):
+    url, schema = tenant_database_url(tenant)
+    execution_options = {}
+    if schema:
+        # Unqualified tables resolve to the tenant's schema
+        execution_options["schema_translate_map"] = {None: schema}
+    shard_engine = create_engine(
+        url, connect_args=_connect_args(url), execution_options=execution_options
+    )
+    if schema:
+        with shard_engine.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+    return shard_engine, sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+
+
+def _open_shard(tenant):
+    shard = _shards.get(tenant)
+    if shard is None:
+        with _shards_lock:
+            shard = _shards.get(tenant)
+            if shard is None:
+                shard = _shards[tenant] = _create_shard(tenant)
+    return shard
+
+
+def _get_shard(tenant):
+    shard = _open_shard(tenant)
+    if tenant not in _prepared:
+        with _shards_lock:
+            schema_lock = _schema_locks.setdefault(tenant, threading.Lock())
+        # The DDL can be slow (CREATE INDEX CONCURRENTLY); only this tenant's requests wait for it
+        with schema_lock:
+            if tenant not in _prepared:
+                # Deferred from import time to the first request that needs the shard
+                if SCHEMA_AUTO_CREATE:
+                    ensure_schema(shard[0])
+                _prepared.add(tenant)
+    return shard
+
+
+def get_shard_engine(tenant=DEFAULT_TENANT):
+    """A tenant's engine without the automatic schema setup (for migration tooling)."""
+    return _open_shard(tenant)[0]
+
+
+def get_engine(tenant=DEFAULT_TENANT):
+    return _get_shard(tenant)[0]
+
+
+def get_session(tenant=DEFAULT_TENANT):
+    return _get_shard(tenant)[1]()
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        # pre_ping makes a dead replica fail at checkout instead of mid-query
+        self.engine = create_engine(url, connect_args=_connect_args(url), pool_pre_ping=True)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.failed_until = 0.0
+
+    def is_available(self):
+        return time.monotonic() >= self.failed_until
+
+    def mark_failed(self):
+        self.failed_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+_replicas = {}
+_replica_cursor = {}
+
+
+def _get_replicas(tenant):
+    replicas = _replicas.get(tenant)
+    if replicas is None:
+        with _shards_lock:
+            replicas = _replicas.get(tenant)
+            if replicas is None:
+                urls = [
+                    url.format(tenant=tenant) for url in READ_REPLICA_URLS
+                    if "{tenant}" in url or tenant == DEFAULT_TENANT
+                ]
+                replicas = _replicas[tenant] = [Replica(url) for url in urls]
+    return replicas
+
+
+def get_replica_session(tenant=DEFAULT_TENANT):
+    """
+    Open a session on a healthy read replica, round-robin.
+    Returns (session, replica), or (None, None) when the primary should serve the read.
+    """
+    replicas = _get_replicas(tenant)
+    if not replicas:
+        return None, None
+
+    start = _replica_cursor.get(tenant, 0)
+    _replica_cursor[tenant] = start + 1
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        if not replica.is_available():
+            continue
+        session = replica.SessionLocal()
+        try:
+            session.connection()
+        except Exception:
+            session.close()
+            replica.mark_failed()
+            continue
+        return session, replica
+    return None, None
+
+
+def known_tenants():
+    """
+    Every tenant, default first: the allow-list, or the registry without one.
+    Both are shared by all workers, unlike the shards a process happens to have open.
+    """
+    tenants = [DEFAULT_TENANT]
+    for tenant in TENANTS or registered_tenants():
+        if tenant not in tenants:
+            tenants.append(tenant)
+    return tenants
+
+
+def dispose_shards():
+    """Close every replica and tenant engine except the default one (used by tests and shutdown)."""
+    with _shards_lock:
+        for tenant in list(_shards):
+            if tenant != DEFAULT_TENANT:
+                _shards.pop(tenant)[0].dispose()
+                _prepared.discard(tenant)
+        for replicas in _replicas.values():
+            for replica in replicas:
+                replica.engine.dispose()
+        _replicas.clear()
+        _replica_cursor.clear()
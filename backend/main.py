@@ -1,39 +1,128 @@
-from typing import List
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import ValidationError
 import models, schemas, database
-from src.infrastructure.repositories.section_repository import SectionRepository
-from src.application.use_cases.create_section import CreateSection
-from src.application.use_cases.list_sections import ListSections
-from src.application.use_cases.update_section import UpdateSection
-from src.application.use_cases.delete_section import DeleteSection
+from src.infrastructure.http.compression import CompressionMiddleware
+from src.infrastructure.http.streaming import STREAM_BATCH_SIZE, stream_rows
+from src.infrastructure.http.read_your_writes import ReadYourWritesMiddleware, wrote_recently
+from src.infrastructure.http.replica_fallback import PRIMARY_STATE, REPLICA_STATE, ReplicaFallbackRoute
+from src.infrastructure.repositories.field_revision_repository import FieldRevisionRepository
+from src.infrastructure.mappers.person_mapper import PersonMapper
+from src.domain.entities.person import Person as PersonEntity
+from src.application.use_cases.upgrade_custom_data import UpgradeCustomData
+from src.infrastructure.events.outbox import install_outbox
+from src.infrastructure.search.people_index import install_search_index
+from src.infrastructure.repositories.form_rules_repository import install_rule_checks
 import json
 
-models.Base.metadata.create_all(bind=database.engine)
+# Use cases for the less frequent routes are imported inside the route handlers,
+# so a cold start only pays for the code paths it actually serves.
 
-app = FastAPI()
+install_outbox()
+install_search_index()
+install_rule_checks()
 
-# Configure CORS
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup happens here instead of at import time; shards opened later
+    # (and runtimes that skip lifespan events) are set up on their first session
+    if database.SCHEMA_AUTO_CREATE:
+        database.get_engine(database.DEFAULT_TENANT)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+# Reads that fail on a replica are answered from the primary (see get_read_db)
+app.router.route_class = ReplicaFallbackRoute
+
+# The factories below import their middleware when the app builds its middleware
+# stack on startup, so `import main` stays cheap.
+
+def _idempotency_middleware(app):
+    from src.infrastructure.http.idempotency import IdempotencyMiddleware, IdempotencyStore
+    return IdempotencyMiddleware(app, store=IdempotencyStore())
+
+# Per-route concurrency limits so expensive endpoints cannot starve cheap reads
+admission_controller = None
+
+def _admission_middleware(app):
+    global admission_controller
+    from src.infrastructure.http.admission import (
+        ADMISSION_CONTROL, AdmissionController, AdmissionControlMiddleware, lanes_from_env,
+    )
+    admission_controller = AdmissionController(lanes_from_env())
+    if not ADMISSION_CONTROL:
+        return app
+    return AdmissionControlMiddleware(app, controller=admission_controller)
+
+# Retries carrying the same Idempotency-Key get the first response back instead of
+# writing again. Added before compression so it stores and replays plain bodies.
+app.add_middleware(_idempotency_middleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(_admission_middleware)
+
+# Configure CORS. Added last so it is the outermost middleware and also covers
+# the responses the middlewares above send themselves (429/503 load shedding,
+# idempotent replays).
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"], 
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Idempotent-Replayed"],
 )
 
-def get_db():
-    db = database.SessionLocal()
+def get_tenant(x_tenant_id: Optional[str] = Header(None)) -> str:
+    try:
+        return database.resolve_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_db(tenant: str = Depends(get_tenant)):
+    # Each tenant's data lives in its own shard with its own connection pool
+    db = database.get_session(tenant)
     try:
         yield db
     finally:
         db.close()
 
+def get_read_db(request: Request, tenant: str = Depends(get_tenant), db: Session = Depends(get_db)):
+    """
+    Session for read-only routes: a read replica when one is configured and healthy,
+    otherwise the primary. Clients that just wrote keep reading from the primary.
+    """
+    if wrote_recently(request) or getattr(request.state, PRIMARY_STATE, False):
+        yield db
+        return
+
+    replica_db, replica = database.get_replica_session(tenant)
+    if replica_db is None:
+        yield db
+        return
+
+    # ReplicaFallbackRoute retries the request on the primary if this replica fails
+    setattr(request.state, REPLICA_STATE, replica)
+    try:
+        yield replica_db
+    except OperationalError:
+        # Failed while streaming, past the retry; later reads skip this replica
+        replica.mark_failed()
+        raise
+    finally:
+        replica_db.close()
+
 # --- Custom Field Definitions ---
 
 @app.post("/api/fields/", response_model=schemas.CustomFieldDefinition)
 def create_field_definition(field: schemas.CustomFieldDefinitionCreate, db: Session = Depends(get_db)):
+    _validate_field_rules(field.validation_rules)
     db_field = models.CustomFieldDefinition(
         entity_type=field.entity_type,
         key_name=field.key_name,
@@ -44,29 +133,153 @@ def create_field_definition(field: schemas.CustomFieldDefinitionCreate, db: Sess
         is_active=field.is_active
     )
     db.add(db_field)
-    db.commit()
+    _commit(db)
     db.refresh(db_field)
     return db_field
 
 @app.get("/api/fields/{entity_type}", response_model=List[schemas.CustomFieldDefinition])
-def get_field_definitions(entity_type: str, db: Session = Depends(get_db)):
-    fields = db.query(models.CustomFieldDefinition).filter(
-        models.CustomFieldDefinition.entity_type == entity_type,
-        models.CustomFieldDefinition.is_active == True
-    ).all()
-    # Ensure JSON strings are parsed back to objects/lists for Pydantic response
-    # Actually Pydantic `Json` type handles serialization automatically from string in DB to object in response
-    return fields
+def get_field_definitions(entity_type: str, include_inactive: bool = False, db: Session = Depends(get_read_db)):
+    query = db.query(models.CustomFieldDefinition).filter(
+        models.CustomFieldDefinition.entity_type == entity_type
+    )
+    if not include_inactive:
+        # Served by the (entity_type, is_active) composite index
+        query = query.filter(models.CustomFieldDefinition.is_active == True)
+    # Pydantic `Json` type handles serialization automatically from string in DB to object in response
+    return query.all()
+
+def _validate_field_rules(validation_rules) -> None:
+    from src.domain.services.conditional_logic import RuleError, validate_field_rules
+
+    # `visible_if` / `required_if` are evaluated server-side, so reject bad ones up front
+    if isinstance(validation_rules, dict):
+        try:
+            validate_field_rules(validation_rules)
+        except RuleError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+def _commit(db: Session) -> None:
+    # Flushes check the rules of every affected form (install_rule_checks)
+    from src.domain.services.conditional_logic import RuleError
+
+    try:
+        db.commit()
+    except RuleError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _rename_rule_references(db: Session, db_field: models.CustomFieldDefinition, old_key_name: str) -> None:
+    """Point the conditions that read a renamed field at its new key"""
+    from src.domain.services.conditional_logic import rename_condition_field, rename_rule_references
+
+    needle = f"%{json.dumps(old_key_name)}%"
+    others = db.query(models.CustomFieldDefinition).filter(
+        models.CustomFieldDefinition.entity_type == db_field.entity_type,
+        models.CustomFieldDefinition.id != db_field.id,
+        models.CustomFieldDefinition.validation_rules.like(needle),
+    )
+    for other in others:
+        rules = json.loads(other.validation_rules)
+        renamed = rename_rule_references(rules, old_key_name, db_field.key_name)
+        if renamed != rules:
+            other.validation_rules = json.dumps(renamed)
+            other.version += 1
+
+    for section in db.query(models.Section).filter(models.Section.visible_if.like(needle)):
+        condition = json.loads(section.visible_if)
+        renamed = rename_condition_field(condition, old_key_name, db_field.key_name)
+        if renamed != condition:
+            section.visible_if = json.dumps(renamed)
+
+def _get_field_or_404(db: Session, field_id: int) -> models.CustomFieldDefinition:
+    db_field = db.query(models.CustomFieldDefinition).filter(
+        models.CustomFieldDefinition.id == field_id
+    ).first()
+    if not db_field:
+        raise HTTPException(status_code=404, detail="Field not found")
+    return db_field
+
+@app.put("/api/fields/{field_id}", response_model=schemas.CustomFieldDefinition)
+def update_field_definition(field_id: int, field: schemas.CustomFieldDefinitionUpdate, db: Session = Depends(get_db)):
+    db_field = _get_field_or_404(db, field_id)
+    _validate_field_rules(field.validation_rules)
+    old_key_name = db_field.key_name
+    option_renames = field.option_renames or {}
+
+    changes = field.model_dump(exclude_unset=True, exclude={"option_renames"})
+    if "options" in changes:
+        changes["options"] = json.dumps(field.options)
+    if "validation_rules" in changes:
+        changes["validation_rules"] = json.dumps(field.validation_rules)
+    changes = {k: v for k, v in changes.items() if v is not None and getattr(db_field, k) != v}
+
+    if not changes and not option_renames:
+        return db_field
+
+    for attr, value in changes.items():
+        setattr(db_field, attr, value)
+    db_field.version += 1
+
+    # Stored answers are only rewritten when their key or option values change,
+    # and then lazily, the next time each affected document is read or backfilled
+    if db_field.key_name != old_key_name:
+        _rename_rule_references(db, db_field, old_key_name)
+    if db_field.key_name != old_key_name or option_renames:
+        db.add(models.FieldDefinitionRevision(
+            field_id=db_field.id,
+            entity_type=db_field.entity_type,
+            version=db_field.version,
+            old_key_name=old_key_name,
+            new_key_name=db_field.key_name,
+            option_renames=json.dumps(option_renames),
+        ))
+
+    try:
+        _commit(db)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="A field with this key already exists.")
+    db.refresh(db_field)
+    return db_field
+
+@app.post("/api/fields/{field_id}/deactivate", response_model=schemas.CustomFieldDefinition)
+def deactivate_field_definition(field_id: int, db: Session = Depends(get_db)):
+    db_field = _get_field_or_404(db, field_id)
+    db_field.is_active = False
+    _commit(db)
+    db.refresh(db_field)
+    return db_field
+
+@app.post("/api/fields/{field_id}/reactivate", response_model=schemas.CustomFieldDefinition)
+def reactivate_field_definition(field_id: int, db: Session = Depends(get_db)):
+    db_field = _get_field_or_404(db, field_id)
+    db_field.is_active = True
+    _commit(db)
+    db.refresh(db_field)
+    return db_field
 
 # --- People ---
 
 @app.post("/api/people/", response_model=schemas.Person)
 def create_person(person: schemas.PersonCreate, db: Session = Depends(get_db)):
+    custom_data = person.custom_data
+    if person.form_id is not None:
+        evaluation = _evaluate_form(db, person.form_id, custom_data)
+        missing = evaluation.missing()
+        if missing:
+            raise HTTPException(
+                status_code=422,
+                detail={"message": "Required fields are missing.", "missing": missing},
+            )
+        # Answers to fields the rules hide are not kept
+        custom_data = evaluation.visible_answers()
     try:
         db_person = models.Person(
             name=person.name,
             email=person.email,
-            custom_data=json.dumps(person.custom_data)
+            custom_data=json.dumps(custom_data),
+            # New documents are written against the current field definitions
+            schema_revision=FieldRevisionRepository(db).head("person")
         )
         db.add(db_person)
         db.commit()
@@ -77,9 +290,60 @@ def create_person(person: schemas.PersonCreate, db: Session = Depends(get_db)):
     return db_person
 
 @app.get("/api/people/", response_model=List[schemas.Person])
-def get_people(db: Session = Depends(get_db)):
-    people = db.query(models.Person).all()
-    return people
+def get_people(request: Request, db: Session = Depends(get_read_db)):
+    upgrade = UpgradeCustomData(FieldRevisionRepository(db).list_for_entity("person"))
+
+    def serialize(person: PersonEntity) -> str:
+        return schemas.Person(
+            id=person.id,
+            name=person.name,
+            email=person.email,
+            custom_data=upgrade.execute(person.custom_data, person.schema_revision),
+        ).model_dump_json()
+
+    # Stream column tuples off a server-side cursor: no ORM instances, no identity map
+    rows = db.execute(
+        select(*PersonMapper.COLUMNS)
+        .order_by(models.Person.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    return stream_rows(request, PersonMapper.from_rows(rows), serialize)
+
+@app.get("/api/people/search", response_model=schemas.PersonSearchPage)
+def search_people(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Full-text search over name, email and answers to `text` custom fields.
+    Each word matches as a prefix; results are ranked best first.
+    """
+    from src.infrastructure.search.people_index import search_people as search_index
+
+    total, hits = search_index(db, q, limit, offset)
+    if not hits:
+        return {"total": total, "results": []}
+
+    people = {
+        person.id: person
+        for person in db.query(models.Person).filter(models.Person.id.in_([pid for pid, _ in hits]))
+    }
+    upgrade = UpgradeCustomData(FieldRevisionRepository(db).list_for_entity("person"))
+    results = []
+    for person_id, rank in hits:
+        person = people.get(person_id)
+        if person is None:
+            continue
+        results.append(schemas.PersonSearchResult(
+            id=person.id,
+            name=person.name,
+            email=person.email,
+            custom_data=upgrade.execute(person.custom_data, person.schema_revision),
+            rank=rank,
+        ))
+    return {"total": total, "results": results}
 
 # --- Forms Endpoints ---
 
@@ -87,12 +351,16 @@ from sqlalchemy.exc import IntegrityError
 
 @app.post("/api/forms/", response_model=schemas.Form)
 def create_form(form: schemas.FormCreate, db: Session = Depends(get_db)):
+    for section_create in form.sections:
+        _validate_condition(section_create.visible_if)
+
     # 1. Create Form
+    # One transaction: the rules are checked once the fields are linked, and a
+    # rejected form must not leave its sections behind
     try:
         db_form = models.FormDefinition(name=form.name, description=form.description)
         db.add(db_form)
-        db.commit()
-        db.refresh(db_form)
+        db.flush()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="A form with this name already exists.")
@@ -101,7 +369,6 @@ def create_form(form: schemas.FormCreate, db: Session = Depends(get_db)):
     temp_id_map = {}
 
     # 2. Create Sections if provided
-    repo = SectionRepository(db)
     for section_create in form.sections:
         # Assign form_id to the new section
         section_create.form_id = db_form.id
@@ -116,11 +383,11 @@ def create_form(form: schemas.FormCreate, db: Session = Depends(get_db)):
             name=section_create.name,
             description=section_create.description,
             order_index=section_create.order_index,
-            form_id=db_form.id
+            form_id=db_form.id,
+            visible_if=_condition_json(section_create.visible_if),
         )
         db.add(db_section)
-        db.commit()
-        db.refresh(db_section)
+        db.flush()
         
         if section_create.temp_id:
             temp_id_map[section_create.temp_id] = db_section.id
@@ -143,7 +410,7 @@ def create_form(form: schemas.FormCreate, db: Session = Depends(get_db)):
         )
         db.add(association)
 
-    db.commit()
+    _commit(db)
     db.refresh(db_form)
     
     # Reload form with relationships to return full object
@@ -151,11 +418,22 @@ def create_form(form: schemas.FormCreate, db: Session = Depends(get_db)):
     return db_form
 
 @app.get("/api/forms/", response_model=List[schemas.Form])
-def get_forms(db: Session = Depends(get_db)):
-    return db.query(models.FormDefinition).all()
+def get_forms(request: Request, db: Session = Depends(get_read_db)):
+    forms = (
+        db.query(models.FormDefinition)
+        .options(
+            selectinload(models.FormDefinition.fields).joinedload(models.FormFields.field),
+            selectinload(models.FormDefinition.sections),
+        )
+        .order_by(models.FormDefinition.id)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+    return stream_rows(
+        request, forms, lambda form: schemas.Form.model_validate(form).model_dump_json()
+    )
 
 @app.get("/api/forms/{form_id}", response_model=schemas.Form)
-def get_form(form_id: int, db: Session = Depends(get_db)):
+def get_form(form_id: int, db: Session = Depends(get_read_db)):
     form = db.query(models.FormDefinition).filter(models.FormDefinition.id == form_id).first()
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
@@ -166,30 +444,96 @@ def get_form(form_id: int, db: Session = Depends(get_db)):
 
 # --- Sections Endpoints ---
 
+def _section_response(section) -> schemas.Section:
+    # The domain entity calls it `order`; the API keeps the column name
+    return schemas.Section(
+        id=section.id,
+        name=section.name,
+        description=section.description,
+        order_index=section.order,
+        form_id=section.form_id,
+        visible_if=section.visible_if,
+    )
+
+def _condition_json(condition) -> Optional[str]:
+    return json.dumps(condition) if condition is not None else None
+
+def _validate_condition(condition) -> None:
+    from src.domain.services.conditional_logic import RuleError, compile_condition
+
+    if condition is not None:
+        try:
+            compile_condition(condition)
+        except RuleError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+def _validation_detail(error: ValidationError) -> list:
+    # Same shape as FastAPI's own request validation errors
+    return error.errors(include_url=False, include_context=False)
+
 @app.post("/api/sections/", response_model=schemas.Section)
 def create_section(section: schemas.SectionCreate, db: Session = Depends(get_db)):
+    from src.infrastructure.repositories.section_repository import SectionRepository
+    from src.application.use_cases.create_section import CreateSection
+    from src.application.dtos.section_dto import CreateSectionDTO
+    from src.domain.services.conditional_logic import RuleError
+
     repo = SectionRepository(db)
     use_case = CreateSection(repo)
-    return use_case.execute(section)
+    try:
+        dto = CreateSectionDTO(
+            name=section.name,
+            description=section.description,
+            order=section.order_index,
+            form_id=section.form_id,
+            visible_if=_condition_json(section.visible_if),
+        )
+        return _section_response(use_case.execute(dto))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=_validation_detail(e))
+    except RuleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @app.get("/api/forms/{form_id}/sections/", response_model=List[schemas.Section])
-def list_sections(form_id: int, db: Session = Depends(get_db)):
+def list_sections(form_id: int, db: Session = Depends(get_read_db)):
+    from src.infrastructure.repositories.section_repository import SectionRepository
+    from src.application.use_cases.list_sections import ListSections
+
     repo = SectionRepository(db)
     use_case = ListSections(repo)
-    return use_case.execute(form_id)
+    return [_section_response(section) for section in use_case.execute(form_id)]
 
 @app.put("/api/sections/{section_id}", response_model=schemas.Section)
 def update_section(section_id: int, section: schemas.SectionBase, db: Session = Depends(get_db)):
+    from src.infrastructure.repositories.section_repository import SectionRepository
+    from src.application.use_cases.update_section import UpdateSection
+    from src.application.dtos.section_dto import UpdateSectionDTO
+    from src.domain.services.conditional_logic import RuleError
+
     repo = SectionRepository(db)
     use_case = UpdateSection(repo)
     try:
-        dto = schemas.SectionCreate(**section.dict()) # Using SectionCreate schema for update values
-        return use_case.execute(section_id, dto)
+        changes = dict(
+            name=section.name,
+            description=section.description,
+            order=section.order_index,
+        )
+        if "visible_if" in section.model_fields_set:
+            changes["visible_if"] = _condition_json(section.visible_if)
+        return _section_response(use_case.execute(section_id, UpdateSectionDTO(**changes)))
+    except ValidationError as e:
+        # A ValueError too, so it must be caught before the 404 below
+        raise HTTPException(status_code=422, detail=_validation_detail(e))
+    except RuleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.delete("/api/sections/{section_id}")
 def delete_section(section_id: int, db: Session = Depends(get_db)):
+    from src.infrastructure.repositories.section_repository import SectionRepository
+    from src.application.use_cases.delete_section import DeleteSection
+
     repo = SectionRepository(db)
     use_case = DeleteSection(repo)
     use_case.execute(section_id)
@@ -206,85 +550,128 @@ def associate_field_to_section(form_id: int, field_id: int, section_id: int, db:
         raise HTTPException(status_code=404, detail="Association not found")
         
     association.section_id = section_id
-    db.commit()
+    _commit(db)
     return {"status": "success"}
 
+# --- Conditional Logic ---
+
+def _evaluate_form(db: Session, form_id: int, custom_data: dict):
+    from src.infrastructure.repositories.form_rules_repository import FormRulesRepository
+    from src.application.use_cases.evaluate_form import EvaluateForm
+    from src.domain.services.conditional_logic import RuleError
+
+    try:
+        return EvaluateForm(FormRulesRepository(db)).execute(form_id, custom_data)
+    except RuleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/api/forms/{form_id}/evaluate", response_model=schemas.FormEvaluation)
+def evaluate_form(form_id: int, request: schemas.FormEvaluationRequest, db: Session = Depends(get_read_db)):
+    """
+    Visibility and requirement of every field and section of the form for the
+    given answers, from the `visible_if` / `required_if` rules.
+    """
+    evaluation = _evaluate_form(db, form_id, request.custom_data)
+    return {
+        "fields": evaluation.fields(),
+        "sections": evaluation.sections(),
+        "missing": evaluation.missing(),
+        "hidden": evaluation.hidden_fields(),
+    }
+
+# --- Change Feed ---
+
+@app.get("/api/changes", response_model=schemas.ChangeFeed)
+async def get_changes(
+    since: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=30),
+    db: Session = Depends(get_db),
+):
+    """
+    Outbox events after sequence number `since`, oldest first.
+    With `wait` > 0 the request long-polls until an event arrives or the wait expires.
+    """
+    from src.infrastructure.events.change_feed import wait_for_changes
+
+    changes = await wait_for_changes(db, since, limit, wait)
+    next_since = changes[-1].seq if changes else since
+    return {"changes": changes, "next_since": next_since}
+
+# --- Admission Control ---
+
+@app.get("/api/admission/metrics")
+def get_admission_metrics():
+    """In-flight requests, queue depth and rejection counters per lane."""
+    return admission_controller.metrics()
+
 # --- Analytics Endpoints ---
 
+def _compute_field_stats(db: Session):
+    from src.application.use_cases.compute_field_stats import ComputeFieldStats
+
+    from src.infrastructure.mappers.field_definition_mapper import FieldDefinitionMapper
+
+    # Get all active fields, as plain entities rather than ORM instances
+    fields = FieldDefinitionMapper.from_rows(
+        db.execute(
+            select(*FieldDefinitionMapper.COLUMNS).where(
+                models.CustomFieldDefinition.is_active == True
+            )
+        )
+    )
+
+    upgrade = UpgradeCustomData(FieldRevisionRepository(db).list_for_entity("person"))
+
+    # Only the JSON columns are needed, read in batches off a server-side cursor
+    custom_data_rows = (
+        upgrade.execute(custom_data, schema_revision)
+        for (custom_data, schema_revision) in db.query(
+            models.Person.custom_data, models.Person.schema_revision
+        ).yield_per(STREAM_BATCH_SIZE)
+    )
+
+    return ComputeFieldStats().execute(fields, custom_data_rows)
+
+def _compute_tenant_field_stats(tenant: str):
+    db, _ = database.get_replica_session(tenant)
+    if db is None:
+        db = database.get_session(tenant)
+    try:
+        return _compute_field_stats(db)
+    finally:
+        db.close()
+
+# Upper bound on the shards aggregated at once by `?tenants=`; each worker holds one connection
+ANALYTICS_FANOUT_WORKERS = int(os.getenv("ANALYTICS_FANOUT_WORKERS", "8"))
+
 @app.get("/api/analytics/field-stats")
-def get_field_stats(db: Session = Depends(get_db)):
+def get_field_stats(tenants: Optional[str] = None, db: Session = Depends(get_read_db)):
     """
     Aggregate statistics for dynamic fields across all people.
     Returns value counts for select/multiselect fields and stats for numeric fields.
+
+    `tenants` fans the aggregation out across shards in parallel and merges the
+    results: a comma-separated list of tenant ids, or `*` for every known tenant.
     """
-    # Get all active fields
-    fields = db.query(models.CustomFieldDefinition).filter(
-        models.CustomFieldDefinition.is_active == True
-    ).all()
-    
-    # Get all people with their custom data
-    people = db.query(models.Person).all()
-    
-    stats = []
-    
-    for field in fields:
-        field_stats = {
-            "field_key": field.key_name,
-            "field_label": field.label,
-            "field_type": field.field_type,
-            "total_responses": 0,
-            "value_counts": {},
-            "numeric_stats": None
-        }
-        
-        values = []
-        for person in people:
-            try:
-                custom_data = json.loads(person.custom_data)
-                if field.key_name in custom_data:
-                    value = custom_data[field.key_name]
-                    if value is not None and value != "":
-                        values.append(value)
-            except:
-                continue
-        
-        field_stats["total_responses"] = len(values)
-        
-        # Aggregate based on field type
-        if field.field_type in ['select', 'radio', 'checkbox']:
-            # Count occurrences of each value
-            for value in values:
-                value_str = str(value)
-                field_stats["value_counts"][value_str] = field_stats["value_counts"].get(value_str, 0) + 1
-        
-        elif field.field_type == 'multiselect':
-            # Flatten and count array values
-            for value in values:
-                if isinstance(value, list):
-                    for item in value:
-                        item_str = str(item)
-                        field_stats["value_counts"][item_str] = field_stats["value_counts"].get(item_str, 0) + 1
-        
-        elif field.field_type == 'number':
-            # Calculate numeric statistics
-            numeric_values = []
-            for value in values:
-                try:
-                    numeric_values.append(float(value))
-                except:
-                    continue
-            
-            if numeric_values:
-                field_stats["numeric_stats"] = {
-                    "min": min(numeric_values),
-                    "max": max(numeric_values),
-                    "avg": sum(numeric_values) / len(numeric_values),
-                    "count": len(numeric_values)
-                }
-        
-        stats.append(field_stats)
-    
-    return {
-        "total_people": len(people),
-        "field_stats": stats
-    }
+    if not tenants:
+        return _compute_field_stats(db)
+
+    try:
+        if tenants.strip() == "*":
+            shard_ids = database.known_tenants()
+        else:
+            shard_ids = list(dict.fromkeys(
+                database.resolve_tenant(t) for t in tenants.split(",") if t.strip()
+            ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    from concurrent.futures import ThreadPoolExecutor
+    from src.application.use_cases.compute_field_stats import ComputeFieldStats
+
+    with ThreadPoolExecutor(max_workers=max(min(len(shard_ids), ANALYTICS_FANOUT_WORKERS), 1)) as executor:
+        results = list(executor.map(_compute_tenant_field_stats, shard_ids))
+    return ComputeFieldStats.merge(results)
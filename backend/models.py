@@ -1,7 +1,8 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text, UniqueConstraint, ForeignKey
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, LargeBinary, String, Text, UniqueConstraint, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import json
+from datetime import datetime, timezone
 
 class CustomFieldDefinition(Base):
     __tablename__ = "custom_field_definitions"
@@ -14,11 +15,29 @@ class CustomFieldDefinition(Base):
     options = Column(Text, default="[]") # JSON array of options
     validation_rules = Column(Text, default="{}") # JSON object for validation rules
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, default=1, nullable=False)
 
     __table_args__ = (
         UniqueConstraint('entity_type', 'key_name', name='uix_definitions_entity_key'),
+        # Serves the "active fields of an entity" lookups
+        Index('ix_definitions_entity_active', 'entity_type', 'is_active'),
     )
 
+class FieldDefinitionRevision(Base):
+    """
+    A change to a field definition that requires rewriting stored custom_data
+    (renamed key and/or renamed options). Stored documents are upgraded lazily.
+    """
+    __tablename__ = "field_definition_revisions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    field_id = Column(Integer, ForeignKey('custom_field_definitions.id'), nullable=False, index=True)
+    entity_type = Column(String, nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    old_key_name = Column(String, nullable=False)
+    new_key_name = Column(String, nullable=False)
+    option_renames = Column(Text, default="{}") # JSON object mapping old option -> new option
+
 class FormDefinition(Base):
     __tablename__ = "forms"
     id = Column(Integer, primary_key=True, index=True)
@@ -36,6 +55,7 @@ class Section(Base):
     name = Column(String, nullable=False)
     description = Column(String)
     order_index = Column(Integer, default=0)
+    visible_if = Column(Text, nullable=True) # JSON condition; the section is always shown when NULL
 
     form = relationship("FormDefinition", back_populates="sections")
     fields = relationship("FormFields", back_populates="section")
@@ -62,3 +82,51 @@ class Person(Base):
     email = Column(String, unique=True, index=True)
     # Storing custom data as a JSON string in a TEXT column
     custom_data = Column(Text, default="{}")
+    # Last FieldDefinitionRevision applied to custom_data
+    schema_revision = Column(Integer, default=0, nullable=False)
+
+
+class ChangeEvent(Base):
+    """
+    Outbox row written in the same transaction as the change it describes.
+    `seq` is strictly increasing, so consumers can resume from the last one seen.
+    """
+    __tablename__ = "change_events"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False) # 'person', 'form', 'section', 'form_field', 'field_definition'
+    entity_id = Column(String, nullable=False)
+    operation = Column(String, nullable=False) # 'insert', 'update' or 'delete'
+    payload = Column(Text, default="{}") # JSON snapshot of the row's columns
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Never reuse sequence numbers in SQLite, even after the newest row is deleted
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a write made with an Idempotency-Key header, replayed to retries.
+    Kept compact: the request is stored as a digest and the response compressed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True) # method and path, e.g. 'POST /api/people/'
+    key = Column(String, primary_key=True)
+    request_hash = Column(LargeBinary, nullable=False) # sha256 of the request body
+    status_code = Column(Integer, nullable=True) # NULL while the first request is still running
+    response = Column(LargeBinary, nullable=True) # zlib: content type, newline, body
+    # Epoch seconds
+    locked_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+
+
+class Tenant(Base):
+    """
+    Registry of tenant shards, read from the default database. Without a TENANTS
+    allow-list, only registered tenants can open a shard.
+    """
+    __tablename__ = "tenants"
+
+    id = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -1,6 +1,6 @@
 from typing import List, Optional, Any, Dict
 from pydantic import BaseModel, Json
-from datetime import date
+from datetime import date, datetime
 
 class CustomFieldDefinitionBase(BaseModel):
     entity_type: str
@@ -14,8 +14,18 @@ class CustomFieldDefinitionBase(BaseModel):
 class CustomFieldDefinitionCreate(CustomFieldDefinitionBase):
     pass
 
+class CustomFieldDefinitionUpdate(BaseModel):
+    key_name: Optional[str] = None
+    label: Optional[str] = None
+    field_type: Optional[str] = None
+    options: Optional[Json[List[str]]] = None
+    validation_rules: Optional[Json[Dict[str, Any]]] = None
+    # Rewrites stored answers from an old option value to a new one
+    option_renames: Optional[Json[Dict[str, str]]] = None
+
 class CustomFieldDefinition(CustomFieldDefinitionBase):
     id: int
+    version: int = 1
 
     class Config:
         from_attributes = True
@@ -26,7 +36,9 @@ class PersonBase(BaseModel):
     custom_data: Json[Dict[str, Any]] = '{}'  # Dynamic fields data
 
 class PersonCreate(PersonBase):
-    pass
+    # When set, custom_data is checked against the form's conditional rules:
+    # visible required fields must be answered and hidden fields are dropped
+    form_id: Optional[int] = None
 
 class Person(PersonBase):
     id: int
@@ -34,12 +46,21 @@ class Person(PersonBase):
     class Config:
         from_attributes = True
 
+class PersonSearchResult(Person):
+    rank: float
+
+class PersonSearchPage(BaseModel):
+    total: int
+    results: List[PersonSearchResult]
+
 # Section Schemas
 class SectionBase(BaseModel):
     name: str
     description: Optional[str] = None
     order_index: int = 0
     form_id: int
+    # Condition on the form's answers; see src/domain/services/conditional_logic.py
+    visible_if: Optional[Json[Dict[str, Any]]] = None
 
 class SectionCreate(BaseModel):
     name: str
@@ -48,6 +69,7 @@ class SectionCreate(BaseModel):
     # form_id is optional here because it will be assigned when the form is created
     form_id: Optional[int] = None 
     temp_id: Optional[str] = None # For linking fields in the same request
+    visible_if: Optional[Json[Dict[str, Any]]] = None
 
 class Section(SectionBase):
     id: int
@@ -88,3 +110,39 @@ class Form(FormBase):
     class Config:
         from_attributes = True
 
+
+# Conditional Logic Schemas
+class FormEvaluationRequest(BaseModel):
+    custom_data: Json[Dict[str, Any]]
+
+class FieldState(BaseModel):
+    visible: bool
+    required: bool
+
+class SectionState(BaseModel):
+    visible: bool
+
+class FormEvaluation(BaseModel):
+    fields: Dict[str, FieldState]
+    sections: Dict[int, SectionState]
+    # Visible, required and unanswered
+    missing: List[str]
+    hidden: List[str]
+
+
+# Change Feed Schemas
+class ChangeEvent(BaseModel):
+    seq: int
+    entity_type: str
+    entity_id: str
+    operation: str
+    payload: Json[Dict[str, Any]]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEvent]
+    # Pass back as `since` to continue tailing the feed
+    next_since: int
@@ -7,12 +7,15 @@ class CreateSectionDTO(BaseModel):
     description: Optional[str] = Field(None, max_length=500)
     order: int = Field(ge=0)
     form_id: int
+    visible_if: Optional[str] = None  # JSON condition
 
 
 class UpdateSectionDTO(BaseModel):
     name: Optional[str] = Field(None, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     order: Optional[int] = Field(None, ge=0)
+    # Only applied when set explicitly, so it can also be cleared with None
+    visible_if: Optional[str] = None
 
 
 class SectionResponseDTO(BaseModel):
@@ -21,4 +24,5 @@ class SectionResponseDTO(BaseModel):
     description: Optional[str]
     order: int
     form_id: int
+    visible_if: Optional[str] = None
     field_count: int = 0  # Default to 0, will be implementation specific
@@ -0,0 +1,9 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from src.domain.entities.form_rules import FormRules
+
+
+class IFormRulesRepository(ABC):
+    @abstractmethod
+    def get_by_form(self, form_id: int) -> Optional[FormRules]:
+        pass
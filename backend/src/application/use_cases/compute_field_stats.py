@@ -0,0 +1,118 @@
+import json
+from typing import Any, Dict, Iterable, List
+
+
+class ComputeFieldStats:
+    """
+    Aggregate statistics for dynamic fields in a single pass over the people.
+
+    `custom_data_rows` can be any iterable (e.g. a server-side cursor), so
+    memory use depends on the number of fields, not on the number of people.
+    """
+
+    def execute(self, fields: Iterable[Any], custom_data_rows: Iterable[str]) -> Dict[str, Any]:
+        fields = list(fields)
+        stats = [
+            {
+                "field_key": field.key_name,
+                "field_label": field.label,
+                "field_type": field.field_type,
+                "total_responses": 0,
+                "value_counts": {},
+                "numeric_stats": None,
+            }
+            for field in fields
+        ]
+        numeric = [None] * len(fields)
+
+        total_people = 0
+        for raw in custom_data_rows:
+            total_people += 1
+            try:
+                custom_data = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(custom_data, dict):
+                continue
+
+            for index, field in enumerate(fields):
+                value = custom_data.get(field.key_name)
+                if value is None or value == "":
+                    continue
+                field_stats = stats[index]
+                field_stats["total_responses"] += 1
+                self._accumulate(field.field_type, value, field_stats, numeric, index)
+
+        for index, acc in enumerate(numeric):
+            if acc is not None:
+                stats[index]["numeric_stats"] = {
+                    "min": acc["min"],
+                    "max": acc["max"],
+                    "avg": acc["sum"] / acc["count"],
+                    "count": acc["count"],
+                }
+
+        return {"total_people": total_people, "field_stats": stats}
+
+    @staticmethod
+    def _accumulate(field_type: str, value: Any, field_stats: Dict[str, Any], numeric: List, index: int) -> None:
+        value_counts = field_stats["value_counts"]
+        if field_type in ["select", "radio", "checkbox"]:
+            value_str = str(value)
+            value_counts[value_str] = value_counts.get(value_str, 0) + 1
+
+        elif field_type == "multiselect":
+            if isinstance(value, list):
+                for item in value:
+                    item_str = str(item)
+                    value_counts[item_str] = value_counts.get(item_str, 0) + 1
+
+        elif field_type == "number":
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return
+            acc = numeric[index]
+            if acc is None:
+                numeric[index] = {"min": number, "max": number, "sum": number, "count": 1}
+            else:
+                acc["min"] = min(acc["min"], number)
+                acc["max"] = max(acc["max"], number)
+                acc["sum"] += number
+                acc["count"] += 1
+
+    @staticmethod
+    def merge(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine results computed independently (e.g. one per shard) into one."""
+        total_people = 0
+        merged: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            total_people += result["total_people"]
+            for stats in result["field_stats"]:
+                target = merged.get(stats["field_key"])
+                if target is None:
+                    merged[stats["field_key"]] = {
+                        **stats,
+                        "value_counts": dict(stats["value_counts"]),
+                        "numeric_stats": dict(stats["numeric_stats"]) if stats["numeric_stats"] else None,
+                    }
+                    continue
+
+                target["total_responses"] += stats["total_responses"]
+                for value, count in stats["value_counts"].items():
+                    target["value_counts"][value] = target["value_counts"].get(value, 0) + count
+
+                numeric = stats["numeric_stats"]
+                if numeric is None:
+                    continue
+                current = target["numeric_stats"]
+                if current is None:
+                    target["numeric_stats"] = dict(numeric)
+                    continue
+                count = current["count"] + numeric["count"]
+                current["avg"] = (current["avg"] * current["count"] + numeric["avg"] * numeric["count"]) / count
+                current["min"] = min(current["min"], numeric["min"])
+                current["max"] = max(current["max"], numeric["max"])
+                current["count"] = count
+
+        return {"total_people": total_people, "field_stats": list(merged.values())}
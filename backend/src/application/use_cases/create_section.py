@@ -14,6 +14,7 @@ class CreateSection:
             description=dto.description,
             order=dto.order,
             form_id=dto.form_id,
+            visible_if=dto.visible_if,
         )
 
         section.validate()
@@ -0,0 +1,21 @@
+from typing import Any, Dict
+
+from src.application.ports.form_rules_repository import IFormRulesRepository
+from src.domain.services.conditional_logic import Evaluation, compile_form
+
+
+class EvaluateForm:
+    """
+    Evaluate a form's visibility and conditional requirement rules against a
+    set of answers. Rules are compiled once per form version and cached, so a
+    request only pays for loading the rules and one pass over the graph.
+    """
+
+    def __init__(self, repository: IFormRulesRepository):
+        self.repository = repository
+
+    def execute(self, form_id: int, answers: Dict[str, Any]) -> Evaluation:
+        rules = self.repository.get_by_form(form_id)
+        if rules is None:
+            raise ValueError(f"Form with id {form_id} not found")
+        return compile_form(rules).evaluate(answers)
@@ -18,6 +18,8 @@ class UpdateSection:
             section.description = dto.description
         if dto.order is not None:
             section.order = dto.order
+        if "visible_if" in dto.model_fields_set:
+            section.visible_if = dto.visible_if
 
         section.validate()
         return self.repository.update(section)
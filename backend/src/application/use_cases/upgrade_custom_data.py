@@ -0,0 +1,33 @@
+import json
+from typing import List
+
+from src.domain.entities.field_revision import FieldRevision
+
+
+class UpgradeCustomData:
+    """
+    Bring a stored custom_data document up to the latest field revision.
+
+    Documents already at `head` are returned untouched without being parsed,
+    so reads only pay for documents written before a relevant change.
+    """
+
+    def __init__(self, revisions: List[FieldRevision]):
+        self.revisions = sorted(revisions, key=lambda r: r.id)
+        self.head = self.revisions[-1].id if self.revisions else 0
+
+    def execute(self, custom_data: str, schema_revision: int) -> str:
+        if schema_revision >= self.head:
+            return custom_data
+        try:
+            data = json.loads(custom_data)
+        except (TypeError, ValueError):
+            return custom_data
+        if not isinstance(data, dict):
+            return custom_data
+
+        changed = False
+        for revision in self.revisions:
+            if revision.id > schema_revision:
+                changed = revision.apply(data) or changed
+        return json.dumps(data) if changed else custom_data
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class FieldDefinition:
+    """
+    Representa a definição de um campo personalizado (somente leitura).
+
+    `options` e `validation_rules` são mantidos como o JSON armazenado;
+    só quem precisa dos valores paga o custo de decodificá-los.
+    """
+
+    id: int
+    entity_type: str
+    key_name: str
+    label: str
+    field_type: str
+    options: str
+    validation_rules: str
+    is_active: bool
+    version: int
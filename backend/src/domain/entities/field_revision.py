@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+
+@dataclass(slots=True, frozen=True)
+class FieldRevision:
+    """
+    Representa uma alteração de definição de campo que afeta os dados salvos.
+
+    Regras de Negócio:
+    - Só documentos que contêm a chave antiga são alterados
+    - Renomear a chave preserva o valor salvo
+    - Opções renomeadas são trocadas também dentro de listas (multiselect)
+    """
+
+    id: int
+    field_id: int
+    old_key_name: str
+    new_key_name: str
+    option_renames: Dict[str, str] = field(default_factory=dict)
+
+    def apply(self, custom_data: Dict[str, Any]) -> bool:
+        """Aplica a revisão ao documento; retorna True se ele foi alterado"""
+        if self.old_key_name not in custom_data:
+            return False
+
+        value = custom_data.pop(self.old_key_name)
+        if self.option_renames:
+            if isinstance(value, list):
+                value = [self._rename(item) for item in value]
+            else:
+                value = self._rename(value)
+        custom_data[self.new_key_name] = value
+        return True
+
+    def _rename(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.option_renames.get(value, value)
+        return value
@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(slots=True, frozen=True)
+class FieldRule:
+    """
+    Representa um campo de formulário do ponto de vista da lógica condicional.
+
+    Regras de Negócio:
+    - `validation_rules` é o JSON salvo na definição do campo; as chaves
+      `visible_if` e `required_if` contêm as condições
+    - `is_required` é a obrigatoriedade fixa definida no formulário
+    - Um campo numa seção oculta também fica oculto
+    """
+
+    key_name: str
+    section_id: Optional[int]
+    is_required: bool
+    validation_rules: str
+
+
+@dataclass(slots=True, frozen=True)
+class SectionRule:
+    """Representa a condição de visibilidade de uma seção (JSON ou None)."""
+
+    id: int
+    visible_if: Optional[str]
+
+
+@dataclass(slots=True, frozen=True)
+class FormRules:
+    """
+    Conjunto de regras de um formulário.
+
+    É imutável e comparável por valor: formulários com as mesmas regras
+    compartilham a mesma compilação.
+    """
+
+    fields: Tuple[FieldRule, ...]
+    sections: Tuple[SectionRule, ...]
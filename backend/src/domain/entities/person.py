@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class Person:
+    """
+    Representa uma pessoa cadastrada (somente leitura).
+
+    `custom_data` é o documento JSON armazenado e `schema_revision` a última
+    revisão de campos aplicada a ele.
+    """
+
+    id: int
+    name: str
+    email: str
+    custom_data: str
+    schema_revision: int
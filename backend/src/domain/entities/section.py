@@ -1,8 +1,11 @@
+import json
 from dataclasses import dataclass
 from typing import Optional
 
+from src.domain.services.conditional_logic import RuleError, compile_condition
 
-@dataclass
+
+@dataclass(slots=True)
 class Section:
     """
     Representa uma seção lógica dentro de um formulário.
@@ -11,6 +14,7 @@ class Section:
     - Nome é obrigatório (max 100 chars)
     - Descrição é opcional (max 500 chars)
     - Ordem deve ser única dentro do formulário
+    - Condição de visibilidade (`visible_if`, JSON) é opcional e deve ser válida
     """
 
     id: Optional[int]
@@ -18,6 +22,7 @@ class Section:
     description: Optional[str]
     order: int
     form_id: int
+    visible_if: Optional[str] = None
 
     def validate(self) -> None:
         """Valida regras de negócio da seção"""
@@ -27,3 +32,8 @@ class Section:
             raise ValueError("Section description must be <= 500 chars")
         if self.order < 0:
             raise ValueError("Section order must be >= 0")
+        if self.visible_if is not None:
+            try:
+                compile_condition(json.loads(self.visible_if))
+            except ValueError as e:
+                raise RuleError(f"Section visible_if is invalid: {e}") from e
@@ -0,0 +1,526 @@
+"""
+Lógica condicional de formulários: visibilidade e obrigatoriedade.
+
+Condições são objetos JSON:
+
+    {"field": "country", "op": "eq", "value": "BR"}
+    {"all": [cond, ...]}   {"any": [cond, ...]}   {"not": cond}
+
+Operadores: eq, ne, in, not_in, contains, gt, gte, lt, lte, empty, not_empty.
+Um campo oculto conta como vazio para as condições que dependem dele.
+"""
+import json
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Mapping, Optional, Tuple
+
+from src.domain.entities.form_rules import FormRules
+
+Predicate = Callable[[Mapping[str, Any]], bool]
+
+CONDITION_KEYS = ("visible_if", "required_if")
+MAX_CONDITION_DEPTH = 32
+
+
+class RuleError(ValueError):
+    """Condição mal formada ou dependência circular entre regras."""
+
+
+def is_empty(value: Any) -> bool:
+    """Resposta ausente: None, texto vazio ou lista vazia"""
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _matches(answer: Any, options: tuple) -> bool:
+    # Multiselect answers match when any selected option is listed
+    if isinstance(answer, list):
+        return any(item in options for item in answer)
+    return answer in options
+
+
+def _contains(answer: Any, expected: Any) -> bool:
+    if isinstance(answer, list):
+        return expected in answer
+    if isinstance(answer, str) and isinstance(expected, str):
+        return expected in answer
+    return False
+
+
+def _ordering(compare: Callable[[Any, Any], bool]) -> Callable[[Any, float], bool]:
+    def ordered(answer: Any, bound: float) -> bool:
+        if type(answer) is int or type(answer) is float:
+            return compare(answer, bound)
+        answer = _number(answer)
+        return answer is not None and compare(answer, bound)
+    return ordered
+
+
+_ORDERING = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+# Names the generated code may refer to, besides its constants `C`
+_RUNTIME = {
+    "_is_empty": is_empty,
+    "_matches": _matches,
+    "_contains": _contains,
+    **{f"_{op}": _ordering(compare) for op, compare in _ORDERING.items()},
+}
+
+
+def _is_literal(value: Any) -> bool:
+    """Valores cujo repr() é um literal Python equivalente"""
+    if value is None or isinstance(value, (bool, int, str)):
+        return True
+    if isinstance(value, float):
+        return value == value and value not in (float("inf"), float("-inf"))
+    if isinstance(value, tuple):
+        return all(_is_literal(item) for item in value)
+    return False
+
+
+class _Source:
+    """
+    Gera o código Python das condições. Chaves e valores simples entram via
+    repr(); os demais valores ficam em `C`. Nenhum texto do usuário é
+    interpretado como código.
+    """
+
+    def __init__(self):
+        self.constants: List[Any] = []
+
+    def constant(self, value: Any) -> str:
+        if _is_literal(value):
+            return repr(value)
+        self.constants.append(value)
+        return f"C[{len(self.constants) - 1}]"
+
+    def condition(self, rule: Any, refs: set, answer: Callable[[str], str] = None, depth: int = 0) -> str:
+        """
+        Expressão Python da condição. `answer(key)` dá a expressão que lê a
+        resposta de `key`; por padrão `values.get(key)`.
+        """
+        answer = answer or (lambda key: f"values.get({key!r})")
+        if depth > MAX_CONDITION_DEPTH:
+            raise RuleError(f"Conditions may be nested at most {MAX_CONDITION_DEPTH} levels deep")
+        if isinstance(rule, bool):
+            return repr(rule)
+        if not isinstance(rule, dict) or not rule:
+            raise RuleError("A condition must be a non-empty JSON object")
+
+        combinators = [name for name in ("all", "any", "not") if name in rule]
+        if combinators:
+            name = combinators[0]
+            if len(rule) != 1:
+                raise RuleError(f"'{name}' must be the only key of its condition")
+            if name == "not":
+                return f"(not {self.condition(rule['not'], refs, answer, depth + 1)})"
+            children = rule[name]
+            if not isinstance(children, list) or not children:
+                raise RuleError(f"'{name}' needs a non-empty list of conditions")
+            joiner = " and " if name == "all" else " or "
+            return "(" + joiner.join(self.condition(child, refs, answer, depth + 1) for child in children) + ")"
+
+        if "field" not in rule:
+            raise RuleError("A condition needs 'field', 'all', 'any' or 'not'")
+        return self._comparison(rule, refs, answer)
+
+    def _comparison(self, rule: Dict[str, Any], refs: set, answer: Callable[[str], str]) -> str:
+        key = rule["field"]
+        op = rule.get("op", "eq")
+        if not isinstance(key, str) or not key:
+            raise RuleError("Condition 'field' must be a field key")
+        unknown = set(rule) - {"field", "op", "value"}
+        if unknown:
+            raise RuleError(f"Unknown condition keys: {sorted(unknown)}")
+        refs.add(key)
+        value = answer(key)
+
+        if op == "empty":
+            return f"_is_empty({value})"
+        if op == "not_empty":
+            return f"(not _is_empty({value}))"
+        if "value" not in rule:
+            raise RuleError(f"Operator '{op}' needs a 'value'")
+        expected = rule["value"]
+
+        if op == "eq":
+            return f"({value} == {self.constant(expected)})"
+        if op == "ne":
+            return f"({value} != {self.constant(expected)})"
+        if op in ("in", "not_in"):
+            if not isinstance(expected, list):
+                raise RuleError(f"Operator '{op}' needs a list 'value'")
+            test = f"_matches({value}, {self.constant(tuple(expected))})"
+            return test if op == "in" else f"(not {test})"
+        if op == "contains":
+            return f"_contains({value}, {self.constant(expected)})"
+        if op in _ORDERING:
+            bound = _number(expected)
+            if bound is None:
+                raise RuleError(f"Operator '{op}' needs a numeric 'value'")
+            return f"_{op}({value}, {self.constant(bound)})"
+        raise RuleError(f"Unknown operator '{op}'")
+
+    def build(self, source: str, name: str) -> Callable:
+        namespace = dict(_RUNTIME, C=tuple(self.constants))
+        exec(compile(source, f"<form rules: {name}>", "exec"), namespace)
+        return namespace[name]
+
+
+def compile_condition(rule: Any) -> Tuple[Predicate, FrozenSet[str]]:
+    """Compila uma condição; retorna o predicado e as chaves de que ele depende"""
+    source, refs = _Source(), set()
+    expression = source.condition(rule, refs)
+    predicate = source.build(f"def condition(values):\n    return {expression}\n", "condition")
+    return predicate, frozenset(refs)
+
+
+def validate_field_rules(validation_rules: Mapping[str, Any]) -> None:
+    """Rejeita `visible_if`/`required_if` mal formados antes de salvá-los"""
+    for name in CONDITION_KEYS:
+        if validation_rules.get(name) is not None:
+            compile_condition(validation_rules[name])
+
+
+def condition_refs(rule: Any) -> FrozenSet[str]:
+    """Chaves de que uma condição depende, sem compilá-la"""
+    refs: set = set()
+    if rule is not None:
+        _Source().condition(rule, refs)
+    return frozenset(refs)
+
+
+def rename_condition_field(rule: Any, old_key: str, new_key: str) -> Any:
+    """Condição com as referências a `old_key` trocadas por `new_key`"""
+    if not isinstance(rule, dict):
+        return rule
+    renamed = dict(rule)
+    if renamed.get("field") == old_key:
+        renamed["field"] = new_key
+    for name in ("all", "any"):
+        if isinstance(renamed.get(name), list):
+            renamed[name] = [rename_condition_field(child, old_key, new_key) for child in renamed[name]]
+    if "not" in renamed:
+        renamed["not"] = rename_condition_field(renamed["not"], old_key, new_key)
+    return renamed
+
+
+def rename_rule_references(validation_rules: Mapping[str, Any], old_key: str, new_key: str) -> Dict[str, Any]:
+    """`validation_rules` com as condições apontando para a chave renomeada"""
+    renamed = dict(validation_rules)
+    for name in CONDITION_KEYS:
+        if renamed.get(name) is not None:
+            renamed[name] = rename_condition_field(renamed[name], old_key, new_key)
+    return renamed
+
+
+def _load_json(text: Optional[str]) -> Any:
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return None
+
+
+class FormLogic:
+    """
+    Regras de um formulário compiladas num grafo de dependências.
+
+    Os nós (campos e seções) ficam em ordem topológica e viram uma única
+    função Python, então a avaliação completa é uma passada sem interpretar
+    JSON. Alterar uma resposta reavalia só os nós que dependem dela.
+    """
+
+    def __init__(self, rules: FormRules):
+        section_nodes = {section.id: ("section", section.id) for section in rules.sections}
+        # node -> (section node, visible_if, required_if, is_required); conditions already parsed
+        self._nodes: Dict[Hashable, Tuple[Optional[Hashable], Any, Any, bool]] = {}
+        depends_on: Dict[Hashable, FrozenSet[Hashable]] = {}
+        self._source = _Source()
+
+        for section in rules.sections:
+            node = section_nodes[section.id]
+            try:
+                condition = json.loads(section.visible_if) if section.visible_if else None
+            except ValueError as e:
+                raise RuleError(f"Section {section.id}: invalid JSON in visible_if") from e
+            refs = self._check(condition, f"Section {section.id} visible_if")
+            self._nodes[node] = (None, condition, None, False)
+            depends_on[node] = refs
+
+        for field in rules.fields:
+            node = field.key_name
+            conditions = _load_json(field.validation_rules)
+            conditions = conditions if isinstance(conditions, dict) else {}
+            visible_if, required_if = (conditions.get(name) for name in CONDITION_KEYS)
+            refs = self._check(visible_if, f"Field '{node}' visible_if")
+            refs |= self._check(required_if, f"Field '{node}' required_if")
+            parent = section_nodes.get(field.section_id)
+            if parent is not None:
+                refs |= {parent}
+            self._nodes[node] = (parent, visible_if, required_if, field.is_required)
+            depends_on[node] = refs
+
+        # Keys outside the form are plain inputs, not graph nodes
+        # external key -> a node whose rules read it
+        self.inputs: Dict[str, Hashable] = {}
+        for node, edges in depends_on.items():
+            for edge in edges:
+                if edge not in self._nodes:
+                    self.inputs.setdefault(edge, node)
+        depends_on = {
+            node: frozenset(edge for edge in edges if edge in self._nodes)
+            for node, edges in depends_on.items()
+        }
+        self.dependents: Dict[Hashable, List[Hashable]] = {node: [] for node in self._nodes}
+        for node, edges in depends_on.items():
+            for edge in edges:
+                self.dependents[edge].append(node)
+
+        self.order: Tuple[Hashable, ...] = tuple(self._topological_order(depends_on))
+        self.position = {node: index for index, node in enumerate(self.order)}
+        self.fields: Tuple[str, ...] = tuple(node for node in self.order if isinstance(node, str))
+        self._run_all = self._compile_full_pass()
+        self._steps: Dict[Hashable, Callable] = {}
+        self._affected: Dict[str, Tuple[Hashable, ...]] = {}
+
+    def _check(self, condition: Any, where: str) -> FrozenSet[str]:
+        refs: set = set()
+        if condition is not None:
+            try:
+                _Source().condition(condition, refs)
+            except RuleError as e:
+                raise RuleError(f"{where}: {e}") from e
+        return frozenset(refs)
+
+    def _topological_order(self, depends_on: Dict[Hashable, FrozenSet[Hashable]]) -> List[Hashable]:
+        remaining = {node: len(edges) for node, edges in depends_on.items()}
+        ready = [node for node, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for dependent in self.dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(depends_on):
+            raise RuleError(f"Circular rule dependencies: {' -> '.join(map(str, self._cycle(depends_on, remaining)))}")
+        return order
+
+    @staticmethod
+    def _cycle(depends_on: Dict[Hashable, FrozenSet[Hashable]], remaining: Dict[Hashable, int]) -> List[Hashable]:
+        # Every unsorted node still waits on another unsorted node, so walking
+        # those edges must revisit a node; the walk from there is the cycle
+        blocked = {node for node, count in remaining.items() if count > 0}
+        path, seen = [], {}
+        node = min(blocked, key=str)
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = min((edge for edge in depends_on[node] if edge in blocked), key=str)
+        return path[seen[node]:] + [node]
+
+    def _expressions(self, node: Hashable, shown_of: Callable, answer: Callable) -> Tuple[str, Optional[str]]:
+        """Expressões Python da visibilidade e do `required_if` de um nó"""
+        parent, visible_if, required_if, _ = self._nodes[node]
+        refs: set = set()
+        parts = [shown_of(parent)] if parent is not None else []
+        if visible_if is not None:
+            parts.append(self._source.condition(visible_if, refs, answer))
+        parts = [part for part in parts if part != "True"]
+        shown = " and ".join(parts) or "True"
+        if required_if is None:
+            return shown, None
+        return shown, self._source.condition(required_if, refs, answer)
+
+    def _required(self, node: Hashable, shown: str, required_if: Optional[str]) -> str:
+        if not isinstance(node, str):
+            return "False"
+        if self._nodes[node][3]:
+            return shown
+        if required_if is not None:
+            return f"{shown} and {required_if}" if shown != "True" else required_if
+        return "False"
+
+    def _compile_full_pass(self) -> Callable:
+        # Answers and visibilities live in local variables and nodes that are
+        # always visible fold to `True`; results come back as lists in `order`
+        shown_var: Dict[Hashable, str] = {}
+        inputs: Dict[str, str] = {}
+
+        def answer(key: str) -> str:
+            if key in self._nodes:
+                return f"v{self.position[key]}"
+            if key not in inputs:
+                inputs[key] = f"a{len(inputs)}"
+            return inputs[key]
+
+        body = []
+        required = []
+        for index, node in enumerate(self.order):
+            shown, required_if = self._expressions(node, shown_var.__getitem__, answer)
+            if shown != "True":
+                body.append(f"    n{index} = {shown}")
+                shown = f"n{index}"
+            shown_var[node] = shown
+            needed = self._required(node, shown, required_if)
+            if needed not in ("True", "False", shown):
+                body.append(f"    r{index} = {needed}")
+                needed = f"r{index}"
+            required.append(needed)
+            if isinstance(node, str) and self.dependents[node]:
+                value = f"get({node!r})"
+                body.append(f"    v{index} = {value}" if shown == "True" else f"    v{index} = {value} if {shown} else None")
+
+        lines = ["def run_all(answers):", "    get = answers.get"]
+        lines += [f"    {variable} = get({key!r})" for key, variable in inputs.items()]
+        lines += body
+        lines.append(f"    return [{', '.join(shown_var[node] for node in self.order)}], [{', '.join(required)}]")
+        return self._source.build("\n".join(lines) + "\n", "run_all")
+
+    def step(self, node: Hashable) -> Callable:
+        """Função que reavalia um único nó, compilada na primeira vez que é usada"""
+        function = self._steps.get(node)
+        if function is None:
+            index = self.position[node]
+            shown, required_if = self._expressions(
+                node,
+                lambda parent: f"visible[{self.position[parent]}]",
+                lambda key: f"values.get({key!r})",
+            )
+            lines = [
+                "def step(values, answers, visible, required):",
+                f"    visible[{index}] = shown = {shown}",
+                f"    required[{index}] = {self._required(node, 'shown', required_if)}",
+            ]
+            if isinstance(node, str):
+                lines.append(f"    values[{node!r}] = answers.get({node!r}) if shown else None")
+            function = self._steps[node] = self._source.build("\n".join(lines) + "\n", "step")
+        return function
+
+    def affected(self, key: str) -> Tuple[Hashable, ...]:
+        """Nós a reavaliar quando a resposta `key` muda, em ordem topológica"""
+        nodes = self._affected.get(key)
+        if nodes is None:
+            seen = set()
+            pending = [key] if key in self.position else []
+            while pending:
+                node = pending.pop()
+                if node not in seen:
+                    seen.add(node)
+                    pending.extend(self.dependents[node])
+            nodes = tuple(sorted(seen, key=self.position.__getitem__))
+            self._affected[key] = nodes
+        return nodes
+
+    def evaluate(self, answers: Mapping[str, Any]) -> "Evaluation":
+        visible, required = self._run_all(answers)
+        return Evaluation(self, answers, visible, required)
+
+
+class Evaluation:
+    """
+    Estado de visibilidade/obrigatoriedade de um formulário para um conjunto
+    de respostas. `update` altera uma resposta e reavalia só os dependentes.
+
+    `visible` e `required` são indexados pela posição do nó em `logic.order`.
+    """
+
+    def __init__(self, logic: FormLogic, answers: Mapping[str, Any], visible: List[bool], required: List[bool]):
+        self.logic = logic
+        self.answers = dict(answers)
+        self.visible = visible
+        self.required = required
+        self._values: Optional[Dict[str, Any]] = None
+
+    @property
+    def values(self) -> Dict[str, Any]:
+        """Respostas como as condições as veem: campos ocultos valem None"""
+        if self._values is None:
+            values = dict(self.answers)
+            for key in self.hidden_fields():
+                values[key] = None
+            self._values = values
+        return self._values
+
+    def update(self, key: str, value: Any) -> List[Hashable]:
+        """Altera uma resposta; retorna os nós cujo estado mudou"""
+        values, answers, visible, required = self.values, self.answers, self.visible, self.required
+        answers[key] = value
+        values[key] = value
+        logic = self.logic
+        affected = logic.affected(key)
+        if len(affected) > len(logic.order) // 4:
+            # A change near the root of the graph: one full pass is cheaper
+            fresh = logic.evaluate(answers)
+            changed = [
+                node for node, was_visible, was_required, is_visible, is_required
+                in zip(logic.order, visible, required, fresh.visible, fresh.required)
+                if was_visible != is_visible or was_required != is_required
+            ]
+            self.visible, self.required, self._values = fresh.visible, fresh.required, None
+            return changed
+
+        position, step = logic.position, logic.step
+        changed = []
+        for node in affected:
+            index = position[node]
+            before = (visible[index], required[index])
+            step(node)(values, answers, visible, required)
+            if (visible[index], required[index]) != before:
+                changed.append(node)
+        return changed
+
+    def is_visible(self, node: Hashable) -> bool:
+        return self.visible[self.logic.position[node]]
+
+    def is_required(self, key: str) -> bool:
+        return self.required[self.logic.position[key]]
+
+    def fields(self) -> Dict[str, Dict[str, bool]]:
+        position = self.logic.position
+        return {
+            key: {"visible": self.visible[position[key]], "required": self.required[position[key]]}
+            for key in self.logic.fields
+        }
+
+    def sections(self) -> Dict[int, Dict[str, bool]]:
+        return {
+            node[1]: {"visible": shown}
+            for node, shown in zip(self.logic.order, self.visible)
+            if not isinstance(node, str)
+        }
+
+    def hidden_fields(self) -> List[str]:
+        return [node for node, shown in zip(self.logic.order, self.visible) if not shown and isinstance(node, str)]
+
+    def missing(self) -> List[str]:
+        """Campos visíveis e obrigatórios sem resposta"""
+        answers = self.answers
+        return [
+            node for node, needed in zip(self.logic.order, self.required)
+            if needed and is_empty(answers.get(node))
+        ]
+
+    def visible_answers(self) -> Dict[str, Any]:
+        """Respostas sem os campos do formulário que estão ocultos"""
+        hidden = set(self.hidden_fields())
+        return {key: value for key, value in self.answers.items() if key not in hidden}
+
+
+@lru_cache(maxsize=256)
+def compile_form(rules: FormRules) -> FormLogic:
+    """Compila as regras uma vez por versão do formulário (mesmas regras, mesmo grafo)"""
+    return FormLogic(rules)
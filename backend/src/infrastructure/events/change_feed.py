@@ -0,0 +1,33 @@
+import asyncio
+import time
+from typing import List
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import models
+
+# How often a waiting long-poll request checks for new events
+POLL_INTERVAL_SECONDS = 0.2
+
+
+def read_changes(db: Session, since: int, limit: int) -> List[models.ChangeEvent]:
+    return (
+        db.query(models.ChangeEvent)
+        .filter(models.ChangeEvent.seq > since)
+        .order_by(models.ChangeEvent.seq)
+        .limit(limit)
+        .all()
+    )
+
+
+async def wait_for_changes(db: Session, since: int, limit: int, wait: float) -> List[models.ChangeEvent]:
+    """Long-poll: return as soon as there are events after `since`, or after `wait` seconds."""
+    deadline = time.monotonic() + wait
+    while True:
+        changes = await run_in_threadpool(read_changes, db, since, limit)
+        if changes or time.monotonic() >= deadline:
+            return changes
+        # Release the read transaction so the next poll sees new commits
+        await run_in_threadpool(db.rollback)
+        await asyncio.sleep(min(POLL_INTERVAL_SECONDS, max(deadline - time.monotonic(), 0)))
@@ -0,0 +1,143 @@
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, event, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import models
+
+# Events older than this are pruned; consumers must catch up within the window. 0 keeps everything.
+CHANGE_FEED_RETENTION_SECONDS = float(os.getenv("CHANGE_FEED_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Old events are pruned at most this often per database and process
+CHANGE_FEED_PRUNE_SECONDS = float(os.getenv("CHANGE_FEED_PRUNE_SECONDS", "60"))
+PRUNE_BATCH_SIZE = 1000
+# Batches one write may prune; a larger backlog is left for the next intervals
+CHANGE_FEED_PRUNE_MAX_BATCHES = int(os.getenv("CHANGE_FEED_PRUNE_MAX_BATCHES", "5"))
+# pg_advisory_xact_lock key serializing outbox writers on Postgres
+OUTBOX_LOCK_KEY = 0x6F7574626F78  # "outbox"
+
+_last_prune: Dict[Engine, float] = {}
+_prune_lock = threading.Lock()
+
+# Models whose writes are published on the change feed
+TRACKED_ENTITIES = {
+    models.Person: "person",
+    models.FormDefinition: "form",
+    models.Section: "section",
+    models.FormFields: "form_field",
+    models.CustomFieldDefinition: "field_definition",
+}
+
+
+def _entity_id(obj: Any) -> str:
+    identity = inspect(obj).identity or tuple(
+        getattr(obj, column.key) for column in inspect(type(obj)).primary_key
+    )
+    return ":".join(str(part) for part in identity)
+
+
+def _snapshot(obj: Any) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(type(obj)).column_attrs}
+
+
+def _event_row(obj: Any, operation: str) -> Dict[str, Any]:
+    payload = {} if operation == "delete" else _snapshot(obj)
+    return {
+        "entity_type": TRACKED_ENTITIES[type(obj)],
+        "entity_id": _entity_id(obj),
+        "operation": operation,
+        "payload": json.dumps(payload, default=str),
+    }
+
+
+def record_changes(session: Session, flush_context: Any) -> None:
+    """
+    Write one outbox row per tracked insert/update/delete.
+
+    Runs after the flush on the flush's own connection, so the events commit
+    or roll back together with the change itself.
+    """
+    rows: List[Dict[str, Any]] = []
+    for obj in session.new:
+        if type(obj) in TRACKED_ENTITIES:
+            rows.append(_event_row(obj, "insert"))
+    for obj in session.dirty:
+        if type(obj) in TRACKED_ENTITIES and session.is_modified(obj, include_collections=False):
+            rows.append(_event_row(obj, "update"))
+    for obj in session.deleted:
+        if type(obj) in TRACKED_ENTITIES:
+            rows.append(_event_row(obj, "delete"))
+
+    if rows:
+        connection = session.connection()
+        if connection.dialect.name == "postgresql":
+            # Postgres hands out seq values before commit, so a reader could see seq N+1
+            # while N is still uncommitted and move past it for good. Holding this lock
+            # until commit makes seq order match commit order. SQLite already
+            # serializes writers.
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": OUTBOX_LOCK_KEY})
+        connection.execute(insert(models.ChangeEvent), rows)
+        session.info["outbox_written"] = True
+
+
+def prune_changes(
+    engine: Engine, retention: float, batch_size: int = PRUNE_BATCH_SIZE, max_batches: Optional[int] = None,
+) -> int:
+    """
+    Delete events older than `retention` seconds, in short transactions.
+
+    Only the head of the table is read: events are walked in seq order, which
+    follows creation order, and the walk stops at the first one to keep. At
+    most `max_batches` batches are deleted per call.
+    """
+    table = models.ChangeEvent.__table__
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=retention)
+    deleted = 0
+    for _ in itertools.count() if max_batches is None else range(max_batches):
+        with engine.begin() as conn:
+            head = conn.execute(
+                select(table.c.seq, table.c.created_at < cutoff).order_by(table.c.seq).limit(batch_size)
+            ).all()
+            last_expired = None
+            for seq, expired in head:
+                if not expired:
+                    break
+                last_expired = seq
+            if last_expired is None:
+                return deleted
+            deleted += conn.execute(delete(table).where(table.c.seq <= last_expired)).rowcount
+        if last_expired != head[-1][0] or len(head) < batch_size:
+            return deleted
+    return deleted
+
+
+def prune_after_commit(session: Session) -> None:
+    """Prune expired events after a commit that wrote some, at most once per interval."""
+    if not session.info.pop("outbox_written", False) or CHANGE_FEED_RETENTION_SECONDS <= 0:
+        return
+    engine = session.get_bind()
+    now = time.monotonic()
+    with _prune_lock:
+        last = _last_prune.get(engine)
+        if last is not None and now - last < CHANGE_FEED_PRUNE_SECONDS:
+            return
+        _last_prune[engine] = now
+    # Runs in the request thread, so an idle backlog is worked off a few batches per interval
+    prune_changes(engine, CHANGE_FEED_RETENTION_SECONDS, max_batches=CHANGE_FEED_PRUNE_MAX_BATCHES)
+
+
+def _forget_written(session: Session) -> None:
+    session.info.pop("outbox_written", None)
+
+
+def install_outbox() -> None:
+    if not event.contains(Session, "after_flush", record_changes):
+        event.listen(Session, "after_flush", record_changes)
+        event.listen(Session, "after_commit", prune_after_commit)
+        event.listen(Session, "after_rollback", _forget_written)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# Requests admitted at once across all lanes; keep it under the threadpool size (40)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+# Slots only "high" lanes may use, so cheap reads always find room
+ADMISSION_RESERVED_FOR_HIGH = int(os.getenv("ADMISSION_RESERVED_FOR_HIGH", "8"))
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") != "0"
+
+
+@dataclass
+class LaneConfig:
+    concurrency: int
+    queue_size: int
+    timeout: float
+    priority: str = "normal"
+    retry_after: int = 1
+
+
+DEFAULT_LANES: Dict[str, LaneConfig] = {
+    "critical": LaneConfig(concurrency=24, queue_size=200, timeout=5.0, priority="high", retry_after=1),
+    "default": LaneConfig(concurrency=16, queue_size=100, timeout=10.0, priority="normal", retry_after=2),
+    "search": LaneConfig(concurrency=4, queue_size=16, timeout=5.0, priority="low", retry_after=2),
+    "analytics": LaneConfig(concurrency=2, queue_size=4, timeout=10.0, priority="low", retry_after=5),
+}
+
+# (method, path pattern, lane); the first match wins, None means not admission controlled
+DEFAULT_ROUTES: List[Tuple[str, str, Optional[str]]] = [
+    ("*", r"^/api/admission/", None),
+    ("GET", r"^/api/changes$", None),  # long-polls mostly sleep
+    ("GET", r"^/api/analytics/", "analytics"),
+    ("GET", r"^/api/people/search$", "search"),
+    ("GET", r"^/api/forms/\d+$", "critical"),
+    ("GET", r"^/api/forms/\d+/sections/$", "critical"),
+    ("GET", r"^/api/fields/[^/]+$", "critical"),
+]
+
+
+def lanes_from_env() -> Dict[str, LaneConfig]:
+    """Default lanes, with overrides from ADMISSION_LANES, e.g. '{"analytics": {"concurrency": 1}}'."""
+    lanes = {name: LaneConfig(**vars(config)) for name, config in DEFAULT_LANES.items()}
+    overrides = json.loads(os.getenv("ADMISSION_LANES", "{}"))
+    for name, values in overrides.items():
+        if name in lanes:
+            for key, value in values.items():
+                setattr(lanes[name], key, value)
+        else:
+            lanes[name] = LaneConfig(**values)
+    return lanes
+
+
+@dataclass
+class _Lane:
+    name: str
+    config: LaneConfig
+    in_flight: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    max_queue_depth: int = 0
+
+    @property
+    def priority(self) -> int:
+        return PRIORITIES[self.config.priority]
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Per-lane concurrency limits with bounded, time-limited queues.
+
+    A slot is granted when the lane is under its own limit and the global
+    in-flight count is under the limit for the lane's priority: lanes below
+    "high" cannot use the last `reserved_for_high` slots. Freed slots go to
+    waiting requests in priority order.
+    """
+
+    def __init__(
+        self,
+        lanes: Dict[str, LaneConfig],
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        reserved_for_high: int = ADMISSION_RESERVED_FOR_HIGH,
+    ):
+        self.lanes = {name: _Lane(name, config) for name, config in lanes.items()}
+        self.max_concurrency = max_concurrency
+        self.reserved_for_high = min(reserved_for_high, max_concurrency - 1)
+        self.in_flight = 0
+
+    def _global_limit(self, lane: _Lane) -> int:
+        if lane.priority == PRIORITIES["high"]:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_for_high
+
+    def _can_admit(self, lane: _Lane) -> bool:
+        return lane.in_flight < lane.config.concurrency and self.in_flight < self._global_limit(lane)
+
+    def _grant(self, lane: _Lane) -> None:
+        lane.in_flight += 1
+        lane.admitted += 1
+        self.in_flight += 1
+
+    async def acquire(self, name: str) -> None:
+        lane = self.lanes[name]
+        if not lane.waiters and self._can_admit(lane):
+            self._grant(lane)
+            return
+
+        if len(lane.waiters) >= lane.config.queue_size:
+            lane.rejected_queue_full += 1
+            raise Rejected(429, f"Too many '{name}' requests queued", lane.config.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        lane.max_queue_depth = max(lane.max_queue_depth, len(lane.waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), lane.config.timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the timeout fired: keep the slot
+                return
+            waiter.cancel()
+            lane.waiters.remove(waiter)
+            lane.rejected_timeout += 1
+            raise Rejected(503, f"Timed out waiting for a '{name}' slot", lane.config.retry_after)
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if waiter.done():
+                self.release(name)
+            else:
+                waiter.cancel()
+                lane.waiters.remove(waiter)
+            raise
+
+    def release(self, name: str) -> None:
+        lane = self.lanes[name]
+        lane.in_flight -= 1
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for lane in sorted(self.lanes.values(), key=lambda l: l.priority):
+            while lane.waiters and self._can_admit(lane):
+                waiter = lane.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._grant(lane)
+                waiter.set_result(None)
+
+    def metrics(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "reserved_for_high": self.reserved_for_high,
+            "lanes": {
+                lane.name: {
+                    "priority": lane.config.priority,
+                    "concurrency": lane.config.concurrency,
+                    "queue_size": lane.config.queue_size,
+                    "in_flight": lane.in_flight,
+                    "queue_depth": len(lane.waiters),
+                    "max_queue_depth": lane.max_queue_depth,
+                    "admitted": lane.admitted,
+                    "rejected_queue_full": lane.rejected_queue_full,
+                    "rejected_timeout": lane.rejected_timeout,
+                }
+                for lane in self.lanes.values()
+            },
+        }
+
+
+class AdmissionControlMiddleware:
+    """Route each request to its lane and shed load with 429/503 + Retry-After."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        routes: List[Tuple[str, str, Optional[str]]] = DEFAULT_ROUTES,
+        default_lane: str = "default",
+    ):
+        self.app = app
+        self.controller = controller
+        self.routes: List[Tuple[str, Pattern, Optional[str]]] = [
+            (method, re.compile(pattern), lane) for method, pattern, lane in routes
+        ]
+        self.default_lane = default_lane
+
+    def lane_for(self, method: str, path: str) -> Optional[str]:
+        if method == "OPTIONS":
+            return None
+        for route_method, pattern, lane in self.routes:
+            if route_method in ("*", method) and pattern.match(path):
+                return lane
+        return self.default_lane
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        lane = self.lane_for(scope["method"], scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(lane)
+        except Rejected as rejected:
+            await self._reject(send, rejected)
+            return
+
+        try:
+            # Held until the whole body is sent, so streamed responses count too
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane)
+
+    @staticmethod
+    async def _reject(send: Send, rejected: Rejected) -> None:
+        body = json.dumps({"detail": rejected.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,347 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from enum import Enum
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import database
+import models
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+# How long a completed request can be replayed
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A claim not refreshed for this long is presumed dead and can be taken over;
+# running requests refresh theirs every third of it
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+# How long a duplicate waits for the first request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# Expired keys are deleted at most this often per tenant and process
+IDEMPOTENCY_EVICT_SECONDS = float(os.getenv("IDEMPOTENCY_EVICT_SECONDS", "60"))
+MAX_KEY_LENGTH = 255
+
+DEFAULT_ROUTES: List[Tuple[str, str]] = [
+    ("POST", r"^/api/people/?$"),
+    ("POST", r"^/api/forms/?$"),
+]
+
+
+class Outcome(Enum):
+    CLAIMED = "claimed"      # this request runs the write
+    REPLAY = "replay"        # already done, send the stored response
+    PENDING = "pending"      # another request with the key is still running
+    MISMATCH = "mismatch"    # the key was used with a different body
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    content_type: bytes
+    body: bytes
+
+    def pack(self) -> bytes:
+        return zlib.compress(self.content_type + b"\n" + self.body)
+
+    @classmethod
+    def unpack(cls, status_code: int, packed: bytes) -> "StoredResponse":
+        content_type, _, body = zlib.decompress(packed).partition(b"\n")
+        return cls(status_code, content_type, body)
+
+
+class IdempotencyStore:
+    """
+    Idempotency keys in each tenant's database.
+
+    Claiming a key is an INSERT on its primary key, so exactly one request wins
+    even across worker processes sharing the database; the others see the row
+    and replay its response once it is complete.
+    """
+
+    table = models.IdempotencyKey.__table__
+
+    def __init__(
+        self,
+        engine_for: Optional[Callable[[str], Engine]] = None,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        lock_timeout: float = IDEMPOTENCY_LOCK_SECONDS,
+        evict_interval: float = IDEMPOTENCY_EVICT_SECONDS,
+    ):
+        self.engine_for = engine_for or database.get_engine
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.evict_interval = evict_interval
+        self._last_eviction: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, tenant: str, scope: str, key: str, request_hash: bytes) -> Tuple[Outcome, Optional[StoredResponse]]:
+        self._maybe_evict(tenant)
+        engine = self.engine_for(tenant)
+        table = self.table
+        where = (table.c.scope == scope, table.c.key == key)
+        while True:
+            now = time.time()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        scope=scope, key=key, request_hash=request_hash,
+                        locked_at=now, expires_at=now + self.ttl,
+                    ))
+                return Outcome.CLAIMED, None
+            except IntegrityError:
+                pass
+
+            with engine.begin() as conn:
+                row = conn.execute(select(table).where(*where)).first()
+                if row is None:
+                    continue  # deleted in between; try to claim again
+                if row.expires_at <= now:
+                    conn.execute(delete(table).where(*where, table.c.expires_at == row.expires_at))
+                    continue
+                if row.request_hash != request_hash:
+                    return Outcome.MISMATCH, None
+                if row.status_code is not None:
+                    return Outcome.REPLAY, StoredResponse.unpack(row.status_code, row.response)
+                if row.locked_at <= now - self.lock_timeout:
+                    # The first request died without releasing its claim; take it over
+                    taken = conn.execute(
+                        update(table)
+                        .where(*where, table.c.status_code.is_(None), table.c.locked_at == row.locked_at)
+                        .values(locked_at=now)
+                    ).rowcount
+                    if taken:
+                        return Outcome.CLAIMED, None
+                return Outcome.PENDING, None
+
+    def heartbeat(self, tenant: str, scope: str, key: str) -> bool:
+        """Refresh a running claim so it is not taken for a dead one; False if it is gone"""
+        table = self.table
+        with self.engine_for(tenant).begin() as conn:
+            return bool(conn.execute(
+                update(table)
+                .where(table.c.scope == scope, table.c.key == key, table.c.status_code.is_(None))
+                .values(locked_at=time.time())
+            ).rowcount)
+
+    def complete(self, tenant: str, scope: str, key: str, response: StoredResponse) -> None:
+        table = self.table
+        with self.engine_for(tenant).begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.scope == scope, table.c.key == key)
+                .values(status_code=response.status_code, response=response.pack())
+            )
+
+    def release(self, tenant: str, scope: str, key: str) -> None:
+        """Forget a claim whose request failed, so a retry runs it again"""
+        table = self.table
+        with self.engine_for(tenant).begin() as conn:
+            conn.execute(delete(table).where(
+                table.c.scope == scope, table.c.key == key, table.c.status_code.is_(None)
+            ))
+
+    def evict_expired(self, tenant: str) -> int:
+        table = self.table
+        with self.engine_for(tenant).begin() as conn:
+            return conn.execute(delete(table).where(table.c.expires_at <= time.time())).rowcount
+
+    def _maybe_evict(self, tenant: str) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_eviction.get(tenant, 0.0) < self.evict_interval:
+                return
+            self._last_eviction[tenant] = now
+        self.evict_expired(tenant)
+
+
+class IdempotencyMiddleware:
+    """
+    Replay the stored response to retries that carry the same Idempotency-Key,
+    and coalesce concurrent duplicates into a single execution.
+
+    Responses below 500 are stored; server errors release the key so the
+    client's retry runs the write again.
+
+    The response is stored in its own transaction, after the handler has
+    committed the write. If the process dies in between, the write is done
+    but the key stays claimed with no response; once the claim goes
+    `lock_timeout` seconds without a heartbeat, a retry takes it over and runs
+    the write again. A request that is merely slow keeps its claim alive with
+    heartbeats and is never taken over.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: IdempotencyStore,
+        routes: List[Tuple[str, str]] = DEFAULT_ROUTES,
+        wait_timeout: float = IDEMPOTENCY_WAIT_SECONDS,
+        poll_interval: float = 0.05,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.heartbeat_interval = heartbeat_interval or store.lock_timeout / 3
+        self.routes: List[Tuple[str, Pattern]] = [(method, re.compile(pattern)) for method, pattern in routes]
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        # Requests this process is running, so local duplicates wait without polling
+        self._running: Dict[Tuple[str, str, str], asyncio.Event] = {}
+
+    def _applies(self, method: str, path: str) -> bool:
+        return any(method == route_method and pattern.match(path) for route_method, pattern in self.routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._applies(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters."})
+            return
+
+        try:
+            # May look the tenant up in the registry
+            tenant = await run_in_threadpool(database.resolve_tenant, headers.get(database.TENANT_HEADER.lower()))
+        except ValueError:
+            # Let the app reject the tenant as it does for any other request
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        route = f"{scope['method']} {scope['path']}"
+        request_hash = hashlib.sha256(body).digest()
+        running_key = (tenant, route, key)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            outcome, stored = await run_in_threadpool(self.store.claim, tenant, route, key, request_hash)
+            if outcome is Outcome.CLAIMED:
+                break
+            if outcome is Outcome.REPLAY:
+                await _send_stored(send, stored)
+                return
+            if outcome is Outcome.MISMATCH:
+                await _send_json(send, 422, {
+                    "detail": "Idempotency-Key was already used with a different request body."
+                })
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await _send_json(send, 409, {
+                    "detail": "A request with this Idempotency-Key is still in progress."
+                }, retry_after=1)
+                return
+            await self._wait(running_key, remaining)
+
+        await self._run(scope, receive, send, body, tenant, route, key, running_key)
+
+    async def _wait(self, running_key: Tuple[str, str, str], remaining: float) -> None:
+        event = self._running.get(running_key)
+        if event is None:
+            # Not running in this process (or not registered yet): poll the store
+            await asyncio.sleep(min(remaining, self.poll_interval))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _heartbeat(self, tenant: str, route: str, key: str) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await run_in_threadpool(self.store.heartbeat, tenant, route, key)
+            except SQLAlchemyError:
+                pass  # try again on the next beat; the claim has lock_timeout to spare
+
+    async def _run(
+        self, scope: Scope, receive: Receive, send: Send, body: bytes,
+        tenant: str, route: str, key: str, running_key: Tuple[str, str, str],
+    ) -> None:
+        event = self._running[running_key] = asyncio.Event()
+        status_code = None
+        content_type = b"application/json"
+        chunks = []
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The body was read up front; only the disconnect is left to receive
+            return await receive()
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        heartbeat = asyncio.create_task(self._heartbeat(tenant, route, key))
+        try:
+            await self.app(scope, receive_body, capture)
+            completed = status_code is not None and status_code < 500
+        finally:
+            heartbeat.cancel()
+            if completed:
+                response = StoredResponse(status_code, content_type, b"".join(chunks))
+                await run_in_threadpool(self.store.complete, tenant, route, key, response)
+            else:
+                await run_in_threadpool(self.store.release, tenant, route, key)
+            self._running.pop(running_key, None)
+            event.set()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _send_stored(send: Send, stored: StoredResponse) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": stored.status_code,
+        "headers": [
+            (b"content-type", stored.content_type),
+            (b"content-length", str(len(stored.body)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+async def _send_json(send: Send, status_code: int, payload: dict, retry_after: Optional[int] = None) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(retry_after).encode()))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,59 @@
+import os
+import re
+import time
+from typing import List, Pattern, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# After a write, the same client reads from the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+LAST_WRITE_COOKIE = "df_last_write"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Non-GET routes that write nothing, so they must not pin the client to the primary
+READ_ONLY_ROUTES: List[Tuple[str, str]] = [
+    ("POST", r"^/api/forms/\d+/evaluate/?$"),
+]
+
+
+def wrote_recently(request: Request) -> bool:
+    """True if this client made a successful write within the stickiness window."""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+
+class ReadYourWritesMiddleware:
+    """Stamp successful writes with a cookie so the client's next reads stay on the primary."""
+
+    def __init__(self, app: ASGIApp, read_only_routes: List[Tuple[str, str]] = READ_ONLY_ROUTES):
+        self.app = app
+        self.read_only_routes: List[Tuple[str, Pattern]] = [
+            (method, re.compile(pattern)) for method, pattern in read_only_routes
+        ]
+
+    def _writes(self, method: str, path: str) -> bool:
+        if method in SAFE_METHODS:
+            return False
+        return not any(method == route_method and pattern.match(path) for route_method, pattern in self.read_only_routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._writes(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(raw=message["headers"])
+                headers.append(
+                    "set-cookie",
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,38 @@
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import OperationalError
+
+# request.state attributes shared with the read-session dependency
+REPLICA_STATE = "replica"
+PRIMARY_STATE = "read_from_primary"
+
+
+class ReplicaFallbackRoute(APIRoute):
+    """
+    Run a read again on the primary when its replica fails mid-request.
+
+    The read-session dependency records the replica it handed out in
+    `request.state`; an OperationalError from a request that has one marks
+    the replica failed and repeats the handler with `read_from_primary` set.
+    Only the handler is retried: streamed bodies fail after the response has
+    started, so those requests still fail and only later reads fall back.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Response]:
+        handler = super().get_route_handler()
+
+        async def handler_with_fallback(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except OperationalError:
+                replica = getattr(request.state, REPLICA_STATE, None)
+                if replica is None:
+                    raise
+                replica.mark_failed()
+                setattr(request.state, REPLICA_STATE, None)
+                setattr(request.state, PRIMARY_STATE, True)
+                return await handler(request)
+
+        return handler_with_fallback
@@ -0,0 +1,63 @@
+import os
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+T = TypeVar("T")
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched per round-trip from the server-side cursor
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+# Serialized rows are buffered up to this many bytes before being sent
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _iter_chunks(
+    items: Iterable[str], opening: str, separator: str, closing: str, chunk_bytes: int
+) -> Iterator[bytes]:
+    """
+    Group serialized items into chunks of roughly `chunk_bytes`.
+
+    The first item is flushed on its own so time-to-first-byte does not
+    depend on the size of the result.
+    """
+    buffer = [opening]
+    size = len(opening)
+    first = True
+    for item in items:
+        if not first:
+            buffer.append(separator)
+        buffer.append(item)
+        size += len(item) + len(separator)
+        if first or size >= chunk_bytes:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+        first = False
+    buffer.append(closing)
+    yield "".join(buffer).encode("utf-8")
+
+
+def iter_json_array(items: Iterable[str], chunk_bytes: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    return _iter_chunks(items, "[", ",", "]", chunk_bytes)
+
+
+def iter_ndjson(items: Iterable[str], chunk_bytes: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    return _iter_chunks((item + "\n" for item in items), "", "", "", chunk_bytes)
+
+
+def stream_rows(
+    request: Request, rows: Iterable[T], serialize: Callable[[T], str]
+) -> StreamingResponse:
+    """Stream rows as a JSON array, or as NDJSON when the client asks for it."""
+    items = (serialize(row) for row in rows)
+    if wants_ndjson(request):
+        return StreamingResponse(iter_ndjson(items), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(iter_json_array(items), media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,37 @@
+from typing import Iterable, List, Tuple
+
+from src.domain.entities.field_definition import FieldDefinition as FieldDefinitionEntity
+from models import CustomFieldDefinition as FieldDefinitionModel
+
+
+class FieldDefinitionMapper:
+    # Selected in the order of the entity's fields, so rows map positionally
+    COLUMNS = (
+        FieldDefinitionModel.id,
+        FieldDefinitionModel.entity_type,
+        FieldDefinitionModel.key_name,
+        FieldDefinitionModel.label,
+        FieldDefinitionModel.field_type,
+        FieldDefinitionModel.options,
+        FieldDefinitionModel.validation_rules,
+        FieldDefinitionModel.is_active,
+        FieldDefinitionModel.version,
+    )
+
+    @staticmethod
+    def to_entity(model: FieldDefinitionModel) -> FieldDefinitionEntity:
+        return FieldDefinitionEntity(
+            id=model.id,
+            entity_type=model.entity_type,
+            key_name=model.key_name,
+            label=model.label,
+            field_type=model.field_type,
+            options=model.options,
+            validation_rules=model.validation_rules,
+            is_active=model.is_active,
+            version=model.version,
+        )
+
+    @staticmethod
+    def from_rows(rows: Iterable[Tuple]) -> List[FieldDefinitionEntity]:
+        return [FieldDefinitionEntity(*row) for row in rows]
@@ -0,0 +1,16 @@
+import json
+
+from src.domain.entities.field_revision import FieldRevision as FieldRevisionEntity
+from models import FieldDefinitionRevision as FieldRevisionModel
+
+
+class FieldRevisionMapper:
+    @staticmethod
+    def to_entity(model: FieldRevisionModel) -> FieldRevisionEntity:
+        return FieldRevisionEntity(
+            id=model.id,
+            field_id=model.field_id,
+            old_key_name=model.old_key_name,
+            new_key_name=model.new_key_name,
+            option_renames=json.loads(model.option_renames or "{}"),
+        )
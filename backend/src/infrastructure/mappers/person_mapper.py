@@ -0,0 +1,30 @@
+from typing import Iterable, Iterator, Tuple
+
+from src.domain.entities.person import Person as PersonEntity
+from models import Person as PersonModel
+
+
+class PersonMapper:
+    # Selected in the order of the entity's fields, so rows map positionally
+    COLUMNS = (
+        PersonModel.id,
+        PersonModel.name,
+        PersonModel.email,
+        PersonModel.custom_data,
+        PersonModel.schema_revision,
+    )
+
+    @staticmethod
+    def to_entity(model: PersonModel) -> PersonEntity:
+        return PersonEntity(
+            id=model.id,
+            name=model.name,
+            email=model.email,
+            custom_data=model.custom_data,
+            schema_revision=model.schema_revision,
+        )
+
+    @staticmethod
+    def from_rows(rows: Iterable[Tuple]) -> Iterator[PersonEntity]:
+        """Lazily build entities from `COLUMNS` tuples, e.g. straight off a server-side cursor."""
+        return (PersonEntity(*row) for row in rows)
@@ -1,8 +1,20 @@
+from typing import Iterable, List, Tuple
+
 from src.domain.entities.section import Section as SectionEntity
 from models import Section as SectionModel
 
 
 class SectionMapper:
+    # Selected in the order of the entity's fields, so rows map positionally
+    COLUMNS = (
+        SectionModel.id,
+        SectionModel.name,
+        SectionModel.description,
+        SectionModel.order_index,
+        SectionModel.form_id,
+        SectionModel.visible_if,
+    )
+
     @staticmethod
     def to_entity(model: SectionModel) -> SectionEntity:
         return SectionEntity(
@@ -11,8 +23,14 @@ class SectionMapper:
             description=model.description,
             order=model.order_index,
             form_id=model.form_id,
+            visible_if=model.visible_if,
         )
 
+    @staticmethod
+    def from_rows(rows: Iterable[Tuple]) -> List[SectionEntity]:
+        """Build entities straight from `COLUMNS` tuples, without ORM instances."""
+        return [SectionEntity(*row) for row in rows]
+
     @staticmethod
     def to_model(entity: SectionEntity) -> SectionModel:
         return SectionModel(
@@ -21,4 +39,5 @@ class SectionMapper:
             name=entity.name,
             description=entity.description,
             order_index=entity.order,
+            visible_if=entity.visible_if,
         )
@@ -0,0 +1,133 @@
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, false, func, select, update
+from sqlalchemy.engine import Connection
+
+import models
+from src.application.use_cases.upgrade_custom_data import UpgradeCustomData
+from src.domain.entities.field_revision import FieldRevision
+from src.infrastructure.migrations.runner import Backfill, MigrationRunner, migration_jobs
+from src.infrastructure.migrations.versions import PeopleSearchBackfill
+from src.infrastructure.search.people_index import REBUILD_JOB_PREFIX
+
+
+def load_person_upgrade(conn: Connection) -> UpgradeCustomData:
+    revisions = models.FieldDefinitionRevision.__table__
+    rows = conn.execute(
+        select(
+            revisions.c.id, revisions.c.field_id, revisions.c.old_key_name,
+            revisions.c.new_key_name, revisions.c.option_renames,
+        )
+        .where(revisions.c.entity_type == "person")
+        .order_by(revisions.c.id)
+    ).all()
+    return UpgradeCustomData([
+        FieldRevision(
+            id=row.id,
+            field_id=row.field_id,
+            old_key_name=row.old_key_name,
+            new_key_name=row.new_key_name,
+            option_renames=json.loads(row.option_renames or "{}"),
+        )
+        for row in rows
+    ])
+
+
+class CustomDataRevisionJob(Backfill):
+    """
+    Persist field revisions that reads have so far applied on the fly, so
+    documents stop paying the upgrade cost. Documents without the changed
+    keys are only re-stamped.
+
+    Bound to the revisions that existed when it was created: documents are
+    stamped with that head, and revisions added meanwhile are left for the
+    next run.
+    """
+
+    def __init__(self, upgrade: UpgradeCustomData):
+        self.upgrade = upgrade
+
+    def estimate(self, conn: Connection) -> int:
+        people = models.Person.__table__
+        return conn.execute(
+            select(func.count()).select_from(people).where(people.c.schema_revision < self.upgrade.head)
+        ).scalar()
+
+    def run_batch(self, conn: Connection, after_key: int, batch_size: int) -> Tuple[Optional[int], int]:
+        table = models.Person.__table__
+        people = conn.execute(
+            select(table.c.id, table.c.custom_data, table.c.schema_revision)
+            .where(table.c.id > after_key, table.c.schema_revision < self.upgrade.head)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not people:
+            return None, 0
+        conn.execute(
+            update(table)
+            .where(table.c.id == bindparam("person_id"))
+            .values(custom_data=bindparam("new_custom_data"), schema_revision=bindparam("head")),
+            [
+                {
+                    "person_id": person.id,
+                    "new_custom_data": self.upgrade.execute(person.custom_data, person.schema_revision),
+                    "head": self.upgrade.head,
+                }
+                for person in people
+            ],
+        )
+        return people[-1].id, len(people)
+
+
+def revisions_job_name(head: int) -> str:
+    return f"custom_data_revisions@{head}"
+
+
+def persist_revisions(runner: MigrationRunner, max_batches: Optional[int] = None) -> bool:
+    """
+    Rewrite documents that are behind the latest person field revision.
+
+    Safe to run repeatedly (e.g. from cron). The checkpoint is named after the
+    revision head, so an interrupted run resumes and a new rename starts a new run.
+    """
+    with runner.engine.connect() as conn:
+        upgrade = load_person_upgrade(conn)
+    if upgrade.head == 0:
+        runner.progress("No field revisions to persist")
+        return True
+    return runner.run_job(
+        revisions_job_name(upgrade.head),
+        f"Persist custom_data revisions up to {upgrade.head}",
+        CustomDataRevisionJob(upgrade),
+        max_batches=max_batches,
+    )
+
+
+def queued_rebuilds(runner: MigrationRunner) -> List[str]:
+    """Names of the search index rebuilds still to run, oldest first."""
+    jobs = migration_jobs
+    with runner.engine.connect() as conn:
+        return list(conn.execute(
+            select(jobs.c.name)
+            .where(jobs.c.name.like(REBUILD_JOB_PREFIX + "%"), jobs.c.completed == false())
+            .order_by(jobs.c.name)
+        ).scalars())
+
+
+def rebuild_search_index(runner: MigrationRunner, max_batches: Optional[int] = None) -> bool:
+    """
+    Run the newest queued rebuild of the people search index.
+
+    Field changes only queue the rebuild, so this is meant to run from cron or
+    right after such a change. The newest rebuild covers the older ones, which
+    are closed without running.
+    """
+    names = queued_rebuilds(runner)
+    if not names:
+        runner.progress("No search index rebuild queued")
+        return True
+    jobs = migration_jobs
+    with runner.engine.begin() as conn:
+        conn.execute(update(jobs).where(jobs.c.name.in_(names[:-1])).values(completed=True))
+    return runner.run_job(names[-1], "Rebuild the people search index", PeopleSearchBackfill(), max_batches=max_batches)
@@ -0,0 +1,341 @@
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import (
+    Boolean, Column, Integer, MetaData, String, Table, delete, false, insert, inspect, select, text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from database import Base, qualified_name, shard_schema
+
+# Rows handled per backfill transaction, and the pause between transactions
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_THROTTLE_SECONDS = 0.05
+
+# Runner state. Declared as Table objects (outside Base.metadata) so that
+# schema_translate_map puts them in the shard's schema like every other table.
+_state = MetaData()
+schema_version = Table(
+    "schema_version", _state,
+    Column("version", Integer, nullable=False),
+)
+migration_backfills = Table(
+    "migration_backfills", _state,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("last_key", Integer, nullable=False, server_default="0"),
+    Column("processed", Integer, nullable=False, server_default="0"),
+    Column("completed", Boolean, nullable=False, server_default=false()),
+)
+# Checkpoints of repeatable jobs, keyed by a name that changes when there is new work
+migration_jobs = Table(
+    "migration_jobs", _state,
+    Column("name", String, primary_key=True),
+    Column("last_key", Integer, nullable=False, server_default="0"),
+    Column("processed", Integer, nullable=False, server_default="0"),
+    Column("completed", Boolean, nullable=False, server_default=false()),
+)
+
+
+class Backfill(ABC):
+    """
+    A data migration (or repeatable job) processed in small batches ordered by an integer key.
+
+    Every batch runs in its own short transaction together with its checkpoint,
+    so a backfill never holds long locks and resumes where it stopped.
+    """
+
+    @abstractmethod
+    def estimate(self, conn: Connection) -> int:
+        """Rough number of rows to process, for progress reporting."""
+
+    @abstractmethod
+    def run_batch(self, conn: Connection, after_key: int, batch_size: int) -> Tuple[Optional[int], int]:
+        """Process rows with key > after_key; return (last key seen or None when done, rows processed)."""
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    # Fast, idempotent DDL. Receives the engine so it can pick its own transaction mode
+    upgrade: Optional[Callable[[Engine], None]] = None
+    backfill: Optional[Backfill] = None
+
+
+@dataclass
+class BackfillState:
+    version: int
+    last_key: int
+    processed: int
+    completed: bool
+
+
+@dataclass
+class JobState:
+    name: str
+    last_key: int
+    processed: int
+    completed: bool
+
+
+def add_column(engine: Engine, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    columns = [c["name"] for c in inspect(engine).get_columns(table, schema=shard_schema(engine))]
+    if column not in columns:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {qualified_name(engine, table)} ADD COLUMN {ddl}"))
+
+
+def create_index_online(engine: Engine, name: str, table: str, columns: List[str]) -> None:
+    """CREATE INDEX without blocking writes where the database supports it."""
+    column_list = ", ".join(columns)
+    # The index is created in the table's schema
+    target = qualified_name(engine, table)
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target} ({column_list})"))
+    else:
+        schema = shard_schema(engine)
+        # SQLite takes the schema on the index name instead
+        index = f'"{schema}".{name}' if schema else name
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column_list})"))
+
+
+def create_table(engine: Engine, table_name: str) -> None:
+    Base.metadata.tables[table_name].create(bind=engine, checkfirst=True)
+
+
+class MigrationRunner:
+    """
+    Applies versioned migrations and their backfills to one database.
+
+    `schema_version` holds the last migration whose DDL was applied;
+    `migration_backfills` holds one checkpoint per backfill and
+    `migration_jobs` one per run of a repeatable job. All live in the
+    engine's schema when it translates schemas (one schema per tenant).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        migrations: List[Migration],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        throttle: float = DEFAULT_THROTTLE_SECONDS,
+        progress: Callable[[str], None] = print,
+    ):
+        self.engine = engine
+        self.schema = shard_schema(engine)
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.progress = progress
+
+    @property
+    def head(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    # --- state ---
+
+    def _ensure_state_tables(self) -> None:
+        _state.create_all(bind=self.engine, checkfirst=True)
+
+    def current_version(self) -> Optional[int]:
+        """Applied version; 0 for a database that predates migrations, None for an empty one."""
+        try:
+            with self.engine.connect() as conn:
+                version = conn.execute(select(schema_version.c.version)).scalar()
+            if version is not None:
+                return version
+        except DBAPIError:
+            pass
+        return 0 if inspect(self.engine).has_table("people", schema=self.schema) else None
+
+    def _set_version(self, conn: Connection, version: int) -> None:
+        conn.execute(delete(schema_version))
+        conn.execute(insert(schema_version).values(version=version))
+
+    def backfill_state(self, version: int) -> Optional[BackfillState]:
+        table = migration_backfills
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.version, table.c.last_key, table.c.processed, table.c.completed)
+                    .where(table.c.version == version)
+                ).first()
+        except DBAPIError:
+            return None
+        return BackfillState(row[0], row[1], row[2], bool(row[3])) if row else None
+
+    def job_state(self, name: str) -> Optional[JobState]:
+        table = migration_jobs
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.name, table.c.last_key, table.c.processed, table.c.completed)
+                    .where(table.c.name == name)
+                ).first()
+        except DBAPIError:
+            return None
+        return JobState(row[0], row[1], row[2], bool(row[3])) if row else None
+
+    def pending(self) -> List[Migration]:
+        current = self.current_version() or 0
+        return [m for m in self.migrations if m.version > current]
+
+    def pending_backfills(self) -> List[Migration]:
+        current = self.current_version()
+        if current is None:
+            return []
+        result = []
+        for migration in self.migrations:
+            if migration.backfill is None:
+                continue
+            state = self.backfill_state(migration.version)
+            if migration.version > current or state is None or not state.completed:
+                result.append(migration)
+        return result
+
+    # --- schema ---
+
+    def upgrade_schema(self) -> List[int]:
+        """Apply pending DDL steps. New databases are created at head directly."""
+        current = self.current_version()
+        self._ensure_state_tables()
+
+        if current is None:
+            Base.metadata.create_all(bind=self.engine)
+            # The steps are idempotent; this creates what Base.metadata does not
+            # describe (the search index) without relying on app-level hooks
+            for migration in self.migrations:
+                if migration.upgrade is not None:
+                    migration.upgrade(self.engine)
+            with self.engine.begin() as conn:
+                self._set_version(conn, self.head)
+                # Nothing to backfill in an empty database
+                for migration in self.migrations:
+                    if migration.backfill is not None:
+                        self._save_checkpoint(conn, migration.version, 0, 0, completed=True)
+            self.progress(f"Created schema at version {self.head}")
+            return [m.version for m in self.migrations]
+
+        applied = []
+        for migration in self.migrations:
+            if migration.version <= current:
+                continue
+            self.progress(f"Applying {migration.version}: {migration.description}")
+            if migration.upgrade is not None:
+                migration.upgrade(self.engine)
+            with self.engine.begin() as conn:
+                self._set_version(conn, migration.version)
+                if migration.backfill is not None:
+                    self._save_checkpoint(conn, migration.version, 0, 0, completed=False)
+            applied.append(migration.version)
+        return applied
+
+    # --- backfills ---
+
+    def _save_checkpoint(self, conn: Connection, version: int, last_key: int, processed: int, completed: bool) -> None:
+        conn.execute(delete(migration_backfills).where(migration_backfills.c.version == version))
+        conn.execute(insert(migration_backfills).values(
+            version=version, last_key=last_key, processed=processed, completed=completed,
+        ))
+
+    def _save_job_checkpoint(self, conn: Connection, name: str, last_key: int, processed: int, completed: bool) -> None:
+        conn.execute(delete(migration_jobs).where(migration_jobs.c.name == name))
+        conn.execute(insert(migration_jobs).values(
+            name=name, last_key=last_key, processed=processed, completed=completed,
+        ))
+
+    def run_backfill(self, migration: Migration, max_batches: Optional[int] = None) -> bool:
+        """Run (or resume) a backfill; returns True once it has completed."""
+        self._ensure_state_tables()
+        state = self.backfill_state(migration.version) or BackfillState(migration.version, 0, 0, False)
+        if state.completed:
+            return True
+
+        def save(conn: Connection, last_key: int, processed: int, completed: bool) -> None:
+            self._save_checkpoint(conn, migration.version, last_key, processed, completed)
+
+        return self._run_batches(
+            f"Backfill {migration.version}", migration.description, migration.backfill,
+            state.last_key, state.processed, save, max_batches,
+        )
+
+    def run_job(self, name: str, description: str, job: Backfill, max_batches: Optional[int] = None) -> bool:
+        """
+        Run (or resume) a repeatable job; returns True once it has completed.
+        A name that already completed is not run again, so give new work a new name.
+        """
+        self._ensure_state_tables()
+        state = self.job_state(name) or JobState(name, 0, 0, False)
+        if state.completed:
+            return True
+
+        def save(conn: Connection, last_key: int, processed: int, completed: bool) -> None:
+            self._save_job_checkpoint(conn, name, last_key, processed, completed)
+
+        return self._run_batches(f"Job {name}", description, job, state.last_key, state.processed, save, max_batches)
+
+    def _run_batches(
+        self, label: str, description: str, backfill: Backfill, last_key: int, processed: int,
+        save: Callable[[Connection, int, int, bool], None], max_batches: Optional[int],
+    ) -> bool:
+        with self.engine.connect() as conn:
+            total = backfill.estimate(conn)
+        self.progress(f"{label} ({description}): resuming after key {last_key}, ~{total} rows")
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with self.engine.begin() as conn:
+                batch_last_key, count = backfill.run_batch(conn, last_key, self.batch_size)
+                done = batch_last_key is None
+                if not done:
+                    last_key = batch_last_key
+                    processed += count
+                save(conn, last_key, processed, done)
+            if done:
+                self.progress(f"{label}: done, {processed} rows")
+                return True
+            batches += 1
+            self.progress(f"{label}: {processed}/{total} rows (key {last_key})")
+            if self.throttle:
+                # Let request traffic in between batches
+                time.sleep(self.throttle)
+        return False
+
+    def upgrade(self, dry_run: bool = False, schema_only: bool = False) -> None:
+        if dry_run:
+            self.plan()
+            return
+        self.upgrade_schema()
+        if schema_only:
+            return
+        for migration in self.pending_backfills():
+            self.run_backfill(migration)
+
+    def plan(self) -> None:
+        """Print what `upgrade` would do, without changing anything."""
+        current = self.current_version()
+        if current is None:
+            self.progress(f"[dry-run] Empty database: would create schema at version {self.head}")
+            return
+        self.progress(f"[dry-run] Current version {current}, head {self.head}")
+        for migration in self.pending():
+            self.progress(f"[dry-run] Would apply {migration.version}: {migration.description}")
+        for migration in self.pending_backfills():
+            state = self.backfill_state(migration.version)
+            after = state.last_key if state else 0
+            try:
+                with self.engine.connect() as conn:
+                    estimate = migration.backfill.estimate(conn)
+            except DBAPIError:
+                estimate = "?"
+            self.progress(
+                f"[dry-run] Would backfill {migration.version} ({migration.description}) "
+                f"after key {after}: ~{estimate} rows in batches of {self.batch_size}"
+            )
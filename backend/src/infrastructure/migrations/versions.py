@@ -0,0 +1,78 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection, Engine
+
+import models
+from database import qualified_name
+from src.infrastructure.migrations.runner import (
+    Backfill, Migration, add_column, create_index_online, create_table,
+)
+from src.infrastructure.search import people_index
+
+# Every step must be idempotent: databases stamped by older releases may
+# re-run steps whose changes they already have.
+
+
+def _form_fields_section(engine: Engine) -> None:
+    # SQLite resolves REFERENCES within the table's own database; Postgres needs the schema
+    sections = qualified_name(engine, "sections") if engine.dialect.name == "postgresql" else "sections"
+    add_column(engine, "form_fields", "section_id", f"section_id INTEGER REFERENCES {sections}(id)")
+
+
+def _field_lifecycle(engine: Engine) -> None:
+    add_column(engine, "custom_field_definitions", "version", "version INTEGER NOT NULL DEFAULT 1")
+    add_column(engine, "people", "schema_revision", "schema_revision INTEGER NOT NULL DEFAULT 0")
+    create_table(engine, "field_definition_revisions")
+    create_index_online(engine, "ix_definitions_entity_active", "custom_field_definitions", ["entity_type", "is_active"])
+
+
+def _change_events(engine: Engine) -> None:
+    create_table(engine, "change_events")
+
+
+def _people_search(engine: Engine) -> None:
+    with engine.begin() as conn:
+        index = people_index.index_for(conn)
+        if index is not None:
+            index.create(conn)
+
+
+class PeopleSearchBackfill(Backfill):
+    """Index people stored before the search index existed."""
+
+    def estimate(self, conn: Connection) -> int:
+        return conn.execute(select(func.count()).select_from(models.Person.__table__)).scalar()
+
+    def run_batch(self, conn: Connection, after_key: int, batch_size: int) -> Tuple[Optional[int], int]:
+        people = conn.execute(people_index.select_people(after_key, batch_size)).all()
+        if not people:
+            return None, 0
+        people_index.index_people(conn, people)
+        return people[-1].id, len(people)
+
+
+def _section_conditions(engine: Engine) -> None:
+    add_column(engine, "sections", "visible_if", "visible_if TEXT")
+
+
+def _idempotency_keys(engine: Engine) -> None:
+    create_table(engine, "idempotency_keys")
+
+
+def _tenant_registry(engine: Engine) -> None:
+    create_table(engine, "tenants")
+
+
+MIGRATIONS = [
+    Migration(1, "Add form_fields.section_id", upgrade=_form_fields_section),
+    Migration(2, "Field definition versions, revisions and active lookup index", upgrade=_field_lifecycle),
+    Migration(3, "Change feed outbox table", upgrade=_change_events),
+    Migration(4, "People full-text search index", upgrade=_people_search, backfill=PeopleSearchBackfill()),
+    # Was a one-shot backfill; renames keep happening, so this is now the
+    # repeatable `scripts/migrate.py revisions` job (jobs.py)
+    Migration(5, "Persist lazily applied custom_data revisions"),
+    Migration(6, "Add sections.visible_if", upgrade=_section_conditions),
+    Migration(7, "Idempotency key store", upgrade=_idempotency_keys),
+    Migration(8, "Tenant registry", upgrade=_tenant_registry),
+]
@@ -0,0 +1,28 @@
+from typing import List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import FieldDefinitionRevision as FieldRevisionModel
+from src.domain.entities.field_revision import FieldRevision as FieldRevisionEntity
+from src.infrastructure.mappers.field_revision_mapper import FieldRevisionMapper
+
+
+class FieldRevisionRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_for_entity(self, entity_type: str) -> List[FieldRevisionEntity]:
+        db_revisions = (
+            self.db.query(FieldRevisionModel)
+            .filter(FieldRevisionModel.entity_type == entity_type)
+            .order_by(FieldRevisionModel.id)
+            .all()
+        )
+        return [FieldRevisionMapper.to_entity(r) for r in db_revisions]
+
+    def head(self, entity_type: str) -> int:
+        head = (
+            self.db.query(func.max(FieldRevisionModel.id))
+            .filter(FieldRevisionModel.entity_type == entity_type)
+            .scalar()
+        )
+        return head or 0
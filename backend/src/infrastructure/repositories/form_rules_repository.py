@@ -0,0 +1,128 @@
+import json
+from typing import Any, Dict, Optional, Set
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from models import CustomFieldDefinition, FormDefinition, FormFields, Section
+from src.application.ports.form_rules_repository import IFormRulesRepository
+from src.domain.entities.form_rules import FieldRule, FormRules, SectionRule
+
+
+class FormRulesRepository(IFormRulesRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_by_form(self, form_id: int) -> Optional[FormRules]:
+        if self.db.get(FormDefinition, form_id) is None:
+            return None
+        # Column tuples only: the result is the cache key of the compiled rules
+        fields = self.db.execute(
+            select(
+                CustomFieldDefinition.key_name,
+                FormFields.section_id,
+                FormFields.is_required,
+                CustomFieldDefinition.validation_rules,
+            )
+            .join(CustomFieldDefinition, CustomFieldDefinition.id == FormFields.field_id)
+            .where(FormFields.form_id == form_id, CustomFieldDefinition.is_active == True)
+            .order_by(FormFields.order, FormFields.field_id)
+        )
+        sections = self.db.execute(
+            select(Section.id, Section.visible_if)
+            .where(Section.form_id == form_id)
+            .order_by(Section.order_index, Section.id)
+        )
+        return FormRules(
+            fields=tuple(FieldRule(key, section_id, bool(is_required), rules or "{}")
+                         for key, section_id, is_required, rules in fields),
+            sections=tuple(SectionRule(*row) for row in sections),
+        )
+
+
+# Attributes that change the rules graph of the forms a row belongs to
+_RULE_ATTRIBUTES = {
+    CustomFieldDefinition: ("key_name", "validation_rules", "is_active"),
+    Section: ("form_id", "visible_if"),
+    FormFields: ("form_id", "field_id", "section_id"),
+}
+
+
+def _rules_changed(session: Session, obj: Any) -> bool:
+    if obj in session.new:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _RULE_ATTRIBUTES[type(obj)])
+
+
+def _check_known_keys(session: Session, refs: Dict[str, str]) -> None:
+    """refs: referenced key -> where it is referenced"""
+    from src.domain.services.conditional_logic import RuleError
+
+    if not refs:
+        return
+    known = set(session.scalars(
+        select(CustomFieldDefinition.key_name).where(CustomFieldDefinition.key_name.in_(refs))
+    ))
+    for key in sorted(set(refs) - known):
+        raise RuleError(f"{refs[key]} refers to unknown field '{key}'")
+
+
+def check_form_rules(session: Session, flush_context: Any) -> None:
+    """
+    Reject a flush that leaves a form with circular rules or a condition on a
+    field that does not exist, so the write fails instead of every later
+    evaluation of the form.
+    """
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if type(obj) in _RULE_ATTRIBUTES and _rules_changed(session, obj)
+    ]
+    if not changed:
+        return
+
+    from src.domain.services.conditional_logic import (
+        CONDITION_KEYS, RuleError, compile_form, condition_refs,
+    )
+
+    refs: Dict[str, str] = {}
+    form_ids: Set[int] = set()
+    field_ids = []
+    for obj in changed:
+        if isinstance(obj, CustomFieldDefinition):
+            field_ids.append(obj.id)
+            rules = json.loads(obj.validation_rules or "{}")
+            rules = rules if isinstance(rules, dict) else {}
+            for name in CONDITION_KEYS:
+                where = f"Field '{obj.key_name}' {name}"
+                for key in condition_refs(rules.get(name)):
+                    if key == obj.key_name:
+                        raise RuleError(f"Circular rule dependencies: {key} -> {key}")
+                    refs.setdefault(key, where)
+        elif obj.form_id is not None:
+            form_ids.add(obj.form_id)
+    if field_ids:
+        form_ids.update(session.scalars(
+            select(FormFields.form_id).where(FormFields.field_id.in_(field_ids))
+        ))
+
+    repository = FormRulesRepository(session)
+    for form_id in sorted(form_ids):
+        rules = repository.get_by_form(form_id)
+        if rules is None:
+            continue
+        try:
+            logic = compile_form(rules)
+        except RuleError:
+            raise
+        except Exception as e:
+            # A rule set the compiler cannot handle must fail the write as a
+            # rule error, not as a server error from inside the flush
+            raise RuleError(f"Form {form_id}: rules could not be compiled ({e})") from e
+        for key, node in logic.inputs.items():
+            where = f"Field '{node}'" if isinstance(node, str) else f"Section {node[1]} visible_if"
+            refs.setdefault(key, where)
+    _check_known_keys(session, refs)
+
+
+def install_rule_checks() -> None:
+    if not event.contains(Session, "after_flush", check_form_rules):
+        event.listen(Session, "after_flush", check_form_rules)
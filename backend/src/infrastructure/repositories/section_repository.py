@@ -1,4 +1,5 @@
 from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models import Section as SectionModel
 from src.application.ports.section_repository import ISectionRepository
@@ -26,13 +27,13 @@ class SectionRepository(ISectionRepository):
         return None
 
     def list_by_form(self, form_id: int) -> List[SectionEntity]:
-        db_sections = (
-            self.db.query(SectionModel)
-            .filter(SectionModel.form_id == form_id)
+        # Read path: plain column tuples, no ORM instances or identity map entries
+        rows = self.db.execute(
+            select(*SectionMapper.COLUMNS)
+            .where(SectionModel.form_id == form_id)
             .order_by(SectionModel.order_index)
-            .all()
         )
-        return [SectionMapper.to_entity(s) for s in db_sections]
+        return SectionMapper.from_rows(rows)
 
     def update(self, section: SectionEntity) -> SectionEntity:
         db_section = (
@@ -44,6 +45,7 @@ class SectionRepository(ISectionRepository):
         db_section.name = section.name
         db_section.description = section.description
         db_section.order_index = section.order
+        db_section.visible_if = section.visible_if
 
         self.db.commit()
         self.db.refresh(db_section)
@@ -0,0 +1,285 @@
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, event, false, insert, inspect, select, text, union
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import models
+from database import Base, shard_schema
+from src.infrastructure.migrations.runner import migration_jobs
+
+# Column weights: a match on the name ranks above email, which ranks above free-text answers
+NAME_WEIGHT, EMAIL_WEIGHT, CUSTOM_WEIGHT = 10.0, 5.0, 1.0
+# Checkpoint names of queued index rebuilds in migration_jobs; the suffix orders them
+REBUILD_JOB_PREFIX = "search_rebuild@"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _terms(query: str) -> List[str]:
+    return [term.lower() for term in _TERM.findall(query)]
+
+
+def _text_field_keys(conn: Connection) -> List[str]:
+    definitions = models.CustomFieldDefinition.__table__
+    revisions = models.FieldDefinitionRevision.__table__
+    is_text_field = and_(definitions.c.entity_type == "person", definitions.c.field_type == "text")
+    current = select(definitions.c.key_name).where(is_text_field)
+    # Documents not upgraded yet still hold their answers under the field's former keys
+    former = (
+        select(revisions.c.old_key_name)
+        .join(definitions, revisions.c.field_id == definitions.c.id)
+        .where(is_text_field)
+    )
+    return list(conn.execute(union(current, former)).scalars())
+
+
+def _custom_text(custom_data: str, text_keys: Iterable[str]) -> str:
+    try:
+        data = json.loads(custom_data or "{}")
+    except (TypeError, ValueError):
+        return ""
+    if not isinstance(data, dict):
+        return ""
+    return " ".join(str(data[key]) for key in text_keys if data.get(key) not in (None, ""))
+
+
+class SqliteFtsIndex:
+    """SQLite FTS5 table keyed by person id (rowid), ranked with bm25."""
+
+    def __init__(self, schema: Optional[str] = None):
+        # An attached database standing in for the shard's schema
+        self.prefix = f'"{schema}".' if schema else ""
+        self.table = self.prefix + "people_fts"
+
+    def create(self, conn: Connection) -> bool:
+        exists = conn.execute(text(
+            f"SELECT 1 FROM {self.prefix}sqlite_master WHERE type = 'table' AND name = 'people_fts'"
+        )).first()
+        if exists:
+            return False
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+            "name, email, custom_text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        return True
+
+    def drop(self, conn: Connection) -> None:
+        conn.execute(text(f"DROP TABLE IF EXISTS {self.table}"))
+
+    def upsert(self, conn: Connection, rows: List[Dict[str, Any]]) -> None:
+        self.delete(conn, [row["id"] for row in rows])
+        conn.execute(text(
+            f"INSERT INTO {self.table} (rowid, name, email, custom_text) "
+            "VALUES (:id, :name, :email, :custom_text)"
+        ), rows)
+
+    def delete(self, conn: Connection, person_ids: List[int]) -> None:
+        conn.execute(text(f"DELETE FROM {self.table} WHERE rowid = :id"), [{"id": i} for i in person_ids])
+
+    def search(self, conn: Connection, terms: List[str], limit: int, offset: int) -> Tuple[int, List[Tuple[int, float]]]:
+        # Every term must match, each as a prefix ("ana sil" finds "Ana Silva")
+        match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+        total = conn.execute(
+            text(f"SELECT count(*) FROM {self.table} WHERE people_fts MATCH :match"), {"match": match}
+        ).scalar()
+        hits = conn.execute(text(
+            f"SELECT rowid, bm25(people_fts, :w_name, :w_email, :w_custom) AS score FROM {self.table} "
+            "WHERE people_fts MATCH :match ORDER BY score, rowid LIMIT :limit OFFSET :offset"
+        ), {
+            "match": match, "limit": limit, "offset": offset,
+            "w_name": NAME_WEIGHT, "w_email": EMAIL_WEIGHT, "w_custom": CUSTOM_WEIGHT,
+        }).all()
+        # bm25 is lower-is-better; expose a higher-is-better rank
+        return total, [(person_id, -score) for person_id, score in hits]
+
+
+class PostgresTsvectorIndex:
+    """
+    Weighted tsvector documents in `people_search`, GIN indexed, ranked with ts_rank.
+
+    The SQL is written by hand, so schema_translate_map does not reach it: in
+    schema-per-tenant mode the table is qualified with the shard's schema.
+    """
+
+    _DOCUMENT = (
+        "setweight(to_tsvector('simple', coalesce(:name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(:email, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(:custom_text, '')), 'D')"
+    )
+
+    def __init__(self, schema: Optional[str] = None):
+        self.table = f'"{schema}".people_search' if schema else "people_search"
+
+    def create(self, conn: Connection) -> bool:
+        exists = conn.execute(text("SELECT to_regclass(:table)"), {"table": self.table}).scalar()
+        if exists:
+            return False
+        conn.execute(text(
+            f"CREATE TABLE {self.table} (person_id INTEGER PRIMARY KEY, document tsvector NOT NULL)"
+        ))
+        conn.execute(text(f"CREATE INDEX ix_people_search_document ON {self.table} USING GIN (document)"))
+        return True
+
+    def drop(self, conn: Connection) -> None:
+        conn.execute(text(f"DROP TABLE IF EXISTS {self.table}"))
+
+    def upsert(self, conn: Connection, rows: List[Dict[str, Any]]) -> None:
+        conn.execute(text(
+            f"INSERT INTO {self.table} (person_id, document) VALUES (:id, {self._DOCUMENT}) "
+            "ON CONFLICT (person_id) DO UPDATE SET document = EXCLUDED.document"
+        ), rows)
+
+    def delete(self, conn: Connection, person_ids: List[int]) -> None:
+        conn.execute(text(f"DELETE FROM {self.table} WHERE person_id = :id"), [{"id": i} for i in person_ids])
+
+    def search(self, conn: Connection, terms: List[str], limit: int, offset: int) -> Tuple[int, List[Tuple[int, float]]]:
+        query = " & ".join(term + ":*" for term in terms)
+        total = conn.execute(text(
+            f"SELECT count(*) FROM {self.table} WHERE document @@ to_tsquery('simple', :query)"
+        ), {"query": query}).scalar()
+        hits = conn.execute(text(
+            f"SELECT person_id, ts_rank(document, to_tsquery('simple', :query)) AS score FROM {self.table} "
+            "WHERE document @@ to_tsquery('simple', :query) "
+            "ORDER BY score DESC, person_id LIMIT :limit OFFSET :offset"
+        ), {"query": query, "limit": limit, "offset": offset}).all()
+        return total, [(person_id, float(score)) for person_id, score in hits]
+
+
+def index_for(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        return PostgresTsvectorIndex(shard_schema(conn))
+    if conn.dialect.name == "sqlite":
+        return SqliteFtsIndex(shard_schema(conn))
+    return None
+
+
+def _rows(conn: Connection, people: Iterable[Any]) -> List[Dict[str, Any]]:
+    text_keys = _text_field_keys(conn)
+    return [
+        {
+            "id": person.id,
+            "name": person.name,
+            "email": person.email,
+            "custom_text": _custom_text(person.custom_data, text_keys),
+        }
+        for person in people
+    ]
+
+
+def index_people(conn: Connection, people: Iterable[Any]) -> int:
+    """Add or refresh index entries for rows with id, name, email and custom_data."""
+    index = index_for(conn)
+    people = list(people)
+    if index is None or not people:
+        return 0
+    index.upsert(conn, _rows(conn, people))
+    return len(people)
+
+
+def select_people(after_id: int, limit: int):
+    """A page of people in id order, with the columns the index is built from."""
+    people = models.Person.__table__
+    return (
+        select(people.c.id, people.c.name, people.c.email, people.c.custom_data)
+        .where(people.c.id > after_id)
+        .order_by(people.c.id)
+        .limit(limit)
+    )
+
+
+def queue_rebuild(conn: Connection) -> str:
+    """
+    Queue a rebuild of every person's entry, run in batches by
+    `scripts/migrate.py reindex`. A queued rebuild that has not started yet
+    already covers this change, so it is reused.
+    """
+    jobs = migration_jobs
+    queued = conn.execute(
+        select(jobs.c.name)
+        .where(jobs.c.name.like(REBUILD_JOB_PREFIX + "%"), jobs.c.completed == false(), jobs.c.last_key == 0)
+    ).scalar()
+    if queued is not None:
+        return queued
+    name = f"{REBUILD_JOB_PREFIX}{time.time_ns():020d}"
+    conn.execute(insert(jobs).values(name=name, last_key=0, processed=0, completed=False))
+    return name
+
+
+def search_people(db: Session, query: str, limit: int, offset: int) -> Tuple[int, List[Tuple[int, float]]]:
+    """Ranked (person_id, rank) hits for a free-text query, plus the total number of matches."""
+    conn = db.connection()
+    index = index_for(conn)
+    terms = _terms(query)
+    if index is None or not terms:
+        return 0, []
+    return index.search(conn, terms, limit, offset)
+
+
+def _create_index(target: Any, conn: Connection, **kw: Any) -> None:
+    # People stored before the index existed are indexed by the batched
+    # backfill in migration 4, not here
+    index = index_for(conn)
+    if index is not None:
+        index.create(conn)
+        # Where rebuilds are queued, for databases created without the migration runner
+        migration_jobs.create(conn, checkfirst=True)
+
+
+def _drop_index(target: Any, conn: Connection, **kw: Any) -> None:
+    index = index_for(conn)
+    if index is not None:
+        index.drop(conn)
+
+
+def _changes_text_fields(session: Session) -> bool:
+    """Whether this flush adds a person text field or moves a field into or out of `text`."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.CustomFieldDefinition) or obj.entity_type != "person":
+            continue
+        if obj in session.new:
+            if obj.field_type == "text":
+                return True
+            continue
+        history = inspect(obj).attrs.field_type.history
+        if history.has_changes() and "text" in list(history.added) + list(history.deleted):
+            return True
+    return False
+
+
+def sync_people(session: Session, flush_context: Any) -> None:
+    """Keep the index in step with person writes, inside the same transaction."""
+    if _changes_text_fields(session):
+        # Which answers count as text changed for everyone: too much work for
+        # this request, so it is queued. Field renames need nothing here:
+        # former keys stay indexed until documents are upgraded.
+        if index_for(session.connection()) is not None:
+            queue_rebuild(session.connection())
+
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, models.Person) and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, models.Person)]
+    if not changed and not deleted:
+        return
+
+    conn = session.connection()
+    index = index_for(conn)
+    if index is None:
+        return
+    if deleted:
+        index.delete(conn, deleted)
+    if changed:
+        index.upsert(conn, _rows(conn, changed))
+
+
+def install_search_index() -> None:
+    if not event.contains(Base.metadata, "after_create", _create_index):
+        event.listen(Base.metadata, "after_create", _create_index)
+        event.listen(Base.metadata, "before_drop", _drop_index)
+    if not event.contains(Session, "after_flush", sync_people):
+        event.listen(Session, "after_flush", sync_people)
@@ -0,0 +1,161 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from main import app as main_app
+from src.infrastructure.http.admission import (
+    AdmissionController, AdmissionControlMiddleware, LaneConfig,
+)
+
+def _build_app(release_analytics: threading.Event):
+    controller = AdmissionController(
+        {
+            "critical": LaneConfig(concurrency=8, queue_size=50, timeout=5.0, priority="high"),
+            "default": LaneConfig(concurrency=4, queue_size=10, timeout=5.0),
+            "analytics": LaneConfig(concurrency=2, queue_size=2, timeout=0.5, priority="low", retry_after=7),
+        },
+        max_concurrency=4,
+        reserved_for_high=2,
+    )
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=controller)
+
+    # Sync handlers run in the threadpool, like the real endpoints
+    @app.get("/api/analytics/field-stats")
+    def slow_stats():
+        release_analytics.wait(10)
+        return {"ok": True}
+
+    @app.get("/api/forms/{form_id}")
+    def get_form(form_id: int):
+        return {"id": form_id}
+
+    return app, controller
+
+def test_cheap_reads_are_isolated_from_saturated_analytics():
+    release_analytics = threading.Event()
+    app, controller = _build_app(release_analytics)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            analytics = [
+                asyncio.create_task(client.get("/api/analytics/field-stats")) for _ in range(6)
+            ]
+            await asyncio.sleep(0.1)
+
+            # Analytics holds every slot it is allowed; form reads still go straight through
+            started = time.monotonic()
+            forms = await asyncio.gather(*(client.get(f"/api/forms/{i}") for i in range(20)))
+            forms_elapsed = time.monotonic() - started
+            during = controller.metrics()
+
+            # Queued analytics time out, then the running ones are let go
+            await asyncio.sleep(0.7)
+            release_analytics.set()
+            return forms, forms_elapsed, during, await asyncio.gather(*analytics)
+
+    forms, forms_elapsed, during, analytics = asyncio.run(scenario())
+
+    assert [r.status_code for r in forms] == [200] * 20
+    assert forms_elapsed < 2
+
+    assert during["lanes"]["analytics"]["in_flight"] == 2
+    assert during["lanes"]["analytics"]["queue_depth"] == 2
+    assert during["lanes"]["critical"]["admitted"] == 20
+
+    statuses = sorted(r.status_code for r in analytics)
+    assert statuses == [200, 200, 429, 429, 503, 503]
+    assert all(r.headers["retry-after"] == "7" for r in analytics if r.status_code != 200)
+
+    final = controller.metrics()
+    assert final["in_flight"] == 0
+    assert final["lanes"]["analytics"]["rejected_queue_full"] == 2
+    assert final["lanes"]["analytics"]["rejected_timeout"] == 2
+    assert final["lanes"]["analytics"]["max_queue_depth"] == 2
+
+def test_low_priority_lanes_cannot_use_reserved_slots():
+    async def scenario():
+        controller = AdmissionController(
+            {
+                "low": LaneConfig(concurrency=10, queue_size=10, timeout=0.05, priority="low"),
+                "high": LaneConfig(concurrency=10, queue_size=10, timeout=0.05, priority="high"),
+            },
+            max_concurrency=3,
+            reserved_for_high=1,
+        )
+        await controller.acquire("low")
+        await controller.acquire("low")
+        low_rejected = False
+        try:
+            await controller.acquire("low")
+        except Exception:
+            low_rejected = True
+        await controller.acquire("high")
+        return low_rejected, controller.in_flight
+
+    low_rejected, in_flight = asyncio.run(scenario())
+
+    assert low_rejected
+    assert in_flight == 3
+
+def test_freed_slots_go_to_higher_priority_waiters_first():
+    async def scenario():
+        controller = AdmissionController(
+            {
+                "low": LaneConfig(concurrency=10, queue_size=10, timeout=1, priority="low"),
+                "high": LaneConfig(concurrency=10, queue_size=10, timeout=1, priority="high"),
+            },
+            max_concurrency=1,
+            reserved_for_high=0,
+        )
+        order = []
+        await controller.acquire("high")
+
+        async def wait(name):
+            await controller.acquire(name)
+            order.append(name)
+            controller.release(name)
+
+        low = asyncio.create_task(wait("low"))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(wait("high"))
+        await asyncio.sleep(0)
+        controller.release("high")
+        await asyncio.gather(low, high)
+        return order
+
+    assert asyncio.run(scenario()) == ["high", "low"]
+
+def test_main_app_exposes_admission_metrics():
+    client = TestClient(main_app)
+
+    client.get("/api/fields/person")
+    metrics = client.get("/api/admission/metrics").json()
+
+    assert set(metrics["lanes"]) >= {"critical", "default", "search", "analytics"}
+    assert metrics["lanes"]["critical"]["admitted"] >= 1
+    assert metrics["in_flight"] == 0
+
+def test_shed_requests_carry_cors_headers(monkeypatch):
+    client = TestClient(main_app)
+    client.get("/api/admission/metrics")
+    analytics = main.admission_controller.lanes["analytics"]
+    monkeypatch.setattr(analytics, "config", LaneConfig(concurrency=0, queue_size=0, timeout=1.0, retry_after=5))
+
+    response = client.get("/api/analytics/field-stats", headers={"Origin": "http://localhost:5173"})
+
+    # The browser can only read the 429 and its Retry-After if CORS wraps the admission middleware
+    assert response.status_code == 429
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert "Retry-After" in response.headers["access-control-expose-headers"]
+    assert response.headers["retry-after"] == "5"
@@ -0,0 +1,182 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+from src.infrastructure.events import outbox
+from datetime import datetime, timedelta, timezone
+import models
+import json
+import threading
+import time
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("change_feed") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(engine):
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def _tail(since):
+    response = client.get(f"/api/changes?since={since}")
+    assert response.status_code == 200
+    return response.json()
+
+def test_writes_are_recorded_in_order():
+    start = _tail(0)["next_since"]
+
+    field = client.post("/api/fields/", json={
+        "entity_type": "person", "key_name": "team", "label": "Team", "field_type": "text",
+        "options": json.dumps([]), "validation_rules": json.dumps({}),
+    }).json()
+    form = client.post("/api/forms/", json={
+        "name": "Feed Form",
+        "sections": [{"name": "Main", "temp_id": "s1"}],
+        "fields": [{"field_id": field["id"], "section_temp_id": "s1"}],
+    }).json()
+    client.post("/api/people/", json={
+        "name": "Feed Person", "email": "feed@example.com", "custom_data": json.dumps({"team": "a"}),
+    })
+
+    feed = _tail(start)
+
+    events = [(c["entity_type"], c["operation"]) for c in feed["changes"]]
+    assert events == [
+        ("field_definition", "insert"),
+        ("form", "insert"),
+        ("section", "insert"),
+        ("form_field", "insert"),
+        ("person", "insert"),
+    ]
+    seqs = [c["seq"] for c in feed["changes"]]
+    assert seqs == sorted(seqs)
+    assert feed["next_since"] == seqs[-1]
+    assert feed["changes"][1]["entity_id"] == str(form["id"])
+    assert feed["changes"][-1]["payload"]["email"] == "feed@example.com"
+    assert feed["changes"][3]["entity_id"] == f"{form['id']}:{field['id']}"
+
+def test_section_use_cases_are_recorded():
+    form_id = client.post("/api/forms/", json={"name": "Sections Feed"}).json()["id"]
+    start = _tail(0)["next_since"]
+
+    section = client.post("/api/sections/", json={"name": "S", "order_index": 0, "form_id": form_id}).json()
+    client.put(f"/api/sections/{section['id']}", json={"name": "S2", "order_index": 0, "form_id": form_id})
+    client.delete(f"/api/sections/{section['id']}")
+
+    changes = _tail(start)["changes"]
+    assert [(c["entity_type"], c["operation"]) for c in changes] == [
+        ("section", "insert"), ("section", "update"), ("section", "delete"),
+    ]
+    assert changes[1]["payload"]["name"] == "S2"
+
+def test_rolled_back_writes_are_not_published():
+    payload = {"name": "Dup", "email": "dup@example.com", "custom_data": json.dumps({})}
+    client.post("/api/people/", json=payload)
+    start = _tail(0)["next_since"]
+
+    assert client.post("/api/people/", json=payload).status_code == 400
+
+    assert _tail(start)["changes"] == []
+
+def test_since_and_limit_page_through_the_feed():
+    first = client.get("/api/changes?since=0&limit=2").json()
+    second = client.get(f"/api/changes?since={first['next_since']}&limit=2").json()
+
+    assert len(first["changes"]) == 2
+    assert second["changes"][0]["seq"] > first["changes"][-1]["seq"]
+
+def test_long_poll_returns_when_a_change_arrives():
+    start = _tail(0)["next_since"]
+
+    def write_later():
+        time.sleep(0.3)
+        db = TestingSessionLocal()
+        db.add(models.Person(name="Late", email="late@example.com", custom_data="{}"))
+        db.commit()
+        db.close()
+
+    writer = threading.Thread(target=write_later)
+    writer.start()
+    started = time.monotonic()
+    feed = client.get(f"/api/changes?since={start}&wait=10").json()
+    elapsed = time.monotonic() - started
+    writer.join()
+
+    assert [c["payload"]["email"] for c in feed["changes"]] == ["late@example.com"]
+    assert elapsed < 5
+
+def test_long_poll_times_out_with_empty_batch():
+    start = _tail(0)["next_since"]
+
+    feed = client.get(f"/api/changes?since={start}&wait=0.3").json()
+
+    assert feed == {"changes": [], "next_since": start}
+
+def test_prune_deletes_expired_events_from_the_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/prune.db")
+    models.ChangeEvent.__table__.create(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(models.ChangeEvent.__table__.insert(), [
+            {"entity_type": "person", "entity_id": str(i), "operation": "delete",
+             "created_at": now - timedelta(days=10 if i < 5 else 0)}
+            for i in range(7)
+        ])
+
+    deleted = outbox.prune_changes(engine, retention=24 * 3600, batch_size=2)
+
+    with engine.connect() as conn:
+        kept = [row.entity_id for row in conn.execute(models.ChangeEvent.__table__.select())]
+    assert deleted == 5
+    assert kept == ["5", "6"]
+    engine.dispose()
+
+def test_prune_stops_after_max_batches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/prune.db")
+    models.ChangeEvent.__table__.create(engine)
+    old = datetime.now(timezone.utc) - timedelta(days=10)
+    with engine.begin() as conn:
+        conn.execute(models.ChangeEvent.__table__.insert(), [
+            {"entity_type": "person", "entity_id": str(i), "operation": "delete", "created_at": old}
+            for i in range(7)
+        ])
+
+    first = outbox.prune_changes(engine, retention=24 * 3600, batch_size=2, max_batches=2)
+    rest = outbox.prune_changes(engine, retention=24 * 3600, batch_size=2, max_batches=2)
+
+    assert (first, rest) == (4, 3)
+    engine.dispose()
+
+def test_writes_prune_expired_events(monkeypatch):
+    monkeypatch.setattr(outbox, "CHANGE_FEED_RETENTION_SECONDS", 0.000001)
+    monkeypatch.setattr(outbox, "_last_prune", {})
+    assert _tail(0)["changes"]
+
+    client.post("/api/people/", json={"name": "Pruner", "email": "pruner@example.com", "custom_data": json.dumps({})})
+
+    assert _tail(0)["changes"] == []
@@ -0,0 +1,220 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+import models
+import json
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("conditional_logic") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(engine):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def _create_field(key_name, field_type="text", options=None, rules=None):
+    response = client.post("/api/fields/", json={
+        "entity_type": "person",
+        "key_name": key_name,
+        "label": key_name.title(),
+        "field_type": field_type,
+        "options": json.dumps(options or []),
+        "validation_rules": json.dumps(rules or {}),
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.fixture(scope="module")
+def form():
+    has_car = _create_field("has_car", "radio", ["yes", "no"])
+    plate = _create_field("plate", rules={
+        "visible_if": {"field": "has_car", "op": "eq", "value": "yes"},
+    })
+    age = _create_field("age", "number")
+    guardian = _create_field("guardian", rules={
+        "required_if": {"field": "age", "op": "lt", "value": 18},
+    })
+    company = _create_field("company")
+    response = client.post("/api/forms/", json={
+        "name": "Cadastro",
+        "sections": [
+            {"name": "Pessoal", "order_index": 0, "temp_id": "personal"},
+            {"name": "Trabalho", "order_index": 1, "temp_id": "work",
+             "visible_if": json.dumps({"field": "age", "op": "gte", "value": 16})},
+        ],
+        "fields": [
+            {"field_id": has_car["id"], "section_temp_id": "personal"},
+            {"field_id": plate["id"], "section_temp_id": "personal", "is_required": True},
+            {"field_id": age["id"], "section_temp_id": "personal", "is_required": True},
+            {"field_id": guardian["id"], "section_temp_id": "personal"},
+            {"field_id": company["id"], "section_temp_id": "work", "is_required": True},
+        ],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _evaluate(form_id, answers):
+    response = client.post(f"/api/forms/{form_id}/evaluate", json={"custom_data": json.dumps(answers)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_section_condition_is_stored_and_returned(form):
+    work = next(s for s in form["sections"] if s["name"] == "Trabalho")
+    assert work["visible_if"] == {"field": "age", "op": "gte", "value": 16}
+
+def test_evaluate_hides_fields_and_sections(form):
+    result = _evaluate(form["id"], {"has_car": "no", "age": 12})
+
+    assert result["fields"]["plate"] == {"visible": False, "required": False}
+    assert result["fields"]["guardian"] == {"visible": True, "required": True}
+    work = next(s for s in form["sections"] if s["name"] == "Trabalho")
+    assert result["sections"][str(work["id"])] == {"visible": False}
+    # Fields inherit their section's visibility
+    assert result["fields"]["company"]["visible"] is False
+    assert sorted(result["hidden"]) == ["company", "plate"]
+    assert result["missing"] == ["guardian"]
+
+def test_evaluate_shows_fields_when_conditions_hold(form):
+    result = _evaluate(form["id"], {"has_car": "yes", "age": "30"})
+
+    assert result["fields"]["plate"] == {"visible": True, "required": True}
+    assert result["fields"]["guardian"]["required"] is False
+    assert sorted(result["missing"]) == ["company", "plate"]
+
+def test_evaluate_unknown_form_returns_404():
+    response = client.post("/api/forms/9999/evaluate", json={"custom_data": "{}"})
+    assert response.status_code == 404
+
+def test_create_person_enforces_form_rules(form):
+    response = client.post("/api/people/", json={
+        "name": "Ana", "email": "ana@example.com", "form_id": form["id"],
+        "custom_data": json.dumps({"has_car": "yes", "age": 30}),
+    })
+    assert response.status_code == 422
+    assert sorted(response.json()["detail"]["missing"]) == ["company", "plate"]
+
+def test_create_person_drops_answers_to_hidden_fields(form):
+    response = client.post("/api/people/", json={
+        "name": "Bia", "email": "bia@example.com", "form_id": form["id"],
+        "custom_data": json.dumps({"has_car": "no", "plate": "ABC1234", "age": 40, "company": "ACME", "extra": 1}),
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["custom_data"] == {"has_car": "no", "age": 40, "company": "ACME", "extra": 1}
+
+def test_invalid_rules_are_rejected_on_write():
+    response = client.post("/api/fields/", json={
+        "entity_type": "person", "key_name": "broken", "label": "Broken", "field_type": "text",
+        "options": "[]", "validation_rules": json.dumps({"visible_if": {"field": "x", "op": "near", "value": 1}}),
+    })
+    assert response.status_code == 422
+    assert "near" in response.json()["detail"]
+
+    response = client.post("/api/sections/", json={
+        "name": "S", "form_id": 1, "visible_if": json.dumps({"any": []}),
+    })
+    assert response.status_code == 422
+
+def _field(key_name):
+    db = TestingSessionLocal()
+    try:
+        return db.query(models.CustomFieldDefinition).filter_by(key_name=key_name).one()
+    finally:
+        db.close()
+
+def test_deactivating_the_last_field_leaves_an_empty_form():
+    # Arrange
+    lonely = _create_field("lonely")
+    response = client.post("/api/forms/", json={"name": "Vazio", "fields": [{"field_id": lonely["id"]}]})
+    assert response.status_code == 200, response.text
+    form_id = response.json()["id"]
+
+    # Act
+    deactivated = client.post(f"/api/fields/{lonely['id']}/deactivate")
+    person = client.post("/api/people/", json={
+        "name": "Davi", "email": "davi@example.com", "form_id": form_id, "custom_data": "{}",
+    })
+
+    # Assert
+    assert deactivated.status_code == 200, deactivated.text
+    assert _evaluate(form_id, {}) == {"fields": {}, "sections": {}, "missing": [], "hidden": []}
+    assert person.status_code == 200, person.text
+
+def test_circular_rules_are_rejected_on_write(form):
+    # Arrange
+    has_car = _field("has_car")
+
+    # Act
+    response = client.put(f"/api/fields/{has_car.id}", json={
+        "validation_rules": json.dumps({"visible_if": {"field": "plate", "op": "empty"}}),
+    })
+
+    # Assert
+    assert response.status_code == 422
+    assert "Circular" in response.json()["detail"]
+    assert _field("has_car").validation_rules == has_car.validation_rules
+    assert _evaluate(form["id"], {"has_car": "no", "age": 40})["fields"]["plate"]["visible"] is False
+
+def test_conditions_on_unknown_fields_are_rejected(form):
+    # Arrange
+    work = next(s for s in form["sections"] if s["name"] == "Trabalho")
+
+    # Act
+    field_response = client.post("/api/fields/", json={
+        "entity_type": "person", "key_name": "dangling", "label": "Dangling", "field_type": "text",
+        "options": "[]", "validation_rules": json.dumps({"visible_if": {"field": "nope", "op": "empty"}}),
+    })
+    section_response = client.put(f"/api/sections/{work['id']}", json={
+        "name": "Trabalho", "order_index": 1, "form_id": form["id"],
+        "visible_if": json.dumps({"field": "nope", "op": "empty"}),
+    })
+
+    # Assert
+    assert field_response.status_code == 422
+    assert "unknown field 'nope'" in field_response.json()["detail"]
+    assert section_response.status_code == 422
+    assert "unknown field 'nope'" in section_response.json()["detail"]
+
+def test_renaming_a_field_updates_conditions_that_read_it(form):
+    # Arrange
+    age = _field("age")
+
+    # Act
+    response = client.put(f"/api/fields/{age.id}", json={"key_name": "age_years"})
+
+    # Assert
+    assert response.status_code == 200, response.text
+    assert json.loads(_field("guardian").validation_rules)["required_if"]["field"] == "age_years"
+    sections = client.get(f"/api/forms/{form['id']}/sections/").json()
+    work = next(s for s in sections if s["name"] == "Trabalho")
+    assert work["visible_if"] == {"field": "age_years", "op": "gte", "value": 16}
+    result = _evaluate(form["id"], {"has_car": "no", "age_years": 12})
+    assert result["fields"]["guardian"]["required"] is True
+    assert result["sections"][str(work["id"])] == {"visible": False}
@@ -0,0 +1,139 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+import models
+import json
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("field_lifecycle") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(engine):
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def _create_field(key_name, field_type="select", options=None):
+    response = client.post("/api/fields/", json={
+        "entity_type": "person",
+        "key_name": key_name,
+        "label": key_name.title(),
+        "field_type": field_type,
+        "options": json.dumps(options or []),
+        "validation_rules": json.dumps({}),
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_active_lookup_uses_composite_index(engine):
+    indexes = inspect(engine).get_indexes("custom_field_definitions")
+    assert any(ix["column_names"] == ["entity_type", "is_active"] for ix in indexes)
+
+def test_deactivate_and_reactivate_field():
+    field = _create_field("nickname", field_type="text")
+
+    response = client.post(f"/api/fields/{field['id']}/deactivate")
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+    keys = [f["key_name"] for f in client.get("/api/fields/person").json()]
+    assert "nickname" not in keys
+    keys = [f["key_name"] for f in client.get("/api/fields/person?include_inactive=true").json()]
+    assert "nickname" in keys
+
+    response = client.post(f"/api/fields/{field['id']}/reactivate")
+    assert response.json()["is_active"] is True
+    keys = [f["key_name"] for f in client.get("/api/fields/person").json()]
+    assert "nickname" in keys
+
+def test_update_unknown_field_returns_404():
+    response = client.put("/api/fields/9999", json={"label": "Nope"})
+    assert response.status_code == 404
+
+def test_adding_options_bumps_version_without_revision():
+    field = _create_field("shirt", options=["S", "M"])
+
+    response = client.put(f"/api/fields/{field['id']}", json={"options": json.dumps(["S", "M", "L"])})
+
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.json()["options"] == ["S", "M", "L"]
+    db = TestingSessionLocal()
+    assert db.query(models.FieldDefinitionRevision).filter_by(field_id=field["id"]).count() == 0
+    db.close()
+
+def test_renaming_key_and_options_migrates_documents_lazily():
+    field = _create_field("dept", options=["eng", "hr"])
+    client.post("/api/people/", json={
+        "name": "Ana", "email": "ana@example.com",
+        "custom_data": json.dumps({"dept": "eng"}),
+    })
+    client.post("/api/people/", json={
+        "name": "Bruno", "email": "bruno@example.com",
+        "custom_data": json.dumps({"other": 1}),
+    })
+
+    response = client.put(f"/api/fields/{field['id']}", json={
+        "key_name": "department",
+        "options": json.dumps(["Engineering", "hr"]),
+        "option_renames": json.dumps({"eng": "Engineering"}),
+    })
+    assert response.status_code == 200
+
+    # Stored documents are untouched by the schema change itself
+    db = TestingSessionLocal()
+    stored = db.query(models.Person).filter_by(email="ana@example.com").first()
+    assert json.loads(stored.custom_data) == {"dept": "eng"}
+    db.close()
+
+    # ...but are served in the current shape
+    people = {p["email"]: p for p in client.get("/api/people/").json()}
+    assert people["ana@example.com"]["custom_data"] == {"department": "Engineering"}
+    assert people["bruno@example.com"]["custom_data"] == {"other": 1}
+
+    stats = client.get("/api/analytics/field-stats").json()
+    department = next(s for s in stats["field_stats"] if s["field_key"] == "department")
+    assert department["value_counts"] == {"Engineering": 1}
+
+    # New documents are stamped with the current revision
+    client.post("/api/people/", json={
+        "name": "Carla", "email": "carla@example.com",
+        "custom_data": json.dumps({"department": "hr"}),
+    })
+    db = TestingSessionLocal()
+    carla = db.query(models.Person).filter_by(email="carla@example.com").first()
+    head = db.query(models.FieldDefinitionRevision).order_by(models.FieldDefinitionRevision.id.desc()).first()
+    assert carla.schema_revision == head.id
+    db.close()
+
+def test_renaming_to_existing_key_returns_400():
+    _create_field("city", field_type="text")
+    other = _create_field("town", field_type="text")
+
+    response = client.put(f"/api/fields/{other['id']}", json={"key_name": "city"})
+
+    assert response.status_code == 400
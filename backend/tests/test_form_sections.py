@@ -27,14 +27,14 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 client = TestClient(app)
 
 @pytest.fixture(scope="module", autouse=True)
 def setup_database():
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    app.dependency_overrides.pop(get_db, None)
     Base.metadata.drop_all(bind=engine)
 
 def test_create_form_with_inline_sections():
@@ -102,3 +102,19 @@ def test_create_form_with_inline_sections():
     # We need to find the ID of "Personal Details" section from the response
     personal_section = next(s for s in data["sections"] if s["name"] == "Personal Details")
     assert field_assoc["section_id"] == personal_section["id"]
+
+def test_invalid_section_values_are_rejected_with_422():
+    form_id = client.post("/api/forms/", json={"name": "Section Limits Form"}).json()["id"]
+    section_id = client.post("/api/sections/", json={
+        "name": "Valid", "order_index": 0, "form_id": form_id,
+    }).json()["id"]
+
+    created = client.post("/api/sections/", json={"name": "Negative", "order_index": -1, "form_id": form_id})
+    updated = client.put(f"/api/sections/{section_id}", json={
+        "name": "x" * 101, "order_index": 0, "form_id": form_id,
+    })
+
+    assert created.status_code == 422
+    assert created.json()["detail"][0]["loc"] == ["order"]
+    assert updated.status_code == 422
+    assert updated.json()["detail"][0]["loc"] == ["name"]
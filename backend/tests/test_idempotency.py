@@ -0,0 +1,251 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import hashlib
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import database
+import models
+from main import app
+from src.infrastructure.http.idempotency import (
+    IdempotencyMiddleware, IdempotencyStore, Outcome, StoredResponse,
+)
+import json
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tenant_shard(tmp_path_factory):
+    shard_dir = tmp_path_factory.mktemp("idempotency")
+    patch = pytest.MonkeyPatch()
+    patch.setattr(database, "TENANT_DATABASE_URL_TEMPLATE", f"sqlite:///{shard_dir}/tenant_{{tenant}}.db")
+    patch.setattr(database, "TENANTS", ["idem"])
+    yield shard_dir
+    database.dispose_shards()
+    patch.undo()
+
+def _headers(key=None):
+    headers = {"X-Tenant-ID": "idem"}
+    if key is not None:
+        headers["Idempotency-Key"] = key
+    return headers
+
+def _count(model):
+    db = database.get_session("idem")
+    try:
+        return db.query(model).count()
+    finally:
+        db.close()
+
+def test_retried_person_gets_the_original_response():
+    payload = {"name": "Ana", "email": "ana@example.com", "custom_data": json.dumps({"dept": "eng"})}
+
+    first = client.post("/api/people/", headers=_headers("person-1"), json=payload)
+    retry = client.post("/api/people/", headers=_headers("person-1"), json=payload)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert _count(models.Person) == 1
+    # Without a key the same write hits the unique email as before
+    assert client.post("/api/people/", headers=_headers(), json=payload).status_code == 400
+
+def test_retried_form_is_not_created_twice():
+    payload = {
+        "name": "Onboarding",
+        "sections": [{"name": "Dados", "order_index": 0, "temp_id": "s1"}],
+        "fields": [],
+    }
+
+    first = client.post("/api/forms/", headers=_headers("form-1"), json=payload)
+    retry = client.post("/api/forms/", headers=_headers("form-1"), json=payload)
+
+    assert first.status_code == 200
+    assert retry.json() == first.json()
+    assert _count(models.FormDefinition) == 1
+    assert _count(models.Section) == 1
+
+def test_key_reused_with_another_body_is_rejected():
+    client.post("/api/people/", headers=_headers("person-2"), json={
+        "name": "Bia", "email": "bia@example.com", "custom_data": "{}",
+    })
+
+    response = client.post("/api/people/", headers=_headers("person-2"), json={
+        "name": "Bia", "email": "other@example.com", "custom_data": "{}",
+    })
+
+    assert response.status_code == 422
+    assert _count(models.Person) == 2
+
+def test_overlong_key_is_rejected():
+    response = client.post("/api/people/", headers=_headers("k" * 300), json={
+        "name": "Caio", "email": "caio@example.com", "custom_data": "{}",
+    })
+    assert response.status_code == 400
+
+def test_stored_response_is_compact():
+    db = database.get_session("idem")
+    row = db.get(models.IdempotencyKey, ("POST /api/people/", "person-1"))
+    db.close()
+
+    assert len(row.request_hash) == 32
+    stored = StoredResponse.unpack(row.status_code, row.response)
+    assert json.loads(stored.body)["email"] == "ana@example.com"
+
+def test_replayed_response_is_readable_cross_origin():
+    payload = {"name": "Caio", "email": "caio@example.com", "custom_data": "{}"}
+    headers = {**_headers("person-cors"), "Origin": "http://localhost:5173"}
+
+    client.post("/api/people/", headers=headers, json=payload)
+    retry = client.post("/api/people/", headers=headers, json=payload)
+
+    # CORS wraps the idempotency middleware, so the replay carries its headers too
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert "Idempotent-Replayed" in retry.headers["access-control-expose-headers"]
+
+
+# --- Store and middleware in isolation ---
+
+@pytest.fixture
+def engine_for(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/keys.db", connect_args={"check_same_thread": False})
+    models.IdempotencyKey.__table__.create(bind=engine)
+    yield lambda tenant: engine
+    engine.dispose()
+
+def _separate_process_store(engine_for, **options):
+    # Another worker: its own engine and connection pool on the same database file
+    url = engine_for("default").url
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    return IdempotencyStore(lambda tenant: engine, **options)
+
+def test_claims_are_exclusive_across_processes(engine_for):
+    worker_a = IdempotencyStore(engine_for)
+    worker_b = _separate_process_store(engine_for)
+    digest = hashlib.sha256(b"{}").digest()
+
+    assert worker_a.claim("default", "POST /x", "k", digest) == (Outcome.CLAIMED, None)
+    assert worker_b.claim("default", "POST /x", "k", digest) == (Outcome.PENDING, None)
+
+    worker_a.complete("default", "POST /x", "k", StoredResponse(201, b"application/json", b'{"id": 1}'))
+    outcome, stored = worker_b.claim("default", "POST /x", "k", digest)
+
+    assert outcome is Outcome.REPLAY
+    assert stored == StoredResponse(201, b"application/json", b'{"id": 1}')
+
+def test_stale_claims_are_taken_over_and_expired_keys_evicted(engine_for):
+    digest = hashlib.sha256(b"{}").digest()
+    crashed = IdempotencyStore(engine_for)
+    assert crashed.claim("default", "POST /x", "stale", digest)[0] is Outcome.CLAIMED
+
+    impatient = _separate_process_store(engine_for, lock_timeout=0)
+    assert impatient.claim("default", "POST /x", "stale", digest)[0] is Outcome.CLAIMED
+
+    short_lived = IdempotencyStore(engine_for, ttl=0)
+    short_lived.claim("default", "POST /x", "old", digest)
+    time.sleep(0.01)
+    assert short_lived.evict_expired("default") >= 1
+    assert short_lived.claim("default", "POST /x", "old", digest)[0] is Outcome.CLAIMED
+
+def _build_app(store, fail_first=False, **options):
+    calls = {"count": 0}
+    release = threading.Event()
+    test_app = FastAPI()
+    test_app.add_middleware(
+        IdempotencyMiddleware, store=store, routes=[("POST", r"^/things$")], poll_interval=0.01, **options
+    )
+
+    # Sync handler in the threadpool, like the real endpoints
+    @test_app.post("/things")
+    def create_thing(payload: dict):
+        calls["count"] += 1
+        if fail_first and calls["count"] == 1:
+            raise HTTPException(status_code=503, detail="database unavailable")
+        release.wait(5)
+        return {"id": calls["count"], **payload}
+
+    return test_app, calls, release
+
+def test_concurrent_duplicates_run_once(engine_for):
+    test_app, calls, release = _build_app(IdempotencyStore(engine_for))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=test_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            requests = [
+                asyncio.create_task(http.post("/things", headers={"Idempotency-Key": "same"}, json={"n": 1}))
+                for _ in range(5)
+            ]
+            await asyncio.sleep(0.2)
+            release.set()
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+
+    assert calls["count"] == 1
+    assert {r.status_code for r in responses} == {200}
+    assert {r.text for r in responses} == {'{"id":1,"n":1}'}
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 4
+
+def test_server_errors_release_the_key(engine_for):
+    test_app, calls, release = _build_app(IdempotencyStore(engine_for), fail_first=True)
+    release.set()
+    http = TestClient(test_app)
+
+    first = http.post("/things", headers={"Idempotency-Key": "flaky"}, json={"n": 2})
+    retry = http.post("/things", headers={"Idempotency-Key": "flaky"}, json={"n": 2})
+
+    assert first.status_code == 503
+    assert retry.status_code == 200
+    assert calls["count"] == 2
+
+def test_running_request_keeps_its_claim_past_the_lock_timeout(engine_for):
+    # Two workers; the first one's request runs for several lock timeouts
+    slow_app, slow_calls, slow_release = _build_app(IdempotencyStore(engine_for, lock_timeout=0.3))
+    other_app, other_calls, other_release = _build_app(
+        _separate_process_store(engine_for, lock_timeout=0.3), wait_timeout=5
+    )
+    other_release.set()
+
+    async def scenario():
+        async def post(test_app):
+            transport = httpx.ASGITransport(app=test_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.post("/things", headers={"Idempotency-Key": "slow"}, json={"n": 3})
+
+        first = asyncio.create_task(post(slow_app))
+        await asyncio.sleep(0.2)
+        retry = asyncio.create_task(post(other_app))
+        await asyncio.sleep(0.8)
+        slow_release.set()
+        return await asyncio.gather(first, retry)
+
+    first, retry = asyncio.run(scenario())
+
+    assert slow_calls["count"] == 1
+    assert other_calls["count"] == 0
+    assert retry.text == first.text
+    assert retry.headers["idempotent-replayed"] == "true"
+
+def test_heartbeat_refreshes_only_running_claims(engine_for):
+    store = IdempotencyStore(engine_for)
+    digest = hashlib.sha256(b"{}").digest()
+    store.claim("default", "POST /x", "beat", digest)
+
+    assert store.heartbeat("default", "POST /x", "beat") is True
+
+    store.complete("default", "POST /x", "beat", StoredResponse(200, b"application/json", b"{}"))
+    assert store.heartbeat("default", "POST /x", "beat") is False
+    assert store.heartbeat("default", "POST /x", "missing") is False
@@ -0,0 +1,225 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, inspect, text
+import database
+import models  # noqa: F401
+from src.infrastructure.migrations.runner import MigrationRunner
+from src.infrastructure.migrations.jobs import persist_revisions, revisions_job_name
+from src.infrastructure.migrations.versions import MIGRATIONS
+import json
+import pytest
+
+# Schema as created by the first release, before any migration existed
+LEGACY_SCHEMA = [
+    "CREATE TABLE custom_field_definitions (id INTEGER PRIMARY KEY, entity_type VARCHAR, key_name VARCHAR, "
+    "label VARCHAR, field_type VARCHAR, options TEXT, validation_rules TEXT, is_active BOOLEAN)",
+    "CREATE TABLE forms (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, description VARCHAR)",
+    "CREATE TABLE sections (id INTEGER PRIMARY KEY, form_id INTEGER NOT NULL REFERENCES forms(id), "
+    "name VARCHAR NOT NULL, description VARCHAR, order_index INTEGER)",
+    "CREATE TABLE form_fields (form_id INTEGER REFERENCES forms(id), "
+    "field_id INTEGER REFERENCES custom_field_definitions(id), is_required BOOLEAN, \"order\" INTEGER, "
+    "PRIMARY KEY (form_id, field_id))",
+    "CREATE TABLE people (id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR UNIQUE, custom_data TEXT)",
+]
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def legacy_engine(engine):
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO custom_field_definitions (id, entity_type, key_name, label, field_type, options, "
+            "validation_rules, is_active) VALUES (1, 'person', 'bio', 'Bio', 'text', '[]', '{}', 1)"
+        ))
+        conn.execute(text("INSERT INTO people (id, name, email, custom_data) VALUES (:id, :name, :email, :data)"), [
+            {"id": i, "name": f"Person {i}", "email": f"p{i}@example.com", "data": json.dumps({"bio": f"likes topic{i}"})}
+            for i in range(1, 8)
+        ])
+    return engine
+
+def _runner(engine, messages=None, **kwargs):
+    kwargs.setdefault("throttle", 0)
+    return MigrationRunner(engine, MIGRATIONS, progress=(messages.append if messages is not None else lambda m: None), **kwargs)
+
+def _columns(engine, table):
+    return [c["name"] for c in inspect(engine).get_columns(table)]
+
+def test_schema_version_constant_matches_latest_migration():
+    assert database.SCHEMA_VERSION == max(m.version for m in MIGRATIONS)
+
+def test_empty_database_is_created_at_head(engine):
+    runner = _runner(engine)
+
+    runner.upgrade()
+
+    assert runner.current_version() == runner.head
+    assert runner.pending() == []
+    assert runner.pending_backfills() == []
+    assert "schema_revision" in _columns(engine, "people")
+
+def test_legacy_database_is_migrated_and_backfilled(legacy_engine):
+    runner = _runner(legacy_engine, batch_size=3)
+    assert runner.current_version() == 0
+
+    runner.upgrade()
+
+    assert runner.current_version() == runner.head
+    assert "section_id" in _columns(legacy_engine, "form_fields")
+    assert "version" in _columns(legacy_engine, "custom_field_definitions")
+    assert "schema_revision" in _columns(legacy_engine, "people")
+    indexes = inspect(legacy_engine).get_indexes("custom_field_definitions")
+    assert any(ix["name"] == "ix_definitions_entity_active" for ix in indexes)
+    assert inspect(legacy_engine).has_table("change_events")
+    with legacy_engine.connect() as conn:
+        hits = conn.execute(text("SELECT rowid FROM people_fts WHERE people_fts MATCH 'topic5'")).scalars().all()
+    assert hits == [5]
+    assert runner.pending_backfills() == []
+
+def test_backfill_resumes_from_its_checkpoint(legacy_engine):
+    _runner(legacy_engine).upgrade(schema_only=True)
+    migration = next(m for m in MIGRATIONS if m.version == 4)
+
+    # Interrupted after two batches of two rows
+    finished = _runner(legacy_engine, batch_size=2).run_backfill(migration, max_batches=2)
+    state = _runner(legacy_engine).backfill_state(4)
+
+    assert finished is False
+    assert (state.last_key, state.processed, state.completed) == (4, 4, False)
+
+    messages = []
+    assert _runner(legacy_engine, messages, batch_size=2).run_backfill(migration) is True
+
+    assert "resuming after key 4" in messages[0]
+    state = _runner(legacy_engine).backfill_state(4)
+    assert (state.last_key, state.processed, state.completed) == (7, 7, True)
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM people_fts")).scalar() == 7
+
+def test_backfill_progress_is_reported_per_batch(legacy_engine):
+    messages = []
+
+    _runner(legacy_engine, messages, batch_size=3).upgrade()
+
+    assert any("3/7 rows" in m for m in messages)
+    assert any("Backfill 4: done, 7 rows" in m for m in messages)
+
+def test_dry_run_changes_nothing(legacy_engine):
+    messages = []
+    runner = _runner(legacy_engine, messages)
+
+    runner.upgrade(dry_run=True)
+
+    assert runner.current_version() == 0
+    assert "schema_revision" not in _columns(legacy_engine, "people")
+    assert any("Would apply 1" in m for m in messages)
+    assert any("Would backfill 4" in m for m in messages)
+
+def _add_revision(engine, old_key, new_key):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO field_definition_revisions (field_id, entity_type, version, old_key_name, "
+            "new_key_name, option_renames) VALUES (1, 'person', 2, :old, :new, '{}')"
+        ), {"old": old_key, "new": new_key})
+
+def _people(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT custom_data, schema_revision FROM people ORDER BY id")).all()
+
+def test_revision_job_persists_lazy_upgrades_and_repeats_for_new_renames(legacy_engine):
+    runner = _runner(legacy_engine)
+    runner.upgrade()
+    _add_revision(legacy_engine, "bio", "about")
+
+    assert persist_revisions(runner) is True
+
+    rows = _people(legacy_engine)
+    assert json.loads(rows[0].custom_data) == {"about": "likes topic1"}
+    assert {row.schema_revision for row in rows} == {1}
+
+    # A later rename is picked up by the next run, under a new checkpoint
+    _add_revision(legacy_engine, "about", "summary")
+    assert persist_revisions(runner) is True
+
+    assert json.loads(_people(legacy_engine)[0].custom_data) == {"summary": "likes topic1"}
+    assert runner.job_state(revisions_job_name(1)).completed
+    assert runner.job_state(revisions_job_name(2)).processed == 7
+
+def test_revision_job_resumes_from_its_checkpoint(legacy_engine):
+    _runner(legacy_engine).upgrade()
+    _add_revision(legacy_engine, "bio", "about")
+
+    assert persist_revisions(_runner(legacy_engine, batch_size=2), max_batches=2) is False
+    assert [row.schema_revision for row in _people(legacy_engine)] == [1, 1, 1, 1, 0, 0, 0]
+
+    messages = []
+    assert persist_revisions(_runner(legacy_engine, messages, batch_size=2)) is True
+
+    assert "resuming after key 4" in messages[0]
+    assert {row.schema_revision for row in _people(legacy_engine)} == {1}
+
+def test_ensure_schema_applies_ddl_only(legacy_engine):
+    assert database.ensure_schema(legacy_engine) is True
+    assert database.ensure_schema(legacy_engine) is False
+
+    runner = _runner(legacy_engine)
+    assert runner.current_version() == database.SCHEMA_VERSION
+    assert [m.version for m in runner.pending_backfills()] == [4]
+
+@pytest.fixture
+def tenant_schema_engine(tmp_path):
+    # Schema-per-tenant on SQLite: the tenant's schema is an attached database
+    # and unqualified tables are translated to it, as database._create_shard does
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'main.db'}",
+        execution_options={"schema_translate_map": {None: "tenant_acme"}},
+    )
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{tmp_path / 'tenant_acme.db'}' AS tenant_acme")
+
+    yield engine
+    engine.dispose()
+
+def test_new_tenant_schema_is_created_in_its_own_schema(tmp_path, tenant_schema_engine):
+    # The default schema is already at head; the tenant's schema is empty
+    main_engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    _runner(main_engine).upgrade()
+    runner = _runner(tenant_schema_engine)
+    assert database.current_schema_version(tenant_schema_engine) is None
+    assert runner.current_version() is None
+
+    runner.upgrade()
+
+    assert database.current_schema_version(tenant_schema_engine) == database.SCHEMA_VERSION
+    tables = inspect(tenant_schema_engine).get_table_names(schema="tenant_acme")
+    assert {"people", "people_fts", "schema_version", "migration_backfills"} <= set(tables)
+    assert runner.pending_backfills() == []
+    main_engine.dispose()
+
+def test_legacy_tenant_schema_is_migrated_in_place(tmp_path, tenant_schema_engine):
+    with tenant_schema_engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl.replace("CREATE TABLE ", "CREATE TABLE tenant_acme.", 1)))
+        conn.execute(text("INSERT INTO tenant_acme.people (id, name, email, custom_data) VALUES (1, 'Ana', 'ana@example.com', '{}')"))
+    runner = _runner(tenant_schema_engine)
+    assert runner.current_version() == 0
+
+    runner.upgrade()
+
+    assert runner.current_version() == runner.head
+    tenant = inspect(tenant_schema_engine)
+    assert "section_id" in [c["name"] for c in tenant.get_columns("form_fields", schema="tenant_acme")]
+    assert any(ix["name"] == "ix_definitions_entity_active" for ix in tenant.get_indexes("custom_field_definitions", schema="tenant_acme"))
+    with tenant_schema_engine.connect() as conn:
+        assert conn.execute(text("SELECT rowid FROM tenant_acme.people_fts WHERE people_fts MATCH 'ana'")).scalars().all() == [1]
+        # Nothing leaked into the main database
+        assert conn.execute(text("SELECT count(*) FROM main.sqlite_master")).scalar() == 0
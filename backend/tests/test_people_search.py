@@ -0,0 +1,185 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+import models
+from src.infrastructure.migrations.jobs import queued_rebuilds, rebuild_search_index
+from src.infrastructure.migrations.runner import MigrationRunner
+from src.infrastructure.migrations.versions import MIGRATIONS
+from src.infrastructure.search.people_index import PostgresTsvectorIndex
+import json
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("people_search") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(engine):
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    for key_name, field_type in [("bio", "text"), ("team", "select")]:
+        client.post("/api/fields/", json={
+            "entity_type": "person", "key_name": key_name, "label": key_name.title(),
+            "field_type": field_type, "options": json.dumps([]), "validation_rules": json.dumps({}),
+        })
+    people = [
+        ("Ana Silva", "ana@example.com", {"bio": "Backend engineer who loves Python", "team": "platform"}),
+        ("Bruno Souza", "bruno@corp.io", {"bio": "Designer", "team": "python"}),
+        ("Carla Dias", "carla@example.com", {"bio": "Writes Python and Go"}),
+        ("Python Pereira", "pp@example.com", {}),
+    ]
+    for name, email, custom_data in people:
+        client.post("/api/people/", json={"name": name, "email": email, "custom_data": json.dumps(custom_data)})
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def _search(q, **params):
+    response = client.get("/api/people/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_partial_name_matches():
+    page = _search("sil")
+
+    assert page["total"] == 1
+    assert page["results"][0]["name"] == "Ana Silva"
+    assert page["results"][0]["custom_data"]["team"] == "platform"
+
+def test_email_matches():
+    assert [r["name"] for r in _search("corp")["results"]] == ["Bruno Souza"]
+
+def test_only_text_fields_are_indexed():
+    names = {r["name"] for r in _search("python")["results"]}
+
+    # Bruno only has "python" in a select field
+    assert names == {"Ana Silva", "Carla Dias", "Python Pereira"}
+
+def test_name_matches_rank_above_custom_text():
+    results = _search("python")["results"]
+
+    assert results[0]["name"] == "Python Pereira"
+    assert results[0]["rank"] >= results[-1]["rank"]
+
+def test_all_terms_must_match_and_diacritics_are_ignored():
+    assert [r["name"] for r in _search("python gó")["results"]] == ["Carla Dias"]
+
+def test_results_are_paginated():
+    first = _search("python", limit=2)
+    second = _search("python", limit=2, offset=2)
+
+    assert first["total"] == second["total"] == 3
+    assert len(first["results"]) == 2
+    assert len(second["results"]) == 1
+    names = [r["name"] for r in first["results"] + second["results"]]
+    assert len(set(names)) == 3
+
+def test_query_without_words_returns_nothing():
+    assert _search("***") == {"total": 0, "results": []}
+
+def test_index_follows_person_updates_and_deletes():
+    db = TestingSessionLocal()
+    person = db.query(models.Person).filter_by(email="pp@example.com").first()
+    person.name = "Renamed Person"
+    db.commit()
+    assert "Renamed Person" not in {r["name"] for r in _search("python")["results"]}
+    assert [r["name"] for r in _search("renamed")["results"]] == ["Renamed Person"]
+
+    db.delete(person)
+    db.commit()
+    db.close()
+    assert _search("renamed")["total"] == 0
+
+def test_rolled_back_writes_are_not_indexed():
+    db = TestingSessionLocal()
+    db.add(models.Person(name="Ghost", email="ghost@example.com", custom_data="{}"))
+    db.flush()
+    db.rollback()
+    db.close()
+
+    assert _search("ghost")["total"] == 0
+
+def test_existing_people_are_indexed_by_the_migration_backfill(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE people_fts"))
+        conn.execute(text("DROP TABLE IF EXISTS migration_backfills"))
+    Base.metadata.create_all(bind=engine)
+    assert _search("carla")["total"] == 0
+
+    migration = next(m for m in MIGRATIONS if m.version == 4)
+    MigrationRunner(engine, MIGRATIONS, batch_size=1, throttle=0, progress=lambda m: None).run_backfill(migration)
+
+    assert _search("carla")["total"] == 1
+
+def _field_id(key_name):
+    fields = client.get("/api/fields/person", params={"include_inactive": True}).json()
+    return next(f["id"] for f in fields if f["key_name"] == key_name)
+
+def _rebuild(engine):
+    runner = MigrationRunner(engine, MIGRATIONS, batch_size=2, throttle=0, progress=lambda m: None)
+    return rebuild_search_index(runner)
+
+def test_field_type_changes_queue_a_rebuild_of_existing_answers(engine):
+    team = _field_id("team")
+
+    # Bruno's team "python" was stored while the field was a select
+    client.put(f"/api/fields/{team}", json={"field_type": "text"})
+    # The request only queues the rebuild
+    assert "Bruno Souza" not in {r["name"] for r in _search("python")["results"]}
+    assert _rebuild(engine)
+    assert "Bruno Souza" in {r["name"] for r in _search("python")["results"]}
+
+    client.put(f"/api/fields/{team}", json={"field_type": "select"})
+    assert _rebuild(engine)
+    assert "Bruno Souza" not in {r["name"] for r in _search("python")["results"]}
+
+def test_queued_rebuilds_are_coalesced(engine):
+    runner = MigrationRunner(engine, MIGRATIONS, throttle=0, progress=lambda m: None)
+    for key_name in ("motto", "hobby"):
+        client.post("/api/fields/", json={
+            "entity_type": "person", "key_name": key_name, "label": key_name.title(),
+            "field_type": "text", "options": "[]", "validation_rules": "{}",
+        })
+
+    # Both fields are covered by the one rebuild that had not started yet
+    assert len(queued_rebuilds(runner)) == 1
+    assert _rebuild(engine)
+    assert queued_rebuilds(runner) == []
+
+def test_renamed_text_field_stays_indexed_before_documents_are_upgraded():
+    response = client.put(f"/api/fields/{_field_id('bio')}", json={"key_name": "about"})
+    assert response.status_code == 200, response.text
+
+    # Re-indexing Carla reads her stored document, which still uses the old key
+    db = TestingSessionLocal()
+    person = db.query(models.Person).filter_by(email="carla@example.com").first()
+    person.name = "Carla Dias Reindexed"
+    db.commit()
+    db.close()
+
+    assert [r["name"] for r in _search("python go")["results"]] == ["Carla Dias Reindexed"]
+
+def test_postgres_index_is_qualified_with_the_tenant_schema():
+    assert PostgresTsvectorIndex("tenant_acme").table == '"tenant_acme".people_search'
+    assert PostgresTsvectorIndex().table == "people_search"
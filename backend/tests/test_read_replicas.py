@@ -0,0 +1,131 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+import database
+import json
+import sqlite3
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Filled in by setup_database with files under pytest's tmp dir
+paths = {}
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+def sync_replica():
+    source = sqlite3.connect(paths["primary"])
+    target = sqlite3.connect(paths["replica"])
+    source.backup(target)
+    target.close()
+    source.close()
+
+def _person(name):
+    return {"name": name, "email": f"{name}@example.com", "custom_data": json.dumps({})}
+
+def _emails(client):
+    return [p["email"] for p in client.get("/api/people/").json()]
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(tmp_path_factory):
+    db_dir = tmp_path_factory.mktemp("read_replicas")
+    paths["primary"] = db_dir / "primary.db"
+    paths["replica"] = db_dir / "replica.db"
+    engine = create_engine(f"sqlite:///{paths['primary']}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sync_replica()
+    app.dependency_overrides[get_db] = override_get_db
+    # Drop replica sets cached by earlier requests before pointing at the test replica
+    database.dispose_shards()
+    patch = pytest.MonkeyPatch()
+    patch.setattr(database, "READ_REPLICA_URLS", [f"sqlite:///{paths['replica']}"])
+    yield
+    database.dispose_shards()
+    patch.undo()
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+def test_reads_are_served_by_the_replica():
+    writer = TestClient(app)
+    writer.post("/api/people/", json=_person("ana"))
+
+    # A different client reads the (not yet synced) replica
+    reader = TestClient(app)
+    assert "ana@example.com" not in _emails(reader)
+
+    sync_replica()
+    assert "ana@example.com" in _emails(reader)
+
+def test_client_reads_its_own_writes_from_the_primary():
+    client = TestClient(app)
+
+    response = client.post("/api/people/", json=_person("bruno"))
+
+    assert response.status_code == 200
+    assert "df_last_write" in response.cookies
+    assert "bruno@example.com" in _emails(client)
+    assert "bruno@example.com" not in _emails(TestClient(app))
+
+def test_failed_writes_do_not_pin_reads_to_primary():
+    client = TestClient(app)
+    client.post("/api/people/", json=_person("carla"))
+    sync_replica()
+    other = TestClient(app)
+
+    response = other.post("/api/people/", json=_person("carla"))
+
+    assert response.status_code == 400
+    assert "df_last_write" not in response.cookies
+
+def test_form_evaluation_does_not_pin_reads_to_primary():
+    client = TestClient(app)
+    form = client.post("/api/forms/", json={"name": "Avaliação"}).json()
+    sync_replica()
+
+    response = TestClient(app).post(f"/api/forms/{form['id']}/evaluate", json={"custom_data": "{}"})
+
+    # A POST that only reads: the form filler keeps using the replicas
+    assert response.status_code == 200, response.text
+    assert "df_last_write" not in response.cookies
+
+def test_unreachable_replica_falls_back_to_primary(monkeypatch):
+    database.dispose_shards()
+    monkeypatch.setattr(database, "READ_REPLICA_URLS", [
+        "sqlite:///file:/nonexistent/dir/replica.db?mode=ro&uri=true"
+    ])
+    TestClient(app).post("/api/people/", json=_person("diego"))
+
+    assert "diego@example.com" in _emails(TestClient(app))
+    replica = database._get_replicas(database.DEFAULT_TENANT)[0]
+    assert not replica.is_available()
+    database.dispose_shards()
+
+def test_replica_failing_mid_request_is_retried_on_the_primary(monkeypatch, tmp_path):
+    # The replica accepts connections but has no tables, so the query itself fails
+    database.dispose_shards()
+    monkeypatch.setattr(database, "READ_REPLICA_URLS", [f"sqlite:///{tmp_path}/empty_replica.db"])
+    client = TestClient(app)
+    client.post("/api/fields/", json={
+        "entity_type": "person", "key_name": "fallback", "label": "Fallback", "field_type": "text",
+        "options": "[]", "validation_rules": "{}",
+    })
+
+    response = TestClient(app).get("/api/fields/person")
+
+    assert response.status_code == 200, response.text
+    assert "fallback" in [field["key_name"] for field in response.json()]
+    replica = database._get_replicas(database.DEFAULT_TENANT)[0]
+    assert not replica.is_available()
+    database.dispose_shards()
@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from main import app, get_db
+import models
+import json
+import pytest
+
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("streaming") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    TestingSessionLocal.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(engine):
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(models.CustomFieldDefinition(
+        entity_type="person", key_name="age", label="Age", field_type="number"
+    ))
+    db.add(models.CustomFieldDefinition(
+        entity_type="person", key_name="color", label="Color", field_type="select"
+    ))
+    db.add_all(
+        models.Person(
+            name=f"Person {i}",
+            email=f"person{i}@example.com",
+            custom_data=json.dumps({"age": i, "color": "blue" if i % 2 else "red"}),
+        )
+        for i in range(1, 201)
+    )
+    db.commit()
+    db.close()
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def test_people_list_streams_json_array():
+    response = client.get("/api/people/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert len(data) == 200
+    assert data[0]["email"] == "person1@example.com"
+    assert data[0]["custom_data"] == {"age": 1, "color": "blue"}
+
+def test_people_list_supports_ndjson():
+    response = client.get("/api/people/", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == 200
+    assert json.loads(lines[-1])["name"] == "Person 200"
+
+def test_people_list_is_gzip_compressed_when_accepted():
+    with client.stream("GET", "/api/people/", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = response.read()
+
+    # httpx transparently decodes the gzip stream
+    assert len(json.loads(body)) == 200
+
+def test_small_responses_are_not_compressed():
+    response = client.get("/api/fields/person", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+def test_forms_list_streams_forms_with_relationships():
+    field_id = client.get("/api/fields/person").json()[0]["id"]
+    client.post("/api/forms/", json={
+        "name": "Streamed Form",
+        "sections": [{"name": "Main", "temp_id": "s1"}],
+        "fields": [{"field_id": field_id, "section_temp_id": "s1"}],
+    })
+
+    response = client.get("/api/forms/")
+
+    assert response.status_code == 200
+    forms = response.json()
+    assert len(forms) == 1
+    assert forms[0]["sections"][0]["name"] == "Main"
+    assert forms[0]["fields"][0]["field"]["key_name"] == "age"
+
+def test_field_stats_aggregates_in_a_single_pass():
+    response = client.get("/api/analytics/field-stats")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_people"] == 200
+    stats = {s["field_key"]: s for s in data["field_stats"]}
+    assert stats["age"]["numeric_stats"] == {"min": 1.0, "max": 200.0, "avg": 100.5, "count": 200}
+    assert stats["color"]["value_counts"] == {"red": 100, "blue": 100}
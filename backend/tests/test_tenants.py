@@ -0,0 +1,144 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+import database
+from main import app
+import json
+import threading
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module", autouse=True)
+def tenant_shards(tmp_path_factory):
+    shard_dir = tmp_path_factory.mktemp("shards")
+    patch = pytest.MonkeyPatch()
+    patch.setattr(database, "TENANT_DATABASE_URL_TEMPLATE", f"sqlite:///{shard_dir}/tenant_{{tenant}}.db")
+    patch.setattr(database, "TENANTS", ["acme", "globex"])
+    yield shard_dir
+    database.dispose_shards()
+    patch.undo()
+
+def _headers(tenant):
+    return {"X-Tenant-ID": tenant}
+
+def _seed(tenant):
+    response = client.post("/api/fields/", headers=_headers(tenant), json={
+        "entity_type": "person",
+        "key_name": "score",
+        "label": "Score",
+        "field_type": "number",
+        "options": json.dumps([]),
+        "validation_rules": json.dumps({}),
+    })
+    assert response.status_code == 200, response.text
+
+def test_each_tenant_gets_its_own_shard(tenant_shards):
+    _seed("acme")
+
+    assert (tenant_shards / "tenant_acme.db").exists()
+    assert "people" in inspect(database.get_engine("acme")).get_table_names()
+    assert database.get_engine("acme") is not database.get_engine("globex")
+
+def test_people_are_isolated_per_tenant():
+    payload = {"name": "Same Email", "email": "shared@example.com", "custom_data": json.dumps({})}
+
+    # The email unique index is per shard, so two tenants can hold the same address
+    assert client.post("/api/people/", headers=_headers("acme"), json=payload).status_code == 200
+    assert client.post("/api/people/", headers=_headers("globex"), json=payload).status_code == 200
+    assert client.post("/api/people/", headers=_headers("acme"), json=payload).status_code == 400
+
+    acme = client.get("/api/people/", headers=_headers("acme")).json()
+    assert [p["email"] for p in acme] == ["shared@example.com"]
+
+def test_unknown_or_invalid_tenant_is_rejected():
+    assert client.get("/api/people/", headers=_headers("initech")).status_code == 400
+    assert client.get("/api/people/", headers=_headers("../etc")).status_code == 400
+
+def test_analytics_fans_out_across_shards_and_merges():
+    _seed("globex")
+    for tenant, scores in {"acme": [10, 20], "globex": [30]}.items():
+        for i, score in enumerate(scores):
+            client.post("/api/people/", headers=_headers(tenant), json={
+                "name": f"{tenant} {i}",
+                "email": f"{tenant}{i}@example.com",
+                "custom_data": json.dumps({"score": score}),
+            })
+
+    single = client.get("/api/analytics/field-stats", headers=_headers("acme")).json()
+    merged = client.get("/api/analytics/field-stats?tenants=acme,globex").json()
+
+    assert single["total_people"] == 3
+    assert merged["total_people"] == 5
+    score = next(s for s in merged["field_stats"] if s["field_key"] == "score")
+    assert score["total_responses"] == 3
+    assert score["numeric_stats"] == {"min": 10.0, "max": 30.0, "avg": 20.0, "count": 3}
+
+def test_analytics_fan_out_is_bounded(monkeypatch):
+    import main
+    from concurrent import futures
+    workers = []
+
+    class RecordingExecutor(futures.ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            workers.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(futures, "ThreadPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(main, "ANALYTICS_FANOUT_WORKERS", 1)
+
+    merged = client.get("/api/analytics/field-stats?tenants=acme,globex").json()
+
+    assert workers == [1]
+    assert merged["total_people"] == 5
+
+@pytest.fixture
+def tenant_registry(tmp_path, monkeypatch):
+    # A fresh default database to hold the registry, and no allow-list
+    registry = create_engine(f"sqlite:///{tmp_path}/default.db", connect_args={"check_same_thread": False})
+    monkeypatch.setitem(database._shards, database.DEFAULT_TENANT, (registry, sessionmaker(bind=registry)))
+    monkeypatch.setattr(database, "_prepared", set())
+    monkeypatch.setattr(database, "_registered", set())
+    monkeypatch.setattr(database, "TENANTS", [])
+    yield
+    registry.dispose()
+
+def test_without_allow_list_only_registered_tenants_get_a_shard(tenant_shards, tenant_registry):
+    # An unregistered tenant is rejected before any database is created for it
+    assert client.get("/api/people/", headers=_headers("hooli")).status_code == 400
+    assert not (tenant_shards / "tenant_hooli.db").exists()
+
+    database.register_tenant("Hooli")
+
+    assert client.get("/api/people/", headers=_headers("hooli")).status_code == 200
+    assert database.known_tenants() == ["default", "hooli"]
+    # Analytics over `*` covers the registry, not just the shards this process opened
+    assert client.get("/api/analytics/field-stats?tenants=*").status_code == 200
+
+def test_schema_setup_of_one_tenant_does_not_block_others(monkeypatch):
+    database.dispose_shards()
+    started, release = threading.Event(), threading.Event()
+    ensure_schema = database.ensure_schema
+
+    def slow_ensure_schema(bind):
+        if "tenant_acme" in str(bind.url):
+            started.set()
+            release.wait(5)
+        return ensure_schema(bind)
+
+    monkeypatch.setattr(database, "ensure_schema", slow_ensure_schema)
+    migrating = threading.Thread(target=database.get_engine, args=("acme",))
+    migrating.start()
+    assert started.wait(5)
+
+    # acme is still being migrated; globex is served meanwhile
+    assert client.get("/api/people/", headers=_headers("globex")).status_code == 200
+    assert migrating.is_alive()
+
+    release.set()
+    migrating.join(5)
+    assert client.get("/api/people/", headers=_headers("acme")).status_code == 200
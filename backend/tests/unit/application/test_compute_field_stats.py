@@ -0,0 +1,45 @@
+import json
+from types import SimpleNamespace
+from src.application.use_cases.compute_field_stats import ComputeFieldStats
+
+def _field(key_name, field_type):
+    return SimpleNamespace(key_name=key_name, label=key_name.title(), field_type=field_type)
+
+def test_compute_field_stats_single_pass_over_iterator():
+    # Arrange
+    fields = [_field("age", "number"), _field("langs", "multiselect")]
+    rows = iter([
+        json.dumps({"age": 30, "langs": ["py", "go"]}),
+        json.dumps({"age": "x", "langs": ["py"]}),
+        "not json",
+    ])
+
+    # Act
+    result = ComputeFieldStats().execute(fields, rows)
+
+    # Assert
+    assert result["total_people"] == 3
+    age, langs = result["field_stats"]
+    assert age["total_responses"] == 2
+    assert age["numeric_stats"] == {"min": 30.0, "max": 30.0, "avg": 30.0, "count": 1}
+    assert langs["value_counts"] == {"py": 2, "go": 1}
+
+def test_merge_combines_shard_results():
+    # Arrange
+    fields = [_field("age", "number"), _field("color", "select")]
+    shard_a = ComputeFieldStats().execute(fields, [json.dumps({"age": 10, "color": "red"})])
+    shard_b = ComputeFieldStats().execute(fields, [
+        json.dumps({"age": 20, "color": "red"}),
+        json.dumps({"age": 60, "color": "blue"}),
+    ])
+
+    # Act
+    merged = ComputeFieldStats.merge([shard_a, shard_b])
+
+    # Assert
+    assert merged["total_people"] == 3
+    age, color = merged["field_stats"]
+    assert age["numeric_stats"] == {"min": 10.0, "max": 60.0, "avg": 30.0, "count": 3}
+    assert color["value_counts"] == {"red": 2, "blue": 1}
+    # Inputs are left untouched
+    assert shard_a["field_stats"][1]["value_counts"] == {"red": 1}
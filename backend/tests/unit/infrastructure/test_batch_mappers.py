@@ -0,0 +1,52 @@
+import dataclasses
+
+import pytest
+
+import models
+from src.infrastructure.mappers.field_definition_mapper import FieldDefinitionMapper
+from src.infrastructure.mappers.person_mapper import PersonMapper
+from src.infrastructure.mappers.section_mapper import SectionMapper
+
+
+def test_section_from_rows_matches_to_entity():
+    # Arrange
+    model = models.Section(id=3, form_id=1, name="Contato", description=None, order_index=2)
+    row = (3, "Contato", None, 2, 1, None)
+
+    # Act
+    entities = SectionMapper.from_rows([row])
+
+    # Assert
+    assert entities == [SectionMapper.to_entity(model)]
+    assert entities[0].order == 2
+
+
+@pytest.mark.parametrize("mapper", [SectionMapper, PersonMapper, FieldDefinitionMapper])
+def test_columns_follow_entity_field_order(mapper):
+    entity_type = type(next(iter(mapper.from_rows([tuple(range(len(mapper.COLUMNS)))]))))
+    fields = [f.name for f in dataclasses.fields(entity_type)]
+
+    assert len(fields) == len(mapper.COLUMNS)
+    expected = [c.key for c in mapper.COLUMNS]
+    # Section is the only entity whose field name differs from its column
+    assert [("order_index" if f == "order" else f) for f in fields] == expected
+
+
+def test_person_from_rows_is_lazy():
+    rows = iter([(1, "Ana", "ana@example.com", "{}", 0)])
+
+    people = PersonMapper.from_rows(rows)
+
+    assert next(people).email == "ana@example.com"
+
+
+def test_read_side_entities_are_slotted_and_frozen():
+    # Arrange
+    field = FieldDefinitionMapper.from_rows(
+        [(1, "person", "dept", "Dept", "text", None, "{}", True, 1)]
+    )[0]
+
+    # Act / Assert
+    assert not hasattr(field, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        field.label = "Department"
@@ -0,0 +1,79 @@
+import gzip
+import json
+import zlib
+
+from src.infrastructure.http.compression import _Compressor, negotiate_encoding
+from src.infrastructure.http.streaming import iter_json_array, iter_ndjson
+
+
+def _counting(items, consumed):
+    for item in items:
+        consumed.append(item)
+        yield item
+
+
+def test_first_chunk_is_sent_before_consuming_all_rows():
+    # Arrange
+    consumed = []
+    rows = _counting((json.dumps({"id": i}) for i in range(10_000)), consumed)
+
+    # Act
+    first_chunk = next(iter_json_array(rows, chunk_bytes=1024))
+
+    # Assert - time-to-first-byte does not depend on result size
+    assert first_chunk == b'[{"id": 0}'
+    assert len(consumed) == 1
+
+
+def test_chunks_are_bounded_regardless_of_result_size():
+    # Arrange
+    rows = (json.dumps({"id": i, "name": "x" * 20}) for i in range(20_000))
+
+    # Act
+    chunks = list(iter_json_array(rows, chunk_bytes=4096))
+
+    # Assert - peak buffered size stays close to chunk_bytes
+    assert max(len(chunk) for chunk in chunks) < 4096 + 100
+    data = json.loads(b"".join(chunks))
+    assert len(data) == 20_000
+    assert data[-1]["id"] == 19_999
+
+
+def test_empty_result_is_a_valid_json_array():
+    assert json.loads(b"".join(iter_json_array(iter([])))) == []
+
+
+def test_ndjson_emits_one_document_per_line():
+    rows = (json.dumps({"id": i}) for i in range(3))
+
+    lines = b"".join(iter_ndjson(rows)).decode().splitlines()
+
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2]
+
+
+def test_negotiate_encoding_respects_quality_values():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_gzip_compressor_output_decodes_incrementally():
+    # Arrange
+    compressor = _Compressor("gzip", gzip_level=6, brotli_quality=4)
+    decoder = zlib.decompressobj(31)
+
+    # Act - each flushed chunk is decodable on its own
+    first = decoder.decompress(compressor.compress(b"hello "))
+    rest = decoder.decompress(compressor.compress(b"world") + compressor.finish())
+
+    # Assert
+    assert first == b"hello "
+    assert first + rest == b"hello world"
+
+
+def test_gzip_compressor_produces_valid_gzip_stream():
+    compressor = _Compressor("gzip", gzip_level=6, brotli_quality=4)
+
+    data = compressor.compress(b"a" * 1000) + compressor.finish()
+
+    assert gzip.decompress(data) == b"a" * 1000
@@ -0,0 +1,53 @@
+from src.domain.entities.field_revision import FieldRevision
+from src.application.use_cases.upgrade_custom_data import UpgradeCustomData
+import json
+
+def test_revision_renames_key_and_keeps_value():
+    # Arrange
+    revision = FieldRevision(id=1, field_id=1, old_key_name="dept", new_key_name="department")
+    data = {"dept": "HR", "age": 30}
+
+    # Act
+    changed = revision.apply(data)
+
+    # Assert
+    assert changed is True
+    assert data == {"department": "HR", "age": 30}
+
+def test_revision_ignores_documents_without_the_key():
+    revision = FieldRevision(id=1, field_id=1, old_key_name="dept", new_key_name="department")
+    data = {"age": 30}
+
+    assert revision.apply(data) is False
+    assert data == {"age": 30}
+
+def test_revision_renames_options_in_lists():
+    revision = FieldRevision(
+        id=1, field_id=1, old_key_name="langs", new_key_name="langs",
+        option_renames={"py": "Python"}
+    )
+    data = {"langs": ["py", "Go"]}
+
+    revision.apply(data)
+
+    assert data == {"langs": ["Python", "Go"]}
+
+def test_upgrade_skips_documents_already_at_head():
+    # Arrange
+    upgrade = UpgradeCustomData([
+        FieldRevision(id=3, field_id=1, old_key_name="dept", new_key_name="department")
+    ])
+    # Not valid JSON: proves the document is not even parsed
+    raw = "not-json-but-current"
+
+    # Act & Assert
+    assert upgrade.execute(raw, schema_revision=3) is raw
+
+def test_upgrade_applies_only_newer_revisions_in_order():
+    upgrade = UpgradeCustomData([
+        FieldRevision(id=2, field_id=1, old_key_name="b", new_key_name="c"),
+        FieldRevision(id=1, field_id=1, old_key_name="a", new_key_name="b"),
+    ])
+
+    assert json.loads(upgrade.execute(json.dumps({"a": 1}), schema_revision=0)) == {"c": 1}
+    assert json.loads(upgrade.execute(json.dumps({"a": 1}), schema_revision=1)) == {"a": 1}
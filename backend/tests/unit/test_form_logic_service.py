@@ -0,0 +1,182 @@
+import json
+import random
+
+import pytest
+
+from src.domain.entities.form_rules import FieldRule, FormRules, SectionRule
+from src.domain.services.conditional_logic import (
+    RuleError, compile_condition, compile_form, rename_condition_field,
+)
+
+
+def _field(key, section_id=None, is_required=False, **conditions):
+    return FieldRule(key, section_id, is_required, json.dumps(conditions))
+
+
+def _rules(*fields, sections=()):
+    return FormRules(tuple(fields), tuple(sections))
+
+
+@pytest.mark.parametrize("rule, answers, expected", [
+    ({"field": "a", "op": "eq", "value": "x"}, {"a": "x"}, True),
+    ({"field": "a", "op": "ne", "value": "x"}, {"a": "x"}, False),
+    ({"field": "a", "op": "in", "value": ["x", "y"]}, {"a": "y"}, True),
+    ({"field": "a", "op": "in", "value": ["x"]}, {"a": ["z", "x"]}, True),
+    ({"field": "a", "op": "not_in", "value": ["x"]}, {"a": "y"}, True),
+    ({"field": "a", "op": "contains", "value": "py"}, {"a": ["go", "py"]}, True),
+    ({"field": "a", "op": "gt", "value": 18}, {"a": "21"}, True),
+    ({"field": "a", "op": "lte", "value": 18}, {"a": "abc"}, False),
+    ({"field": "a", "op": "empty"}, {"a": []}, True),
+    ({"field": "a", "op": "not_empty"}, {}, False),
+    ({"all": [{"field": "a", "op": "eq", "value": 1}, {"not": {"field": "b", "op": "empty"}}]}, {"a": 1, "b": "x"}, True),
+    ({"any": [{"field": "a", "op": "eq", "value": 1}, {"field": "b", "op": "eq", "value": 2}]}, {"b": 2}, True),
+    ({"field": "a", "op": "eq", "value": {"nested": [1]}}, {"a": {"nested": [1]}}, True),
+])
+def test_condition_operators(rule, answers, expected):
+    predicate, _ = compile_condition(rule)
+
+    assert predicate(answers) is expected
+
+
+@pytest.mark.parametrize("rule", [
+    {},
+    {"field": "a", "op": "near", "value": 1},
+    {"field": "a", "op": "gt", "value": "many"},
+    {"field": "a", "op": "in", "value": "x"},
+    {"all": []},
+    {"any": [{"field": "a", "op": "empty"}], "field": "b"},
+    {"field": "a", "op": "eq", "value": 1, "extra": True},
+    {"field": "__import__('os')", "op": "eq"},
+])
+def test_invalid_conditions_raise_rule_error(rule):
+    with pytest.raises(RuleError):
+        compile_condition(rule)
+
+
+def test_keys_and_values_are_never_evaluated_as_code():
+    key = "a') or __import__('os').system('false') or ('"
+    predicate, refs = compile_condition({"field": key, "op": "eq", "value": "') or True or ('"})
+
+    assert refs == {key}
+    assert predicate({key: "') or True or ('"}) is True
+    assert predicate({}) is False
+
+
+def test_hidden_field_counts_as_empty_for_dependents():
+    # Arrange: c depends on b, which depends on a
+    logic = compile_form(_rules(
+        _field("c", visible_if={"field": "b", "op": "not_empty"}),
+        _field("b", visible_if={"field": "a", "op": "eq", "value": "yes"}),
+        _field("a"),
+    ))
+
+    # Act
+    evaluation = logic.evaluate({"a": "no", "b": "stale answer"})
+
+    # Assert
+    assert sorted(evaluation.hidden_fields()) == ["b", "c"]
+    assert evaluation.visible_answers() == {"a": "no"}
+
+
+def test_empty_form_evaluates_to_nothing():
+    evaluation = compile_form(_rules()).evaluate({"a": 1})
+
+    assert evaluation.visible == []
+    assert evaluation.required == []
+
+
+def test_section_visibility_and_required_if():
+    logic = compile_form(_rules(
+        _field("age"),
+        _field("guardian", section_id=1, required_if={"field": "age", "op": "lt", "value": 18}),
+        _field("school", section_id=1, is_required=True),
+        sections=[SectionRule(1, json.dumps({"field": "age", "op": "lt", "value": 21}))],
+    ))
+
+    minor = logic.evaluate({"age": 12})
+    adult = logic.evaluate({"age": 40})
+
+    assert minor.fields()["guardian"] == {"visible": True, "required": True}
+    assert sorted(minor.missing()) == ["guardian", "school"]
+    assert minor.sections() == {1: {"visible": True}}
+    assert adult.sections() == {1: {"visible": False}}
+    assert adult.missing() == []
+
+
+def test_circular_dependencies_are_rejected():
+    rules = _rules(
+        _field("a", visible_if={"field": "b", "op": "empty"}),
+        _field("b", visible_if={"field": "a", "op": "empty"}),
+    )
+
+    with pytest.raises(RuleError, match="Circular rule dependencies: (a -> b -> a|b -> a -> b)"):
+        compile_form(rules)
+
+
+def test_keys_outside_the_form_are_listed_as_inputs():
+    rules = _rules(_field("a", visible_if={"field": "outside", "op": "empty"}), _field("b"))
+
+    assert compile_form(rules).inputs == {"outside": "a"}
+
+
+def test_rename_condition_field_only_touches_field_references():
+    rule = {"all": [
+        {"field": "old", "op": "eq", "value": "old"},
+        {"not": {"any": [{"field": "other", "op": "empty"}, {"field": "old", "op": "empty"}]}},
+    ]}
+
+    renamed = rename_condition_field(rule, "old", "new")
+
+    assert renamed == {"all": [
+        {"field": "new", "op": "eq", "value": "old"},
+        {"not": {"any": [{"field": "other", "op": "empty"}, {"field": "new", "op": "empty"}]}},
+    ]}
+    assert rule["all"][0]["field"] == "old"
+
+
+def test_compiled_forms_are_cached_by_rules():
+    rules = _rules(_field("a"), _field("b", visible_if={"field": "a", "op": "empty"}))
+    same_rules = _rules(_field("a"), _field("b", visible_if={"field": "a", "op": "empty"}))
+
+    assert compile_form(rules) is compile_form(same_rules)
+
+
+def test_update_only_touches_dependents():
+    logic = compile_form(_rules(
+        _field("a"),
+        _field("b", visible_if={"field": "a", "op": "eq", "value": 1}),
+        _field("c", visible_if={"field": "b", "op": "not_empty"}),
+        _field("d"),
+    ))
+    evaluation = logic.evaluate({"a": 1, "b": "x"})
+
+    assert set(logic.affected("a")) == {"a", "b", "c"}
+    assert logic.affected("d") == ("d",)
+    assert evaluation.update("a", 2) == ["b", "c"]
+    assert evaluation.is_visible("c") is False
+
+
+def test_incremental_updates_match_a_full_pass():
+    # Arrange: a random layered graph with sections
+    rng = random.Random(7)
+    fields = []
+    for i in range(200):
+        conditions = {}
+        if i:
+            conditions["visible_if"] = {"any": [
+                {"field": f"f{rng.randrange(i)}", "op": "in", "value": ["a", "b"]},
+                {"field": f"f{rng.randrange(i)}", "op": "empty"},
+            ]}
+        if i % 4 == 0:
+            conditions["required_if"] = {"field": f"f{rng.randrange(i)}", "op": "not_empty"} if i else True
+        fields.append(_field(f"f{i}", section_id=i % 5, **conditions))
+    sections = [SectionRule(s, json.dumps({"field": "f0", "op": "ne", "value": "c"}) if s == 2 else None) for s in range(5)]
+    logic = compile_form(_rules(*fields, sections=sections))
+    evaluation = logic.evaluate({})
+
+    # Act / Assert
+    for _ in range(300):
+        evaluation.update(f"f{rng.randrange(200)}", rng.choice(["a", "b", "c", "", None]))
+        fresh = logic.evaluate(evaluation.answers)
+        assert evaluation.visible == fresh.visible
+        assert evaluation.required == fresh.required
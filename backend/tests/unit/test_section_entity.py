@@ -51,3 +51,14 @@ def test_section_validation_fails_with_negative_order():
     # Act & Assert
     with pytest.raises(ValueError, match="Section order must be >= 0"):
         section.validate()
+
+def test_section_validation_fails_with_invalid_visibility_rule():
+    # Arrange
+    section = Section(
+        id=None, name="Valid Name", description=None, order=0, form_id=1,
+        visible_if='{"field": "age", "op": "older_than", "value": 18}'
+    )
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="Section visible_if is invalid"):
+        section.validate()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+
+# Run from the repository root: python scripts/migrate.py upgrade
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import database  # noqa: E402
+import models  # noqa: E402,F401 - registers the tables on Base.metadata
+from sqlalchemy import create_engine  # noqa: E402
+from src.infrastructure.migrations.runner import (  # noqa: E402
+    DEFAULT_BATCH_SIZE, DEFAULT_THROTTLE_SECONDS, MigrationRunner,
+)
+from src.infrastructure.migrations.jobs import (  # noqa: E402
+    load_person_upgrade, persist_revisions, queued_rebuilds, rebuild_search_index, revisions_job_name,
+)
+from src.infrastructure.migrations.versions import MIGRATIONS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations and online data backfills.")
+    parser.add_argument("command", choices=["status", "upgrade", "revisions", "reindex", "register"])
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL (or the tenant's shard with --tenant)")
+    parser.add_argument("--tenant", help="Migrate (or register) this tenant's shard")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run without changing anything")
+    parser.add_argument("--schema-only", action="store_true", help="Apply DDL but leave backfills pending")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per backfill transaction")
+    parser.add_argument("--throttle", type=float, default=DEFAULT_THROTTLE_SECONDS, help="Seconds to pause between batches")
+    args = parser.parse_args()
+
+    if args.command == "register":
+        # Record the tenant in the default database's registry, then migrate its shard
+        if not args.tenant:
+            parser.error("register needs --tenant")
+        database.ensure_schema(database.get_shard_engine(database.DEFAULT_TENANT))
+        args.tenant = database.register_tenant(args.tenant)
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        engine = database.get_shard_engine(database.resolve_tenant(args.tenant))
+
+    runner = MigrationRunner(engine, MIGRATIONS, batch_size=args.batch_size, throttle=args.throttle)
+
+    if args.command == "status":
+        current = runner.current_version()
+        print(f"Version: {'empty database' if current is None else current} (head {runner.head})")
+        for migration in runner.pending():
+            print(f"Pending: {migration.version} {migration.description}")
+        for migration in runner.pending_backfills():
+            state = runner.backfill_state(migration.version)
+            progress = f"{state.processed} rows, key {state.last_key}" if state else "not started"
+            print(f"Pending backfill: {migration.version} {migration.description} ({progress})")
+        if runner.current_version() == runner.head:
+            with engine.connect() as conn:
+                head = load_person_upgrade(conn).head
+            if head:
+                state = runner.job_state(revisions_job_name(head))
+                if state is None:
+                    progress = "not persisted"
+                elif state.completed:
+                    progress = "persisted"
+                else:
+                    progress = f"{state.processed} rows, key {state.last_key}"
+                print(f"Field revisions: head {head} ({progress})")
+            rebuilds = queued_rebuilds(runner)
+            if rebuilds:
+                state = runner.job_state(rebuilds[-1])
+                progress = f"{state.processed} rows, key {state.last_key}" if state.last_key else "not started"
+                print(f"Search index: rebuild queued ({progress})")
+        return
+
+    if args.command == "revisions":
+        # Repeatable: run after field renames (or from cron) to stop paying the lazy upgrade on reads
+        persist_revisions(runner)
+        return
+
+    if args.command == "reindex":
+        # Repeatable: field changes that alter which answers are text queue a rebuild
+        rebuild_search_index(runner)
+        return
+
+    runner.upgrade(dry_run=args.dry_run, schema_only=args.schema_only)
+
+
+if __name__ == "__main__":
+    main()
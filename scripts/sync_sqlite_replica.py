@@ -0,0 +1,30 @@
+import argparse
+import sqlite3
+import time
+
+# Keeps a local SQLite read replica in sync with the primary, for trying
+# DATABASE_READ_URLS without a real replicated database.
+
+def sync(primary_path, replica_path):
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        # The backup API copies a consistent snapshot even while the primary is being written
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy a SQLite primary into a read replica file.")
+    parser.add_argument("primary", nargs="?", default="/tmp/sql_app.db")
+    parser.add_argument("replica", nargs="?", default="/tmp/sql_app_replica.db")
+    parser.add_argument("--interval", type=float, default=0, help="Seconds between syncs; 0 syncs once")
+    args = parser.parse_args()
+
+    while True:
+        sync(args.primary, args.replica)
+        print(f"Synced {args.primary} -> {args.replica}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)